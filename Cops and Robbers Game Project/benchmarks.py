@@ -0,0 +1,224 @@
+"""
+Benchmarks for the hot paths of the game.
+
+Times loading a location graph, Graph.assign_random_edges, Graph.get_path, Graph.edges_list,
+RobberPlayer.get_valid_path, CopPlayer.make_move and part1.run_game at several scales:
+    - 'small' and 'large': the graphs of data/small_location_data.csv and
+      data/large_location_data.csv
+    - '10k', '100k' and '1m': synthetic graphs with that many vertices (see synthetic_graph)
+
+Run it from the project directory, for example
+
+    python benchmarks.py --scales small large 10k --output results.json
+    python benchmarks.py --baseline results.json
+
+The results are written as JSON. With --baseline, every benchmark is compared with the same
+benchmark in a stored results file, and the exit status is 1 if any of them got slower by more
+than --tolerance, so a regression in a hot path shows up before it is deployed.
+
+Every benchmark reports the time per operation (one query, one move or one game) of its best
+and median round. Work that only prepares a round, like building fresh players, is not timed.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Optional
+
+import graph_vertex
+import part1
+import part2
+
+# The data file of each data set scale.
+DATA_FILES = {'small': os.path.join('data', 'small_location_data.csv'),
+              'large': os.path.join('data', 'large_location_data.csv')}
+
+# The number of vertices of each synthetic scale.
+SYNTHETIC_SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# The scales run when none are given. '1m' needs a few GB of memory, so it is left out.
+DEFAULT_SCALES = ['small', 'large', '10k', '100k']
+
+
+def synthetic_graph(num_vertices: int, seed: int) -> graph_vertex.Graph:
+    """Return a connected graph with num_vertices vertices of random kinds, with the scores of
+    part1.SCORE_DICT.
+
+    The graph is a random tree, in which each vertex is joined to a random earlier vertex,
+    plus num_vertices // 2 random edges, so its average degree is about 3.
+    """
+    rng = random.Random(seed)
+    kinds = sorted(part1.SCORE_DICT)
+    location_graph = graph_vertex.Graph()
+    for i in range(num_vertices):
+        kind = rng.choice(kinds)
+        location_graph.add_vertex(f'v{i}', kind, part1.SCORE_DICT[kind])
+
+    for i in range(1, num_vertices):
+        location_graph.add_edge(f'v{i}', f'v{rng.randrange(i)}')
+    for _ in range(num_vertices // 2):
+        u, v = rng.randrange(num_vertices), rng.randrange(num_vertices)
+        if u != v:
+            location_graph.add_edge(f'v{u}', f'v{v}')
+
+    return location_graph
+
+
+def measure(run: Callable[[Any], Any], repeat: int, ops: int = 1,
+            setup: Optional[Callable[[], Any]] = None) -> dict:
+    """Time repeat rounds of run(setup()), each doing ops operations, and return the best and
+    median time per operation in seconds.
+
+    setup is called before each round, outside the timing, and its result is passed to run.
+    """
+    times = []
+    for _ in range(repeat):
+        prepared = setup() if setup is not None else None
+        start = time.perf_counter()
+        run(prepared)
+        times.append((time.perf_counter() - start) / ops)
+
+    return {'best': min(times), 'median': statistics.median(times), 'repeat': repeat,
+            'ops': ops}
+
+
+def run_scale(scale: str, repeat: int, queries: int, games: int, seed: int) -> dict:
+    """Run every benchmark at the given scale and return their results by name.
+
+    Preconditions:
+        - scale in DATA_FILES or scale in SYNTHETIC_SIZES
+    """
+    results = {}
+
+    if scale in DATA_FILES:
+        data_file = DATA_FILES[scale]
+        results['load_location_graph'] = measure(
+            lambda _: part1.load_location_graph(data_file, rng=random.Random(seed)), repeat)
+        location_graph = part1.load_location_graph(data_file, rng=random.Random(seed))
+    else:
+        location_graph = synthetic_graph(SYNTHETIC_SIZES[scale], seed)
+
+    rng = random.Random(seed)
+    items = list(location_graph.vertices)
+    vertices = location_graph.vertices
+    pairs = [(rng.choice(items), rng.choice(items)) for _ in range(queries)]
+
+    def bare_graph(_: Any = None) -> graph_vertex.Graph:
+        """Return a graph with the vertices of location_graph and no edges."""
+        bare = graph_vertex.Graph()
+        for vertex in vertices.values():
+            bare.add_vertex(vertex.item, vertex.kind, vertex.score)
+        return bare
+
+    results['assign_random_edges'] = measure(
+        lambda bare: bare.assign_random_edges(random.Random(seed)), repeat, setup=bare_graph)
+
+    results['get_path'] = measure(
+        lambda _: [location_graph.get_path(item1, item2) for item1, item2 in pairs],
+        repeat, queries, setup=location_graph.path_cache.clear)
+
+    results['edges_list'] = measure(lambda _: location_graph.edges_list(), repeat)
+
+    def new_robbers() -> list:
+        """Clear the path cache and return a robber for each query pair."""
+        location_graph.path_cache.clear()
+        return [part2.RobberPlayer(vertices[item1], (vertices[item2], 'mid'))
+                for item1, item2 in pairs]
+
+    results['get_valid_path'] = measure(
+        lambda robbers: [robber.get_valid_path(location_graph) for robber in robbers],
+        repeat, queries, setup=new_robbers)
+
+    def new_cops() -> list:
+        """Return a cop for each query pair."""
+        return [part2.CopPlayer(vertices[item1]) for item1, _ in pairs]
+
+    results['make_move'] = measure(
+        lambda cops: [cop.make_move(location_graph, vertices[item2])
+                      for cop, (_, item2) in zip(cops, pairs)],
+        repeat, queries, setup=new_cops)
+
+    starts = part1.randomize_start(location_graph)
+    game_rng = random.Random(seed)
+
+    def new_games() -> list:
+        """Clear the path cache and return the robber and cop of each game."""
+        location_graph.path_cache.clear()
+        players = []
+        for _ in range(games):
+            target = part2.choose_target_location(starts[0], set(), location_graph, 'mid',
+                                                  game_rng)
+            players.append((part2.RobberPlayer(starts[0], target), part2.CopPlayer(starts[1])))
+        return players
+
+    results['run_game'] = measure(
+        lambda players: [part1.run_game(robber, cop, location_graph, game_rng, verbose=False)
+                         for robber, cop in players],
+        repeat, games, setup=new_games)
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a line for every benchmark that results and baseline both have, comparing their
+    median times, and mark the ones that got slower by more than tolerance (a fraction).
+    """
+    lines = []
+    for scale, benchmarks in results['results'].items():
+        for name, current in benchmarks.items():
+            previous = baseline['results'].get(scale, {}).get(name)
+            if previous is None or previous['median'] == 0:
+                continue
+            ratio = current['median'] / previous['median']
+            status = 'REGRESSION' if ratio > 1 + tolerance else 'ok'
+            lines.append(f'{scale:>6} {name:<20} {previous["median"]:12.3e} '
+                         f'{current["median"]:12.3e} {ratio:6.2f}x {status}')
+    return lines
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run the benchmarks with the given command line arguments and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0].strip())
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES,
+                        choices=list(DATA_FILES) + list(SYNTHETIC_SIZES))
+    parser.add_argument('--repeat', type=int, default=5, help='rounds per benchmark')
+    parser.add_argument('--queries', type=int, default=50, help='queries per round')
+    parser.add_argument('--games', type=int, default=20, help='games per round of run_game')
+    parser.add_argument('--seed', type=int, default=111)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results with this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='the slowdown allowed before a benchmark counts as a regression')
+    args = parser.parse_args(argv)
+
+    results = {'python': platform.python_version(), 'platform': platform.platform(),
+               'seed': args.seed, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': {}}
+    for scale in args.scales:
+        results['results'][scale] = run_scale(scale, args.repeat, args.queries, args.games,
+                                              args.seed)
+        for name, result in results['results'][scale].items():
+            print(f'{scale:>6} {name:<20} {result["median"]:12.3e} s')
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        lines = compare(results, baseline, args.tolerance)
+        print(f'{"scale":>6} {"benchmark":<20} {"baseline":>12} {"current":>12}')
+        print('\n'.join(lines))
+        if any(line.endswith('REGRESSION') for line in lines):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Command-line entry point for running batches of games without a display.
+
+main.run_program always opens a plotly chart and a matplotlib window. This runs n games
+headless instead, streams their results to a file (see game_results), and prints a one-line
+JSON summary. The plotting libraries are only imported when --plot is given. For example
+
+    python cli.py -n 100000 --robber RiskyRobberPlayer --data data/large_location_data.csv \\
+        --output results.jsonl --workers 4 --seed 111
+
+--format picks the output: 'jsonl' (one line per game), 'columnar' (a directory with one
+binary file per field), or 'summary' (no file, only the printed totals). The default is
+'jsonl' when --output is given and 'summary' otherwise.
+
+With --checkpoint (and the 'summary' format), the progress of the run is saved to the given
+file as it goes, and running the same command again after the run was stopped carries on from
+where it was (see part4.run_campaign).
+
+Every game is played on a new random graph, as part4.run_multiple_games does. The lockstep
+engine of batch_games is much faster, but only when many games share a graph, which changes
+the statistics; with one game per graph it is slower than this.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from typing import Optional
+
+import game_results
+import part4
+
+
+def make_sink(output_format: str, output: Optional[str]) -> game_results.ResultSink:
+    """Return the sink that writes results in output_format to output.
+
+    Preconditions:
+        - output_format in {'jsonl', 'columnar', 'summary'}
+        - output_format == 'summary' or output is not None
+    """
+    if output_format == 'jsonl':
+        return game_results.JsonlSink(output)
+    if output_format == 'columnar':
+        return game_results.ColumnarSink(output)
+    return game_results.SummarySink()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run the games described by the command line arguments and return the exit status."""
+    # The module docstring, example included, is the description, so its layout is kept.
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--games', type=int, default=1000, help='the number of games')
+    parser.add_argument('--robber', default='RobberPlayer',
+                        choices=['RobberPlayer', 'RiskyRobberPlayer'])
+    parser.add_argument('--data', default='data/small_location_data.csv',
+                        help='the location data set')
+    parser.add_argument('--output', help='the file (or directory, for columnar) to write to')
+    parser.add_argument('--format', choices=['jsonl', 'columnar', 'summary'],
+                        help='how to write the results')
+    parser.add_argument('--seed', type=int, help='the master seed (random if not given)')
+    parser.add_argument('--workers', type=int, default=1, help='the number of processes')
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help='the number of games per chunk handed to a process')
+    parser.add_argument('--trace-every', type=int, default=0,
+                        help='record the paths of every k-th game (0 for none)')
+    parser.add_argument('--checkpoint', help='the file to save progress to and resume from')
+    parser.add_argument('--plot', action='store_true',
+                        help='show a pie chart of the wins (needs plotly)')
+    args = parser.parse_args(argv)
+
+    output_format = args.format or ('jsonl' if args.output is not None else 'summary')
+    if output_format != 'summary' and args.output is None:
+        parser.error(f'--format {output_format} needs --output')
+    if args.checkpoint is not None and output_format != 'summary':
+        parser.error('--checkpoint only works with --format summary')
+
+    start = time.perf_counter()
+    if args.checkpoint is not None:
+        try:
+            summary = part4.run_campaign(args.games, args.robber, args.data, args.checkpoint,
+                                         args.seed, args.workers, args.chunk_size)
+        except ValueError as error:
+            parser.error(str(error))
+        summary['seconds'] = round(time.perf_counter() - start, 3)
+        print(json.dumps(summary))
+        if args.plot:
+            part4.plot_wins(args.games, summary['robber_wins'], args.robber)
+        return 0
+
+    with make_sink(output_format, args.output) as sink:
+        robber_wins = part4.count_robber_wins(args.games, args.robber, args.data, args.seed,
+                                              args.workers, args.chunk_size, sink,
+                                              args.trace_every)
+    seconds = time.perf_counter() - start
+
+    print(json.dumps({'games': sink.games, 'robber_wins': robber_wins,
+                      'reasons': dict(zip(game_results.REASON_NAMES[1:], sink.reasons[1:])),
+                      'seconds': round(seconds, 3)}))
+
+    if args.plot:
+        part4.plot_wins(args.games, robber_wins, args.robber)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
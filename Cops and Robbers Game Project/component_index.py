@@ -0,0 +1,215 @@
+"""
+A connected-component index shared by graph_vertex.Graph and csr_graph.CSRGraph.
+
+Vertex.check_connected answers "is u connected to the target" with a fresh traversal on every
+call. Since the game only ever adds edges, the components of a graph can instead be tracked
+with a union-find structure that is updated in add_edge, which turns that question into a
+near constant-time comparison of component representatives.
+
+The players also ask "is u connected to the target WITHOUT going through x". That only differs
+from plain connectivity when x is a cut vertex (articulation point) of the graph, so the index
+finds the cut vertices once per version of the graph, and for a cut vertex x labels the pieces
+its component splits into when x is removed. Both are computed lazily and thrown away whenever
+an edge is added.
+"""
+from __future__ import annotations
+from collections import Counter
+from typing import Any, Callable, Iterable, Optional
+
+
+class ComponentIndex:
+    """A union-find index over the nodes of a graph that only ever gains edges.
+
+    Nodes can be any hashable objects (graph_vertex.Vertex objects or CSRGraph ids); the index
+    reads adjacency through the neighbours function it was created with.
+
+    >>> adjacency = {1: [2], 2: [1, 3], 3: [2], 4: []}
+    >>> index = ComponentIndex(adjacency.__getitem__)
+    >>> for node in adjacency:
+    ...     index.add(node)
+    >>> index.union(1, 2)
+    >>> index.union(2, 3)
+    >>> index.same(1, 3), index.same(1, 4)
+    (True, False)
+    >>> index.connected_avoiding(1, 3, 2)
+    False
+    >>> index.connected_avoiding(2, 3, 1)
+    True
+    """
+    _neighbours: Callable[[Any], Iterable]
+    _parent: dict
+    _size: dict
+    _cut_vertices: Optional[set]
+    _split_labels: dict
+
+    def __init__(self, neighbours: Callable[[Any], Iterable]) -> None:
+        """Initialize an empty index that reads adjacency through neighbours."""
+        self._neighbours = neighbours
+        self._parent = {}
+        self._size = {}
+        self._cut_vertices = None
+        self._split_labels = {}
+
+    def add(self, node: Any) -> None:
+        """Add node to the index as a component of its own."""
+        if node not in self._parent:
+            self._parent[node] = node
+            self._size[node] = 1
+
+    def load(self, representatives: Iterable) -> None:
+        """Replace the components with the ones given by representatives, which lists for each
+        node 0, 1, 2, ... the node representing its component (a node it is connected to that
+        represents itself).
+
+        This lets a graph that is built in bulk (see csr_graph.CSRGraph.add_id_edges) compute
+        its components in one pass instead of one union per edge.
+
+        >>> index = ComponentIndex(lambda node: [])
+        >>> index.load([0, 0, 2, 0])
+        >>> index.same(1, 3), index.same(1, 2)
+        (True, False)
+        """
+        self._cut_vertices = None
+        self._split_labels = {}
+        self._parent = dict(enumerate(representatives))
+        self._size = dict(Counter(self._parent.values()))
+
+    def find(self, node: Any) -> Any:
+        """Return the representative of the component containing node."""
+        parent = self._parent
+        while parent[node] != node:
+            # Path halving: point every other node on the way at its grandparent.
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, node1: Any, node2: Any) -> None:
+        """Record that an edge was added between node1 and node2."""
+        self._cut_vertices = None
+        self._split_labels = {}
+
+        root1, root2 = self.find(node1), self.find(node2)
+        if root1 == root2:
+            return
+        if self._size[root1] < self._size[root2]:
+            root1, root2 = root2, root1
+        self._parent[root2] = root1
+        self._size[root1] += self._size[root2]
+
+    def same(self, node1: Any, node2: Any) -> bool:
+        """Return whether node1 and node2 are in the same component."""
+        return self.find(node1) == self.find(node2)
+
+    def is_cut_vertex(self, node: Any) -> bool:
+        """Return whether removing node would split its component."""
+        if self._cut_vertices is None:
+            self._cut_vertices = self._find_cut_vertices()
+        return node in self._cut_vertices
+
+    def labels_without(self, excluded: Any) -> dict:
+        """Return a dictionary that labels every node in the component of excluded (other than
+        excluded, which is labelled None) so that two nodes share a label exactly when they are
+        still connected once excluded is removed.
+
+        The labels are cached until the next union, so the returned dictionary must not be
+        modified.
+        """
+        if excluded not in self._split_labels:
+            self._split_labels[excluded] = self._label_without(excluded)
+        return self._split_labels[excluded]
+
+    def connected_avoiding(self, node: Any, target: Any, excluded: Any) -> bool:
+        """Return whether node is connected to target by a path that does not use excluded.
+
+        This agrees with Vertex.check_connected(target, {excluded}): a node is always connected
+        to itself, and otherwise no path may pass through (or end at) excluded.
+        """
+        if node == target:
+            return True
+        if target == excluded or not self.same(node, target):
+            return False
+        if node == excluded or not self.same(node, excluded) \
+                or not self.is_cut_vertex(excluded):
+            return True
+
+        labels = self.labels_without(excluded)
+        return labels[node] == labels[target]
+
+    def _label_without(self, excluded: Any) -> dict:
+        """Return a label for every node in the component of excluded (other than excluded)
+        such that two nodes share a label exactly when they are still connected once excluded
+        is removed.
+        """
+        neighbours = self._neighbours
+        labels = {excluded: None}
+        for label, start in enumerate(neighbours(excluded)):
+            if start in labels:
+                continue
+            labels[start] = label
+            stack = [start]
+            while stack:
+                u = stack.pop()
+                for w in neighbours(u):
+                    if w not in labels:
+                        labels[w] = label
+                        stack.append(w)
+        return labels
+
+    def _find_cut_vertices(self) -> set:
+        """Return the set of cut vertices of the graph, using an iterative version of Tarjan's
+        low-link algorithm.
+        """
+        neighbours = self._neighbours
+        discovered = {}
+        low = {}
+        cut_vertices = set()
+
+        for root in self._parent:
+            if root in discovered:
+                continue
+            discovered[root] = low[root] = len(discovered)
+            root_children = 0
+            stack = [(root, None, iter(neighbours(root)))]
+
+            while stack:
+                u, parent, remaining = stack[-1]
+                descended = False
+                for w in remaining:
+                    if w not in discovered:
+                        discovered[w] = low[w] = len(discovered)
+                        stack.append((w, u, iter(neighbours(w))))
+                        descended = True
+                        break
+                    elif w != parent:
+                        low[u] = min(low[u], discovered[w])
+
+                if not descended:
+                    stack.pop()
+                    if parent is None:
+                        continue
+                    low[parent] = min(low[parent], low[u])
+                    if parent == root:
+                        root_children += 1
+                    elif low[u] >= discovered[parent]:
+                        cut_vertices.add(parent)
+
+            if root_children > 1:
+                cut_vertices.add(root)
+
+        return cut_vertices
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['collections']
+    })
@@ -0,0 +1,199 @@
+"""
+Cop-win solver: which (cop, robber) starting pairs the cop can always win from.
+
+run_multiple_games only estimates how often the cop wins, and only against the cop strategy
+of part2.CopPlayer. This module answers the exact question for a location graph: from a given
+cop location and robber location, can a cop that plays perfectly catch the robber no matter
+how the robber moves?
+
+The game solved follows the moves of part1.run_game:
+    - The robber moves first, and must move to a neighbour of its location, which (as for the
+      robber's first move in part2) may not have a score above max_robber_score. A robber with
+      no such neighbour is cornered and loses, as in part1.run_game.
+    - The cop then moves to a neighbour of its location or stays where it is, as part2.CopPlayer
+      does when none of its neighbours qualify.
+    - The cop catches the robber by landing on it, or when the robber moves onto the cop.
+
+The solver uses retrograde analysis (backward induction) instead of searching the game tree.
+wins[c, r] marks the states, with the robber to move, that the cop wins from within k robber
+moves. It starts from the states the cop has already won (k = 0), and each round takes one
+step backwards:
+    1. After the robber has moved to r', the cop at c wins within k - 1 more moves if some
+       location the cop can reach from c (including c itself) is r' or wins against r'.
+    2. The cop wins from (c, r) within k moves if every move of the robber from r leads to a
+       state that step 1 marked.
+Both steps are "any neighbour" reductions, which run on rows of bits packed eight to a byte.
+A state is given the first round it is won in. The rounds stop at move_limit, or at the first
+round that adds no new state. After that round, no further round adds any, so every state
+left is one the robber can escape from forever.
+"""
+from __future__ import annotations
+from typing import Any, Optional, Union
+
+import numpy as np
+
+import csr_graph
+import graph_vertex
+import path_planner
+
+# The round stored for a state the cop cannot force a win from.
+NEVER = np.iinfo(np.uint16).max
+
+
+class CopWinTable:
+    """The solved cop-win rounds of every (cop, robber) starting pair of a location graph.
+
+    Instance Attributes:
+        - ids: maps each item of the graph to its id, the index of its row and column
+        - rounds: rounds[c, r] is the number of robber moves within which a perfect cop at c
+          catches a robber at r (the robber moves first), or NEVER if the cop cannot force a
+          win within the solved horizon
+        - horizon: the move limit the table was solved up to, or None if every state was
+          solved, so that a NEVER means the robber can escape forever
+
+    Representation Invariants:
+        - self.rounds.shape == (len(self.ids), len(self.ids))
+    """
+    ids: dict[Any, int]
+    rounds: np.ndarray
+    horizon: Optional[int]
+
+    def __init__(self, ids: dict[Any, int], rounds: np.ndarray, horizon: Optional[int]) -> None:
+        """Initialize a table from its solved rounds."""
+        self.ids = ids
+        self.rounds = rounds
+        self.horizon = horizon
+
+    def capture_rounds(self, cop_item: Any, robber_item: Any) -> Optional[int]:
+        """Return the number of robber moves within which a perfect cop at cop_item catches a
+        robber at robber_item, or None if the cop cannot force a win within the horizon.
+        """
+        rounds = int(self.rounds[self.ids[cop_item], self.ids[robber_item]])
+        return None if rounds == NEVER else rounds
+
+    def cop_wins(self, cop_item: Any, robber_item: Any,
+                 move_limit: Optional[int] = None) -> Optional[bool]:
+        """Return whether a perfect cop at cop_item can catch a robber at robber_item within
+        move_limit robber moves, or at all if move_limit is None.
+
+        Return None if the table does not know the answer, because move_limit goes beyond the
+        horizon the table was solved up to.
+        """
+        rounds = self.capture_rounds(cop_item, robber_item)
+        if rounds is not None and (move_limit is None or rounds <= move_limit):
+            return True
+        if self.horizon is None or (move_limit is not None and move_limit <= self.horizon):
+            return False
+        return None
+
+    def cop_win_pairs(self, move_limit: Optional[int] = None) -> np.ndarray:
+        """Return a boolean array whose entry [c, r] says whether the cop wins from the pair of
+        ids (c, r) within move_limit robber moves, or at all if move_limit is None.
+        """
+        if move_limit is None:
+            return self.rounds != NEVER
+        return self.rounds <= move_limit
+
+
+def solve(location_graph: Union[graph_vertex.Graph, csr_graph.CSRGraph],
+          move_limit: Optional[int] = None,
+          max_robber_score: Optional[int] = path_planner.SAFE_SCORE) -> CopWinTable:
+    """Solve the cop-win game on location_graph for every (cop, robber) starting pair.
+
+    If move_limit is given, the cop must win within move_limit robber moves. The robber may not
+    move to a location with a score above max_robber_score, unless it is None.
+
+    >>> g = graph_vertex.Graph()
+    >>> for item, score in [('a', 3), ('b', 7), ('c', 4), ('d', 2), ('e', 1)]:
+    ...     g.add_vertex(item, 'park', score)
+    >>> for edge in [('a', 'b'), ('b', 'c'), ('d', 'e')]:
+    ...     g.add_edge(*edge)
+    >>> table = solve(g, max_robber_score=None)
+    >>> table.capture_rounds('a', 'c'), table.capture_rounds('a', 'd')
+    (1, None)
+    >>> table.cop_wins('a', 'c', move_limit=0), table.cop_wins('a', 'd')
+    (False, False)
+    >>> solve(g).capture_rounds('a', 'c')  # the robber at 'c' may not move to 'b'
+    0
+    >>> bounded = solve(g, move_limit=1, max_robber_score=None)
+    >>> bounded.cop_wins('a', 'd', move_limit=1), bounded.cop_wins('a', 'd', move_limit=5)
+    (False, None)
+    """
+    if not isinstance(location_graph, csr_graph.CSRGraph):
+        location_graph = csr_graph.CSRGraph.from_graph(location_graph)
+    n = len(location_graph.items)
+    offsets = np.frombuffer(location_graph.offsets(), dtype=np.int64)
+    targets = np.frombuffer(location_graph.targets(), dtype=np.int32).astype(np.int64)
+    sources = np.repeat(np.arange(n), np.diff(offsets))
+    scores = np.frombuffer(location_graph.scores, dtype=np.int8)
+
+    # The cop may stay where it is, so every cop segment starts with the cop's own location.
+    cop_rows, cop_starts = _segments(n, sources, targets, np.arange(n))
+    # Every robber segment starts with row n, which is all zeros, so no segment is empty and a
+    # cornered robber has no escape.
+    allowed = np.ones(len(targets), dtype=bool) if max_robber_score is None \
+        else scores[targets] <= max_robber_score
+    robber_rows, robber_starts = _segments(n, sources[allowed], targets[allowed],
+                                           np.full(n, n))
+    cornered = np.bincount(sources[allowed], minlength=n) == 0
+
+    identity = np.eye(n, dtype=bool)
+    wins = identity | cornered[np.newaxis, :]
+    rounds = np.full((n, n), NEVER, dtype=np.uint16)
+    rounds[wins] = 0
+    no_moves = np.zeros((1, (n + 7) // 8), dtype=np.uint8)
+
+    horizon = move_limit
+    k = 0
+    while move_limit is None or k < move_limit:
+        k += 1
+        # Step 1: caught[c, r'] is whether the cop at c wins once the robber has moved to r'.
+        reach = np.packbits(wins | identity, axis=1)
+        caught = np.bitwise_or.reduceat(reach[cop_rows], cop_starts, axis=0)
+        # Step 2: escape[r, c] is whether the robber at r has a move that step 1 did not mark.
+        safe = np.packbits(np.unpackbits(~caught, axis=1, count=n).T, axis=1)
+        safe = np.concatenate((safe, no_moves))
+        escape = np.bitwise_or.reduceat(safe[robber_rows], robber_starts, axis=0)
+        new_wins = ~np.unpackbits(escape, axis=1, count=n).astype(bool).T | identity
+
+        added = new_wins & ~wins
+        if not added.any():
+            horizon = None
+            break
+        rounds[added] = k
+        wins = new_wins
+        if k == NEVER - 1:
+            horizon = k
+            break
+
+    ids = dict(location_graph.ids)
+    return CopWinTable(ids, rounds, horizon)
+
+
+def _segments(n: int, sources: np.ndarray, targets: np.ndarray,
+              firsts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return (rows, starts) laying out, for each vertex v in order, firsts[v] followed by the
+    targets of the edges with source v, in the form np.bitwise_or.reduceat expects.
+    """
+    all_sources = np.concatenate((np.arange(n), sources))
+    order = np.argsort(all_sources, kind='stable')
+    rows = np.concatenate((firsts, targets))[order]
+    starts = np.zeros(n, dtype=np.int64)
+    np.cumsum(np.bincount(all_sources, minlength=n)[:-1], out=starts[1:])
+    return rows, starts
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['numpy', 'csr_graph', 'graph_vertex', 'path_planner']
+    })
@@ -0,0 +1,896 @@
+"""
+A compact, array-backed alternative to graph_vertex.Graph for Cops and Robbers.
+
+graph_vertex.Graph stores one Vertex object per location, each with its own Python set of
+neighbour objects. CSRGraph instead interns every location name to an integer id once and keeps
+the adjacency of the whole graph in two flat arrays in compressed sparse row (CSR) form:
+
+    - _offsets[i] .. _offsets[i + 1] is the slice of _targets holding the neighbours of vertex i
+    - _targets holds the neighbour ids of every vertex, one after the other
+
+The kind and score of every vertex are stored in parallel typed arrays indexed by the same ids.
+
+CSRGraph keeps the public API of graph_vertex.Graph (add_vertex, add_edge, adjacent,
+get_neighbours, get_all_vertices, edges_list, assign_random_edges and get_path), and its vertices
+attribute hands out light-weight CSRVertex views, so part1, part2 and part3 run on either backend.
+"""
+
+from __future__ import annotations
+import csv
+import random
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from itertools import islice
+from typing import Any, Collection, Iterable, Iterator, Optional
+
+import graph_vertex
+from component_index import ComponentIndex
+from degree_index import DegreeIndex
+from kind_index import KindIndex
+from memory_usage import deep_size
+from path_cache import PathCache
+
+
+class CSRVertex:
+    """A read-only view of a single vertex of a CSRGraph.
+
+    A view has the same attributes and traversal methods as graph_vertex.Vertex, but holds no
+    data of its own: everything is read from the arrays of the graph it belongs to.
+
+    Instance Attributes:
+        - graph: the CSRGraph this vertex belongs to
+        - id: the integer id of this vertex in graph
+    """
+    __slots__ = ('graph', 'id')
+    graph: CSRGraph
+    id: int
+
+    def __init__(self, graph: CSRGraph, vertex_id: int) -> None:
+        """Initialize a view of the vertex with the given id in graph."""
+        self.graph = graph
+        self.id = vertex_id
+
+    @property
+    def item(self) -> Any:
+        """The name of the location stored in this vertex."""
+        return self.graph.items[self.id]
+
+    @property
+    def index(self) -> int:
+        """The position of this vertex in its graph, as for graph_vertex.Vertex.index."""
+        return self.id
+
+    @property
+    def kind(self) -> str:
+        """The kind of location stored in this vertex."""
+        return self.graph.kind_names[self.graph.kinds[self.id]]
+
+    @property
+    def score(self) -> int:
+        """The score of the location stored in this vertex."""
+        return self.graph.scores[self.id]
+
+    @property
+    def neighbours(self) -> frozenset[CSRVertex]:
+        """The vertices that are adjacent to this vertex.
+
+        The set holds the graph's own views of the neighbours (see CSRGraph.view), so making it
+        allocates no views. It is iterated in the same order as the neighbours of the same
+        vertex of a graph_vertex.Graph, so games go the same way on either backend.
+        """
+        view = self.graph.view
+        return frozenset(view(u) for u in self.graph.neighbour_ids(self.id))
+
+    def degree(self) -> int:
+        """Return the degree of this vertex.
+
+        >>> g = CSRGraph()
+        >>> g.add_vertex('Citi Field', 'tourist spot', 5)
+        >>> g.add_vertex('Owls Head Park', 'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.vertices['Citi Field'].degree()
+        1
+        """
+        offsets = self.graph.offsets()
+        return offsets[self.id + 1] - offsets[self.id]
+
+    def check_connected(self, target_item: Any, visited: set) -> bool:
+        """Return whether this vertex is connected to a vertex corresponding to the target_item,
+        WITHOUT using any of the vertices in visited.
+
+        Unlike graph_vertex.Vertex.check_connected, this traversal is iterative, so it does not
+        run into the recursion limit on large graphs.
+
+        Preconditions:
+            - self not in visited
+        """
+        graph = self.graph
+        if target_item not in graph.ids:
+            return False
+        target = graph.ids[target_item]
+        epoch = graph._search(self.id, (target,), [vertex.id for vertex in visited])
+        return graph._stamp[target] == epoch
+
+    def connected_distance(self, target_item: Any, visited: set) -> Optional[list]:
+        """Return a path of items that connects self and target_item WITHOUT using any of the
+        vertices in visited. Return None if no such path is found.
+        """
+        graph = self.graph
+        excluded = {vertex.id for vertex in visited}
+        if target_item not in graph.ids:
+            return None
+        return graph.path_between_ids(self.id, graph.ids[target_item], excluded)
+
+    def __eq__(self, other: Any) -> bool:
+        """Return whether other is a view of the same vertex of the same graph."""
+        return isinstance(other, CSRVertex) and other.graph is self.graph and other.id == self.id
+
+    def __hash__(self) -> int:
+        """Return a hash consistent with __eq__.
+
+        Like graph_vertex.Vertex, a view hashes by its position in the graph so that sets of
+        views are iterated in the same order in every process.
+        """
+        return self.id
+
+    def __repr__(self) -> str:
+        """Return a representation of this view for debugging."""
+        return f'CSRVertex({self.item!r})'
+
+
+class _VertexTable(Mapping):
+    """A read-only mapping from items to the CSRVertex views of a CSRGraph.
+
+    This lets callers written against graph_vertex.Graph keep using graph.vertices[item].
+    """
+    _graph: CSRGraph
+
+    def __init__(self, graph: CSRGraph) -> None:
+        """Initialize a mapping to the views of the vertices of graph."""
+        self._graph = graph
+
+    def __getitem__(self, item: Any) -> CSRVertex:
+        """Return the view of the vertex of item, raising a KeyError if there is none."""
+        return self._graph.view(self._graph.ids[item])
+
+    def __contains__(self, item: Any) -> bool:
+        """Return whether item is the item of a vertex of the graph."""
+        return item in self._graph.ids
+
+    def __iter__(self) -> Iterator:
+        """Iterate over the items of the graph, in order of id."""
+        return iter(self._graph.items)
+
+    def __len__(self) -> int:
+        """Return the number of vertices of the graph."""
+        return len(self._graph.items)
+
+
+class CSRGraph:
+    """A graph whose adjacency is stored in compressed sparse row form.
+
+    Edges added with add_edge are buffered and merged into the CSR arrays the next time the
+    adjacency is read, so building a graph edge by edge stays cheap.
+
+    Instance Attributes:
+        - ids: maps each item to its integer id
+        - items: the item of each id
+        - kinds: the kind code of each id, an index into kind_names
+        - scores: the score of each id
+        - kind_names: the kind string of each kind code
+
+    Representation Invariants:
+        - len(self.items) == len(self.ids) == len(self.kinds) == len(self.scores)
+        - all(self.ids[self.items[i]] == i for i in range(len(self.items)))
+    """
+    ids: dict[Any, int]
+    items: list
+    kinds: array
+    scores: array
+    kind_names: list[str]
+    _kind_codes: dict[str, int]
+    _offsets: array
+    _targets: array
+    _pending: array
+    path_cache: PathCache
+    _components: ComponentIndex
+    _degrees: Optional[DegreeIndex]
+    _kind_index: Optional[KindIndex]
+    _stamp: array
+    _parent: array
+    _epoch: int
+    _reached: int
+    _views: list[CSRVertex]
+
+    def __init__(self) -> None:
+        """Initialize an empty graph (no vertices or edges)."""
+        self.ids = {}
+        self.items = []
+        self.kinds = array('B')
+        self.scores = array('b')
+        self.kind_names = []
+        self._kind_codes = {}
+        self._offsets = array('q', [0])
+        self._targets = array('i')
+        self._pending = array('i')
+        # Remembers planned paths until the next edge is added, see get_path.
+        self.path_cache = PathCache()
+        self._components = ComponentIndex(self.neighbour_ids)
+        # Buckets the vertices by degree, built from the offsets on first use after a change,
+        # see highest_degree.
+        self._degrees = None
+        # Lists the ids by kind and score band, built on first use, see sample.
+        self._kind_index = None
+        # Scratch arrays reused by every shortest-path search, see _search.
+        self._stamp = array('q')
+        self._parent = array('i')
+        self._epoch = 0
+        # The number of vertices the last search reached, read by instrumentation.
+        self._reached = 0
+        # The view of each id, made on first use, see view.
+        self._views = []
+
+    @property
+    def vertices(self) -> _VertexTable:
+        """A mapping from each item to a view of its vertex, like graph_vertex.Graph.vertices."""
+        return _VertexTable(self)
+
+    @classmethod
+    def from_graph(cls, graph: graph_vertex.Graph) -> CSRGraph:
+        """Return a CSRGraph with the same vertices and edges as the given graph_vertex.Graph.
+
+        >>> g = graph_vertex.Graph()
+        >>> g.add_vertex('Citi Field', 'tourist spot', 5)
+        >>> g.add_vertex('Owls Head Park', 'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> CSRGraph.from_graph(g).get_neighbours('Citi Field')
+        {'Owls Head Park'}
+        """
+        csr = cls()
+        for v in graph.vertices.values():
+            csr.add_vertex(v.item, v.kind, v.score)
+        for v in graph.vertices.values():
+            for u in v.neighbours:
+                csr.add_edge(v.item, u.item)
+        return csr
+
+    @classmethod
+    def from_arrays(cls, items: list, kinds: list[str], scores: Iterable[int],
+                    edges: Any = ()) -> CSRGraph:
+        """Return a CSRGraph whose vertex with id i has item items[i], kind kinds[i] and score
+        scores[i], with the given edges between ids (see add_id_edges).
+
+        This fills the arrays directly instead of calling add_vertex for every vertex, so it is
+        the way to build very large graphs.
+
+        >>> g = CSRGraph.from_arrays(['a', 'b', 'c'], ['park', 'park', 'health'], [3, 3, 7],
+        ...                          [(0, 1), (2, 1)])
+        >>> g.get_neighbours('b') == {'a', 'c'}, g.vertices['c'].kind
+        (True, 'health')
+        """
+        graph = cls()
+        graph.items = list(items)
+        graph.ids = dict(zip(graph.items, range(len(graph.items))))
+        graph.kind_names = sorted(set(kinds))
+        graph._kind_codes = {kind: code for code, kind in enumerate(graph.kind_names)}
+        graph.kinds = array('B', map(graph._kind_codes.__getitem__, kinds))
+        graph.scores = array('b', scores)
+        graph._offsets = array('q', bytes(8 * (len(graph.items) + 1)))
+        graph.add_id_edges(edges)
+        return graph
+
+    def view(self, vertex_id: int) -> CSRVertex:
+        """Return a CSRVertex view of the vertex with the given id.
+
+        The views are made the first time one of them is asked for and then kept, so the
+        planner and the cop, which read the neighbours of a vertex in their inner loops, get
+        the same view objects every time instead of allocating new ones.
+
+        >>> g = CSRGraph.from_arrays(['a', 'b'], ['park'] * 2, [3] * 2, [(0, 1)])
+        >>> g.view(1) is g.view(1) is next(iter(g.vertices['a'].neighbours))
+        True
+        """
+        views = self._views
+        if vertex_id >= len(views):
+            views.extend(CSRVertex(self, u) for u in range(len(views), len(self.items)))
+        return views[vertex_id]
+
+    def add_vertex(self, item: Any, kind: str, score: int) -> None:
+        """Add a vertex with the given item, kind and score to this graph.
+
+        The new vertex is not adjacent to any other vertices.
+        Do nothing if the given item is already in this graph.
+        """
+        if item in self.ids:
+            return
+        if kind not in self._kind_codes:
+            self._kind_codes[kind] = len(self.kind_names)
+            self.kind_names.append(kind)
+
+        vertex_id = len(self.items)
+        self.ids[item] = vertex_id
+        self.items.append(item)
+        self.kinds.append(self._kind_codes[kind])
+        self.scores.append(score)
+        # A new vertex has no neighbours, so its row is empty.
+        self._offsets.append(self._offsets[-1])
+        self._components.add(vertex_id)
+        self._degrees = None
+        if self._kind_index is not None:
+            self._kind_index.add(vertex_id, kind, score)
+
+    def add_edge(self, item1: Any, item2: Any) -> None:
+        """Add an edge between the two vertices with the given items in this graph.
+
+        Raise a ValueError if item1 or item2 do not appear as vertices in this graph.
+
+        Preconditions:
+            - item1 != item2
+        """
+        if item1 in self.ids and item2 in self.ids:
+            self._pending.append(self.ids[item1])
+            self._pending.append(self.ids[item2])
+            self._components.union(self.ids[item1], self.ids[item2])
+            self.path_cache.clear()
+            self._degrees = None
+        else:
+            raise ValueError
+
+    def add_id_edges(self, edges: Any) -> None:
+        """Add every edge in edges, a sequence of (id, id) pairs or a NumPy array of shape
+        (E, 2), to this graph. Loops and edges already in the graph are dropped.
+
+        Unlike add_edge, this merges the edges into the CSR arrays and recomputes the
+        components with NumPy, without any per-edge Python work.
+        """
+        import numpy as np
+
+        n = len(self.items)
+        new = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        offsets = np.frombuffer(self.offsets(), dtype=np.int64)
+        targets = np.frombuffer(self._targets, dtype=np.int32).astype(np.int64)
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+
+        new = new[new[:, 0] != new[:, 1]]
+        codes = np.concatenate((sources * n + targets, new[:, 0] * n + new[:, 1],
+                                new[:, 1] * n + new[:, 0]))
+        codes.sort()
+        distinct = np.ones(len(codes), dtype=bool)
+        distinct[1:] = codes[1:] != codes[:-1]
+        codes = codes[distinct]
+        sources, targets = np.divmod(codes, n)
+        new_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=new_offsets[1:])
+
+        self._offsets = array('q', new_offsets.tobytes())
+        self._targets = array('i', targets.astype(np.int32).tobytes())
+        forward = sources < targets
+        self._components.load(_component_roots(n, sources[forward], targets[forward]).tolist())
+        self.path_cache.clear()
+        self._degrees = None
+
+    def _compact(self) -> None:
+        """Merge the buffered edges into the CSR arrays, dropping duplicate edges."""
+        n = len(self.items)
+        offsets, targets, pending = self._offsets, self._targets, self._pending
+
+        codes = set()
+        for u in range(n):
+            base = u * n
+            for i in range(offsets[u], offsets[u + 1]):
+                codes.add(base + targets[i])
+        for i in range(0, len(pending), 2):
+            u, v = pending[i], pending[i + 1]
+            codes.add(u * n + v)
+            codes.add(v * n + u)
+
+        new_offsets = array('q', bytes(8 * (n + 1)))
+        new_targets = array('i')
+        for code in sorted(codes):
+            u, v = divmod(code, n)
+            new_offsets[u + 1] += 1
+            new_targets.append(v)
+        for u in range(n):
+            new_offsets[u + 1] += new_offsets[u]
+
+        self._offsets, self._targets, self._pending = new_offsets, new_targets, array('i')
+
+    def offsets(self) -> array:
+        """Return the CSR offset array, merging any buffered edges first."""
+        if self._pending:
+            self._compact()
+        return self._offsets
+
+    def targets(self) -> array:
+        """Return the CSR neighbour array, merging any buffered edges first."""
+        if self._pending:
+            self._compact()
+        return self._targets
+
+    def neighbour_ids(self, vertex_id: int) -> memoryview:
+        """Return the ids of the neighbours of the vertex with the given id, in increasing order.
+
+        The ids are a read-only memoryview of the vertex's slice of the neighbour array, so no
+        ids are copied. Merging buffered edges replaces the array rather than changing it, so a
+        view keeps showing the neighbours the vertex had when it was made.
+        """
+        offsets = self.offsets()
+        return memoryview(self._targets).toreadonly()[offsets[vertex_id]:offsets[vertex_id + 1]]
+
+    def components(self) -> ComponentIndex:
+        """Return the component index of this graph, which add_edge keeps up to date."""
+        return self._components
+
+    def highest_degree(self, k: int) -> list[CSRVertex]:
+        """Return views of the k vertices of this graph with the most neighbours, as
+        graph_vertex.Graph.highest_degree does.
+
+        Edges are buffered here, so rather than being updated edge by edge, the degree index is
+        built from the offsets (in one pass, without sorting) the first time it is used after
+        the graph changes.
+
+        >>> g = CSRGraph.from_arrays(['a', 'b', 'c'], ['park'] * 3, [3] * 3, [(0, 1), (0, 2)])
+        >>> [vertex.item for vertex in g.highest_degree(2)], g.degree_histogram()
+        (['a', 'c'], [0, 2, 1])
+        """
+        items = self.items
+        return [self.view(vertex_id)
+                for vertex_id in self._degree_index().top(k, key=items.__getitem__)]
+
+    def degree_histogram(self) -> list[int]:
+        """Return a list whose element d is the number of vertices of this graph with d
+        neighbours, up to the highest degree in the graph.
+        """
+        return self._degree_index().histogram()
+
+    def memory_footprint(self) -> dict[str, int]:
+        """Return the number of bytes this graph uses for its 'vertices' (the ids and items and
+        the kind and score arrays), its 'adjacency' (the CSR arrays and the buffered edges),
+        and its 'indexes', along with their 'total', as graph_vertex.Graph.memory_footprint
+        does.
+
+        >>> g = CSRGraph.from_arrays(['a', 'b', 'c'], ['park'] * 3, [3] * 3, [(0, 1), (0, 2)])
+        >>> report = g.memory_footprint()
+        >>> list(report), report['total'] == sum(list(report.values())[:3])
+        (['vertices', 'adjacency', 'indexes', 'total'], True)
+        """
+        seen = {id(self)}
+        report = {}
+        report['vertices'] = sum(deep_size(part, seen) for part in (
+            self.ids, self.items, self.kinds, self.scores, self.kind_names, self._kind_codes))
+        report['adjacency'] = sum(deep_size(part, seen) for part in (
+            self._offsets, self._targets, self._pending))
+        report['indexes'] = sum(deep_size(index, seen) for index in (
+            self._components, self._degrees, self._kind_index, self.path_cache, self._stamp,
+            self._parent, self._views))
+        report['total'] = report['vertices'] + report['adjacency'] + report['indexes']
+        return report
+
+    def _degree_index(self) -> DegreeIndex:
+        """Return the degree index of this graph, building it if the graph has changed."""
+        if self._degrees is None:
+            offsets = self.offsets()
+            self._degrees = DegreeIndex()
+            self._degrees.load(offsets[i + 1] - offsets[i] for i in range(len(self.items)))
+        return self._degrees
+
+    def adjacent(self, item1: Any, item2: Any) -> bool:
+        """Return whether item1 and item2 are adjacent vertices in this graph.
+
+        Return False if item1 or item2 do not appear as vertices in this graph.
+        """
+        if item1 in self.ids and item2 in self.ids:
+            return self.adjacent_ids(self.ids[item1], self.ids[item2])
+        else:
+            return False
+
+    def adjacent_ids(self, id1: int, id2: int) -> bool:
+        """Return whether the vertices with the ids id1 and id2 are adjacent.
+
+        The neighbours of each vertex are stored in increasing order, so this is a binary
+        search of the neighbours of id1.
+
+        Preconditions:
+            - 0 <= id1 < len(self.items) and 0 <= id2 < len(self.items)
+
+        >>> g = CSRGraph.from_arrays(['a', 'b', 'c'], ['park'] * 3, [3] * 3, [(0, 1), (0, 2)])
+        >>> g.adjacent_ids(0, 2), g.adjacent_ids(1, 2), list(g.neighbour_ids(0))
+        (True, False, [1, 2])
+        """
+        offsets = self.offsets()
+        end = offsets[id1 + 1]
+        position = bisect_left(self._targets, id2, offsets[id1], end)
+        return position < end and self._targets[position] == id2
+
+    def connected(self, item1: Any, item2: Any) -> bool:
+        """Return whether item1 and item2 are connected by a path in this graph.
+
+        See graph_vertex.Graph.connected.
+        """
+        if item1 in self.ids and item2 in self.ids:
+            return self._components.same(self.ids[item1], self.ids[item2])
+        else:
+            return False
+
+    def connected_avoiding(self, item1: Any, item2: Any, excluded: Any) -> bool:
+        """Return whether item1 is connected to item2 by a path that does not use the vertex
+        excluded.
+
+        See graph_vertex.Graph.connected_avoiding.
+
+        >>> g = CSRGraph()
+        >>> g.add_vertex('Citi Field', 'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park', 'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park', 'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.add_edge('Owls Head Park', 'Fort Tryon Park')
+        >>> g.connected_avoiding('Citi Field', 'Fort Tryon Park', 'Owls Head Park')
+        False
+        """
+        if item1 in self.ids and item2 in self.ids and excluded in self.ids:
+            return self._components.connected_avoiding(self.ids[item1], self.ids[item2],
+                                                       self.ids[excluded])
+        else:
+            return False
+
+    def connected_avoiding_ids(self, id1: int, id2: int, excluded: int) -> bool:
+        """Return whether the vertex with id id1 is connected to the vertex with id id2 by a
+        path that does not use the vertex with id excluded.
+
+        See graph_vertex.Graph.connected_avoiding_ids.
+        """
+        return self._components.connected_avoiding(id1, id2, excluded)
+
+    def get_neighbours(self, item: Any) -> set:
+        """Return a set of the neighbours of the given item.
+
+        Raise a ValueError if item does not appear as a vertex in this graph.
+        """
+        if item in self.ids:
+            items = self.items
+            return {items[u] for u in self.neighbour_ids(self.ids[item])}
+        else:
+            raise ValueError
+
+    def get_all_vertices(self, kind: str = '') -> set:
+        """Return a set of all vertex items in this graph.
+
+        If kind != '', only return the items of the given vertex kind.
+
+        >>> g = CSRGraph()
+        >>> g.add_vertex('Citi Field', 'tourist spot', 5)
+        >>> g.add_vertex('Owls Head Park', 'park', 3)
+        >>> g.get_all_vertices('park')
+        {'Owls Head Park'}
+        """
+        if kind != '':
+            items = self.items
+            return {items[i] for i in self._kinds().members(kind)}
+        else:
+            return set(self.items)
+
+    def sample(self, excluded: Collection = (), kind: Optional[str] = None,
+               band: Optional[str] = None, rng: Optional[random.Random] = None,
+               attempts: Optional[int] = None) -> Optional[CSRVertex]:
+        """Return a view of a vertex drawn uniformly at random from the vertices of the given
+        kind in the given score band that are not in excluded (a collection of views), as
+        graph_vertex.Graph.sample does.
+
+        >>> g = CSRGraph.from_arrays(['a', 'b', 'c'], ['park', 'health', 'park'], [3, 7, 3])
+        >>> g.sample({g.vertices['a']}, kind='park', rng=random.Random(0), attempts=10).item
+        'c'
+        """
+        choice = random.choice if rng is None else rng.choice
+        excluded_ids = {vertex.id for vertex in excluded}
+        vertex_id = self._kinds().sample(choice, kind, band, excluded_ids, attempts)
+        return None if vertex_id is None else self.view(vertex_id)
+
+    def _kinds(self) -> KindIndex:
+        """Return the kind index of this graph, building it the first time it is needed (so
+        that from_arrays does not pay for it when it is never used).
+        """
+        if self._kind_index is None:
+            self._kind_index = KindIndex()
+            kind_names = self.kind_names
+            for vertex_id, (code, score) in enumerate(zip(self.kinds, self.scores)):
+                self._kind_index.add(vertex_id, kind_names[code], score)
+        return self._kind_index
+
+    def iter_edges(self) -> Iterator[tuple]:
+        """Yield every edge of this graph exactly once, as a size 2 tuple of its vertex items."""
+        offsets, targets, items = self.offsets(), self.targets(), self.items
+        for u in range(len(items)):
+            for i in range(offsets[u], offsets[u + 1]):
+                if u < targets[i]:
+                    yield (items[u], items[targets[i]])
+
+    def edges_list(self) -> list:
+        """Return a list of all the edges in this graph, each as a size 2 tuple of items.
+
+        >>> g = CSRGraph()
+        >>> g.add_vertex('Citi Field', 'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park', 'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park', 'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.add_edge('Citi Field', 'Fort Tryon Park')
+        >>> g.edges_list()
+        [('Citi Field', 'Fort Tryon Park'), ('Citi Field', 'Owls Head Park')]
+        """
+        return list(self.iter_edges())
+
+    def edge_arrays(self) -> tuple:
+        """Return (items, edges), where edges is a NumPy integer array of shape (E, 2) whose rows
+        are the edges of this graph as pairs of ids, as in graph_vertex.Graph.edge_arrays.
+
+        The rows are read straight out of the CSR arrays without building any tuples.
+
+        >>> g = CSRGraph()
+        >>> g.add_vertex('Citi Field', 'tourist spot', 5)
+        >>> g.add_vertex('Owls Head Park', 'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.edge_arrays()[1].tolist()
+        [[0, 1]]
+        """
+        import numpy as np
+
+        offsets = np.frombuffer(self.offsets(), dtype=np.int64)
+        targets = np.frombuffer(self.targets(), dtype=np.int32).astype(np.int64)
+        sources = np.repeat(np.arange(len(self.items), dtype=np.int64), np.diff(offsets))
+        keep = sources < targets
+        return self.items, np.stack((sources[keep], targets[keep]), axis=1)
+
+    def write_edge_list(self, path: str) -> int:
+        """Write the edges of this graph to the csv file at path, one edge per row, and return
+        the number of edges written.
+        """
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            count = 0
+            edges = self.iter_edges()
+            batch = list(islice(edges, 4096))
+            while batch:
+                writer.writerows(batch)
+                count += len(batch)
+                batch = list(islice(edges, 4096))
+        return count
+
+    def assign_random_edges(self, rng: Optional[random.Random] = None,
+                            budget: int = graph_vertex.EDGE_BUDGET) -> None:
+        """Randomly assign edges to the vertices of this graph, using rng or the global random
+        module if rng is None, from a random walk of budget steps.
+
+        This makes exactly the same random choices as graph_vertex.Graph.assign_random_edges, so
+        both backends build the same graph from the same random state.
+        """
+        choice = random.choice if rng is None else rng.choice
+        vertices = list(self.items)
+        counter = budget
+
+        curr = choice(vertices)
+
+        while counter != 0:
+            vert1 = choice(vertices)
+            if curr != vert1:
+                self.add_edge(curr, vert1)
+            curr = vert1
+            counter -= 1
+
+    def _search(self, source: int, goals: Collection[int],
+                excluded: Optional[Collection[int]] = None) -> int:
+        """Run a breadth-first search from source that does not enter the ids in excluded, and
+        return the epoch it was run under.
+
+        The search stops once every id in goals has been reached. Each reached id u gets
+        self._stamp[u] == epoch and self._parent[u] set to its predecessor on a shortest path
+        from source. As in graph_vertex.Graph._search, the scratch arrays are reused between
+        calls and invalidated by bumping the epoch, and the number of ids reached is kept in
+        self._reached.
+        """
+        offsets, targets = self.offsets(), self.targets()
+        n = len(self.items)
+        if len(self._stamp) < n:
+            self._stamp.extend(bytes(8 * (n - len(self._stamp))))
+            self._parent.extend(bytes(4 * (n - len(self._parent))))
+        self._epoch += 1
+        epoch = self._epoch
+        stamp, parent = self._stamp, self._parent
+
+        if excluded:
+            for u in excluded:
+                stamp[u] = epoch
+        stamp[source] = epoch
+        parent[source] = source
+        remaining = len(goals) - (source in goals)
+        frontier = [source]
+        reached = 1
+
+        while frontier and remaining > 0:
+            next_frontier = []
+            for u in frontier:
+                for i in range(offsets[u], offsets[u + 1]):
+                    w = targets[i]
+                    if stamp[w] != epoch:
+                        stamp[w] = epoch
+                        parent[w] = u
+                        next_frontier.append(w)
+                        if w in goals:
+                            remaining -= 1
+            frontier = next_frontier
+            reached += len(frontier)
+
+        if excluded:
+            # Excluded ids were stamped only to block the search; unstamp the ones that were
+            # never reached so they do not look reachable to the caller.
+            for u in excluded:
+                if u != source:
+                    stamp[u] = epoch - 1
+        self._reached = reached
+        return epoch
+
+    def _trace(self, source: int, target: int) -> list:
+        """Return the items on the path from source to target found by the last search."""
+        path = [target]
+        parent = self._parent
+        while path[-1] != source:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return [self.items[u] for u in path]
+
+    def path_between_ids(self, source: int, target: int,
+                         excluded: Optional[Collection[int]] = None) -> Optional[list]:
+        """Return the items along a shortest path from source to target, avoiding the ids in
+        excluded. Return None if there is no such path.
+        """
+        epoch = self._search(source, (target,), excluded)
+        if self._stamp[target] != epoch:
+            return None
+        return self._trace(source, target)
+
+    def get_path(self, item1: Any, item2: Any) -> list:
+        """Return the shortest path between item1 and item2 in this graph.
+
+        The returned list contains the ITEMS along the path.
+        Return an empty list if no such path exists.
+        The result is kept in self.path_cache until the next edge is added.
+
+        >>> g = CSRGraph()
+        >>> g.add_vertex('Citi Field', 'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park', 'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park', 'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.add_edge('Owls Head Park', 'Fort Tryon Park')
+        >>> g.get_path('Citi Field', 'Fort Tryon Park')
+        ['Citi Field', 'Owls Head Park', 'Fort Tryon Park']
+        """
+        if item1 in self.ids and item2 in self.ids:
+            return list(self.path_cache.get((item1, item2, 'shortest'),
+                                            lambda: self._shortest_path(item1, item2)))
+        return []
+
+    def _shortest_path(self, item1: Any, item2: Any) -> tuple:
+        """Return the items along a shortest path between item1 and item2 as a tuple, or an
+        empty tuple if there is none. This is what get_path caches.
+        """
+        path = self.path_between_ids(self.ids[item1], self.ids[item2])
+        return () if path is None else tuple(path)
+
+    def get_paths(self, item: Any, targets: Iterable) -> dict[Any, list]:
+        """Return a dictionary mapping each of the given target items to a shortest path from
+        item to it, computed with a single breadth-first search.
+
+        Targets that are not connected to item (or not in this graph) are left out.
+
+        >>> g = CSRGraph()
+        >>> g.add_vertex('Citi Field', 'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park', 'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park', 'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.get_paths('Citi Field', ['Owls Head Park', 'Fort Tryon Park'])
+        {'Owls Head Park': ['Citi Field', 'Owls Head Park']}
+        """
+        if item not in self.ids:
+            return {}
+        source = self.ids[item]
+        goals = {self.ids[t]: None for t in targets if t in self.ids}
+        epoch = self._search(source, goals)
+        return {self.items[u]: self._trace(source, u) for u in goals if self._stamp[u] == epoch}
+
+
+def _component_roots(n: int, sources: Any, targets: Any) -> Any:
+    """Return a NumPy array giving, for each of the n ids, the smallest id in its component of
+    the graph with the given edges.
+
+    Each round hooks the root of every edge's larger end onto the smaller root, then shortcuts
+    every id to its root, so the number of rounds grows with the logarithm of the size of the
+    components rather than with their diameter.
+    """
+    import numpy as np
+
+    roots = np.arange(n, dtype=np.int64)
+    while True:
+        source_roots, target_roots = roots[sources], roots[targets]
+        split = source_roots != target_roots
+        if not split.any():
+            return roots
+        np.minimum.at(roots, np.maximum(source_roots[split], target_roots[split]),
+                      np.minimum(source_roots[split], target_roots[split]))
+        while True:
+            grandparents = roots[roots]
+            if np.array_equal(grandparents, roots):
+                break
+            roots = grandparents
+
+
+def compare_backends(num_vertices: int = 685, num_edges: int = 2000,
+                     num_queries: int = 20, seed: int = 111) -> dict:
+    """Build the same random graph with graph_vertex.Graph and with CSRGraph and return the
+    peak memory (bytes) of each build, the time (seconds) to build it, and the time to answer
+    num_queries get_path queries.
+
+    Each graph is built twice. The first build is timed with tracemalloc off, since tracing
+    slows down every allocation, and graph_vertex.Graph allocates far more than CSRGraph. The
+    second build is traced to measure its peak memory. Each build ends by asking for the
+    neighbours of one location, which makes CSRGraph merge its buffered edges into its CSR
+    arrays, so the one-off cost of compacting them is counted as part of the CSRGraph build.
+    The queries are then run on the graph of the timed build.
+
+    >>> report = compare_backends(num_vertices=50, num_edges=100, num_queries=5)
+    >>> sorted(report['CSRGraph']), report['CSRGraph']['memory'] > 0
+    (['build_time', 'memory', 'path_time'], True)
+    """
+    rng = random.Random(seed)
+    kinds = ['park', 'cemetery', 'health', 'fire station', 'police station', 'tourist spot']
+    rows = [(f'location {i}', rng.choice(kinds), rng.randint(0, 10)) for i in range(num_vertices)]
+    edges = [(rng.randrange(num_vertices), rng.randrange(num_vertices)) for _ in range(num_edges)]
+    edges = [(f'location {u}', f'location {v}') for u, v in edges if u != v]
+    queries = [(rows[rng.randrange(num_vertices)][0], rows[rng.randrange(num_vertices)][0])
+               for _ in range(num_queries)]
+
+    def build(backend: type) -> Any:
+        """Return a graph of backend built from rows and edges, with its edges compacted."""
+        graph = backend()
+        for item, kind, score in rows:
+            graph.add_vertex(item, kind, score)
+        for item1, item2 in edges:
+            graph.add_edge(item1, item2)
+        graph.get_neighbours(rows[0][0])
+        return graph
+
+    report = {}
+    for name, backend in (('graph_vertex.Graph', graph_vertex.Graph), ('CSRGraph', CSRGraph)):
+        tracemalloc.start()
+        build(backend)
+        memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        graph = build(backend)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for item1, item2 in queries:
+            graph.get_path(item1, item2)
+        report[name] = {'memory': memory, 'build_time': build_time,
+                        'path_time': time.perf_counter() - start}
+    return report
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['csv', 'random', 'itertools', 'numpy', 'time', 'tracemalloc', 'array',
+                          'bisect', 'collections.abc', 'graph_vertex', 'component_index',
+                          'degree_index', 'kind_index', 'memory_usage', 'path_cache']
+    })
@@ -1,68 +1,303 @@
 """DATA SET GENERATION: in this file we are generating the dataset that will use for our project.
-As our project requires the type of location as well, we are manually categorising the locations."""
+As our project requires the type of location as well, we are manually categorising the locations.
 
+Each row of the data set is [name, kind, longitude, latitude]. The coordinates are left blank for
+the locations the source datasets give no position for (the tourist spots and the precincts).
+
+The data set is built by a pipeline with one stage per source dataset (see SOURCES). Each stage
+streams the rows of its source one at a time and writes the locations it finds to a shard: a
+csv file of its own in the shard directory. The manifest in that directory records the checksum
+of the source each shard was built from, so a rebuild only runs the stages whose sources have
+changed. The shards are then joined, in the order of SOURCES, into the data set.
+
+A location is only written once, under the kind of its first row, as Graph.add_vertex keeps
+the first vertex of each item. The names seen so far are remembered by a short hash, so the
+memory used grows with the number of distinct locations rather than the size of the sources,
+and rows are written in batches of BATCH_ROWS. For example, run from the data directory
+
+    python ../data_set_builder.py
+
+or, from the project directory,
+
+    python data_set_builder.py --source-dir data --output data/large_location_data.csv
+"""
+from __future__ import annotations
+import argparse
 import csv
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# The number of rows buffered before each write to a shard or the data set.
+BATCH_ROWS = 4096
+
+# The directory, next to the data set, that holds the shards and the manifest.
+SHARD_DIR = '__buildcache__'
+
+# The version of the stages. Shards built by another version are built again.
+STAGE_VERSION = 1
+
+
+def point_coordinates(geometry: str) -> list:
+    """Return [longitude, latitude] from a geometry written as 'POINT (longitude latitude)', or
+    two blanks if it is not a point.
+
+    >>> point_coordinates('POINT (-73.88895811640342 40.8962098695574)')
+    ['-73.88895811640342', '40.8962098695574']
+    """
+    match = re.fullmatch(r'\s*POINT\s*\(\s*(\S+)\s+(\S+)\s*\)\s*', geometry)
+    if match is None:
+        return ['', '']
+    return [match.group(1), match.group(2)]
+
+
+def latitude_longitude_coordinates(latitude: str, longitude: str, location: str = '') -> list:
+    """Return [longitude, latitude] from the given latitude and longitude columns, falling back
+    to the '(latitude, longitude)' at the end of a location column, or two blanks if neither
+    holds numbers (as in the header rows, which the readers do not skip).
+
+    >>> latitude_longitude_coordinates('', '', '413 120th Street\\n(40.798205, -73.932667)')
+    ['-73.932667', '40.798205']
+    """
+    number = r'\s*(-?\d+(?:\.\d*)?)\s*'
+    if re.fullmatch(number, latitude) and re.fullmatch(number, longitude):
+        return [longitude.strip(), latitude.strip()]
+    match = re.search(r'\(' + number + ',' + number + r'\)\s*$', location)
+    if match is None:
+        return ['', '']
+    return [match.group(2), match.group(1)]
+
+
+##########
+# Stages: one for each csv file that needs to be read for our dataset
+##########
+
+def park_rows(file: Any) -> Iterator[list]:
+    """Yield the locations in the dataset Areas_of_Interest_Centroids.csv, which contains several
+    locations in NYC. For the purposes of our project, we have only chosen the locations which
+    are either a park or a cemetery. the_geom holds the centroid as 'POINT (longitude latitude)'.
+    """
+    for line in csv.DictReader(file):
+        if line['AnnoLine3'] == 'Park':
+            yield [line['Name'], 'park'] + point_coordinates(line['the_geom'])
+        if line['AnnoLine3'] == 'Cemetery':
+            yield [line['Name'], 'cemetery'] + point_coordinates(line['the_geom'])
+
+
+def tourist_spot_rows(file: Any) -> Iterator[list]:
+    """Yield the locations in the dataset New_York_Tourist_Locations.csv, which contains tourist
+    spots of NYC.
+    """
+    next(file)  # we are skipping the first row of the dataset as it contains the
+    # title for that column
+    for line in csv.reader(file):
+        yield [line[0], 'tourist spot', '', '']
+
+
+def health_rows(file: Any) -> Iterator[list]:
+    """Yield the locations in the dataset rows.csv, which stores the location of health care
+    centres in NYC.
+    """
+    for line in csv.reader(file):
+        yield [line[2], 'health'] + latitude_longitude_coordinates(line[7], line[8], line[5])
+
+
+def fire_station_rows(file: Any) -> Iterator[list]:
+    """Yield the locations in the dataset FDNY_Firehouse_Listing.csv, which contains the name of
+    the fire stations in NYC. The fire stations follow a naming convention of their engine type
+    and their ladder type.
+    """
+    for line in csv.reader(file):
+        yield [line[0], 'fire station'] + latitude_longitude_coordinates(line[4], line[5])
+
+
+def precinct_rows(file: Any) -> Iterator[list]:
+    """Yield the locations in the dataset NYPD_Hate_Crimes.csv, which contains the names of the
+    precincts in NYC. As the precincts only have a numeric name, we decided to add 'precinct'
+    before each precinct number to read as, precinct 1, etc.
+
+    The dataset is a record of hate crimes committed in NYC, and in which precinct they were
+    reported in, so there is a lot of repetition in the precincts, which the pipeline removes.
+    """
+    next(file)  # we are skipping the first row of the dataset as it contains the
+    # title for that column
+    for line in csv.reader(file):
+        yield ['precinct ' + str(line[2]), 'police station', '', '']
+
+
+# The stage of each source, as name: (file name, stage) pairs, in the order of the data set.
+SOURCES = {
+    'parks': ('Areas_of_Interest_Centroids.csv', park_rows),
+    'tourist spots': ('New_York_Tourist_Locations.csv', tourist_spot_rows),
+    'health': ('rows.csv', health_rows),
+    'fire stations': ('FDNY_Firehouse_Listing.csv', fire_station_rows),
+    'precincts': ('NYPD_Hate_Crimes.csv', precinct_rows),
+}
+
+
 ##########
-# Readers: All csv files that need to be read for our dataset
+# The pipeline
 ##########
 
-# this is to read the dataset Areas_of_Interest_Centroids.csv which contains several locations
-# in NYC. For the purposes of our project, we have only chosen the locations which are either a park
-# or a cemetery.
-with open('Areas_of_Interest_Centroids.csv', 'r') as f1:
-    reader1 = csv.DictReader(f1)
-
-    # this is to read the dataset New_York_Tourist_Locations.csv which contains tourist spots of NYC
-    with open('New_York_Tourist_Locations.csv', 'r') as f2:
-        reader2 = csv.reader(f2)
-        next(f2)  # we are skipping the first row of the dataset as it contains the
-        # title for that column
-
-        # this is to read the dataset rows.csv which stores the location of health care
-        # centres in NYC
-        with open('rows.csv', 'r') as f3:
-            reader3 = csv.reader(f3)
-
-            # this is to read the dataset FDNY_Firehouse_Listing.csv which contains the name of the
-            # fire stations in NYC. The fire stations follow a naming convention of their
-            # engine type and their ladder type
-            with open('FDNY_Firehouse_Listing.csv', 'r') as f4:
-                reader4 = csv.reader(f4)
-
-                # this is to read the dataset NYPD_Hate_Crimes.csv which contains the names of the
-                # precincts in NYC. As the precincts only have a numeric name, we decided to add
-                # 'precinct' before each precinct number to read as, precinct 1, etc.
-                with open('NYPD_Hate_Crimes.csv', 'r') as f5:
-                    reader5 = csv.reader(f5)
-                    next(f5)  # we are skipping the first row of the dataset as it contains the
-                    # title for that column
-
-                    ######
-                    # The csv file that we are writing:
-                    ######
-                    # with open('my_csv.csv', 'w') as w:
-                    with open('large_location_data.csv', 'w') as w:
-                        writer = csv.writer(w)
-                        for line in reader1:
-                            if line['AnnoLine3'] == 'Park':
-                                writer.writerow([line['Name'], 'park'])
-                            if line['AnnoLine3'] == 'Cemetery':
-                                writer.writerow([line['Name'], 'cemetery'])
-
-                        for line in reader2:
-                            writer.writerow([line[0], 'tourist spot'])
-
-                        for line in reader3:
-                            writer.writerow([line[2], 'health'])
-
-                        for line in reader4:
-                            writer.writerow([line[0], 'fire station'])
-
-                        visited = set()  # the dataset is a record of hate crimes committed in NYC,
-                        # and in which precinct they were reported in. There is a lot of repetition,
-                        # in the precinct numbers so we decided to just extract the precinct using
-                        # the visited method
-                        for line in reader5:
-                            if line[2] not in visited:
-                                visited.add(line[2])
-                                writer.writerow(['precinct ' + str(line[2]), 'police station'])
+def build(source_dir: str, output: str, shard_dir: Optional[str] = None) -> dict:
+    """Build the data set from the sources in source_dir and write it to output, running only
+    the stages whose sources changed since the shards in shard_dir (SHARD_DIR next to output
+    if None) were built. Return a summary with the names of the stages that were 'rebuilt'
+    and 'reused', and the number of 'rows' in the data set.
+
+    >>> import tempfile
+    >>> output = os.path.join(tempfile.mkdtemp(), 'large_location_data.csv')
+    >>> build('data', output)['rebuilt']
+    ['parks', 'tourist spots', 'health', 'fire stations', 'precincts']
+    >>> summary = build('data', output)
+    >>> summary['rebuilt'], summary['rows']
+    ([], 660)
+    """
+    if shard_dir is None:
+        shard_dir = os.path.join(os.path.dirname(os.path.abspath(output)), SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_path = os.path.join(shard_dir, 'manifest.json')
+    try:
+        with open(manifest_path, 'r') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        manifest = {'stages': {}, 'rows': 0}
+    stages = manifest['stages']
+
+    rebuilt, reused = [], []
+    for name, (file_name, stage) in SOURCES.items():
+        source = os.path.join(source_dir, file_name)
+        shard = _shard_path(shard_dir, name)
+        entry = _current_entry(source, stages.get(name))
+        if entry is not None and os.path.exists(shard):
+            stages[name] = entry
+            reused.append(name)
+        else:
+            stages[name] = build_shard(source, stage, shard)
+            rebuilt.append(name)
+
+    if rebuilt or not os.path.exists(output):
+        shards = [_shard_path(shard_dir, name) for name in SOURCES]
+        manifest['rows'] = _write_rows(output, _dedupe(_read_shards(shards)))
+    _write_atomically(manifest_path, lambda file: json.dump(manifest, file, indent=2))
+
+    return {'rebuilt': rebuilt, 'reused': reused, 'rows': manifest['rows']}
+
+
+def build_shard(source: str, stage: Callable[[Any], Iterable[list]], shard: str) -> dict:
+    """Run stage over the source csv file and write the locations it yields, without repeats,
+    to the shard csv file. Return the manifest entry of the shard.
+    """
+    with open(source, 'r', newline='') as file:
+        rows = _write_rows(shard, _dedupe(stage(file)))
+    stat = os.stat(source)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_checksum(source),
+            'version': STAGE_VERSION, 'rows': rows}
+
+
+def file_checksum(path: str) -> str:
+    """Return the SHA-256 digest of the file at path, read in blocks of 1 MiB."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _current_entry(source: str, entry: Optional[dict]) -> Optional[dict]:
+    """Return the manifest entry of the shard of source, updated to the source's current
+    modification time, if the shard was built from the current contents of source by this
+    STAGE_VERSION. Otherwise, return None. The checksum of source is only computed when its
+    size or modification time changed.
+    """
+    if entry is None or entry.get('version') != STAGE_VERSION:
+        return None
+    stat = os.stat(source)
+    if (stat.st_size, stat.st_mtime_ns) == (entry['size'], entry['mtime_ns']):
+        return entry
+    if stat.st_size != entry['size'] or file_checksum(source) != entry['sha256']:
+        return None
+    return {**entry, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _dedupe(rows: Iterable[list]) -> Iterator[list]:
+    """Yield the rows whose names (their first column) have not been seen before, remembering
+    each name by an 8-byte hash of it.
+
+    >>> list(_dedupe([['a', 'park'], ['b', 'health'], ['a', 'tourist spot']]))
+    [['a', 'park'], ['b', 'health']]
+    """
+    seen = set()
+    for row in rows:
+        key = hashlib.blake2b(row[0].encode(), digest_size=8).digest()
+        if key not in seen:
+            seen.add(key)
+            yield row
+
+
+def _read_shards(shards: list[str]) -> Iterator[list]:
+    """Yield the rows of each shard in turn."""
+    for shard in shards:
+        with open(shard, 'r', newline='') as file:
+            yield from csv.reader(file)
+
+
+def _write_rows(path: str, rows: Iterable[list]) -> int:
+    """Write rows to the csv file at path in batches of BATCH_ROWS, replacing the file only
+    once every row is written, and return the number of rows.
+    """
+    count = 0
+
+    def write(file: Any) -> None:
+        nonlocal count
+        writer = csv.writer(file)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_ROWS:
+                writer.writerows(batch)
+                count += len(batch)
+                batch = []
+        writer.writerows(batch)
+        count += len(batch)
+
+    _write_atomically(path, write)
+    return count
+
+
+def _write_atomically(path: str, write: Callable[[Any], None]) -> None:
+    """Call write with a new text file, and then put that file in the place of path. A
+    process reading path never sees it half written.
+    """
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w', newline='') as file:
+        write(file)
+    os.replace(temporary, path)
+
+
+def _shard_path(shard_dir: str, name: str) -> str:
+    """Return the path of the shard of the stage with the given name."""
+    return os.path.join(shard_dir, name.replace(' ', '_') + '.csv')
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Build the data set described by the command line arguments and return the exit
+    status.
+    """
+    parser = argparse.ArgumentParser(description='Build the location data set.')
+    parser.add_argument('--source-dir', default='.', help='the directory of the source csv files')
+    parser.add_argument('--output', default='large_location_data.csv',
+                        help='the data set to write')
+    parser.add_argument('--shard-dir', help=f'the directory of the shards (default: {SHARD_DIR} '
+                                            'next to the output)')
+    args = parser.parse_args(argv)
+
+    print(json.dumps(build(args.source_dir, args.output, args.shard_dir)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
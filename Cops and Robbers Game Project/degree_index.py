@@ -0,0 +1,118 @@
+"""
+A degree index shared by graph_vertex.Graph and csr_graph.CSRGraph.
+
+part1.randomize_start used to sort every vertex by degree to find the two with the most
+neighbours. Since the game only ever adds edges, a vertex's degree only ever goes up by one at
+a time, so the vertices can instead be kept in buckets by degree, with a vertex moving up one
+bucket each time it gains an edge. The vertices of highest degree are then read from the top
+buckets without looking at the rest of the graph, and the size of each bucket is the degree
+histogram.
+"""
+from __future__ import annotations
+import heapq
+from typing import Any, Callable, Iterable, Optional
+
+
+class DegreeIndex:
+    """An index of the nodes of a graph by their degree.
+
+    Nodes can be any hashable objects (graph_vertex.Vertex objects or CSRGraph ids). Each
+    bucket is a dictionary used as an ordered set, so moving a node between buckets takes
+    constant time.
+
+    >>> index = DegreeIndex()
+    >>> for node in 'abcd':
+    ...     index.add(node)
+    >>> for node in 'abbc':
+    ...     index.increment(node)
+    >>> index.top(3), index.histogram(), index.degree('b')
+    (['b', 'c', 'a'], [1, 2, 1], 2)
+    """
+    _degrees: dict
+    _buckets: list[dict]
+    _max_degree: int
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self._degrees = {}
+        self._buckets = [{}]
+        self._max_degree = 0
+
+    def __len__(self) -> int:
+        """Return the number of nodes in this index."""
+        return len(self._degrees)
+
+    def add(self, node: Any) -> None:
+        """Add node to the index with degree 0, if it is not in the index already."""
+        if node not in self._degrees:
+            self._degrees[node] = 0
+            self._buckets[0][node] = None
+
+    def increment(self, node: Any) -> None:
+        """Add one to the degree of node, which must be in the index."""
+        degree = self._degrees[node]
+        del self._buckets[degree][node]
+        degree += 1
+        if degree == len(self._buckets):
+            self._buckets.append({})
+        self._buckets[degree][node] = None
+        self._degrees[node] = degree
+        self._max_degree = max(self._max_degree, degree)
+
+    def load(self, degrees: Iterable[int]) -> None:
+        """Replace the contents of the index with the nodes 0, 1, 2, ..., where node i has
+        degree degrees[i]. This is how a graph built in bulk fills its index in one pass.
+
+        >>> index = DegreeIndex()
+        >>> index.load([2, 0, 2, 1])
+        >>> index.top(2), index.histogram()
+        ([2, 0], [1, 1, 2])
+        """
+        self._degrees = dict(enumerate(degrees))
+        self._max_degree = max(self._degrees.values(), default=0)
+        self._buckets = [{} for _ in range(self._max_degree + 1)]
+        for node, degree in self._degrees.items():
+            self._buckets[degree][node] = None
+
+    def degree(self, node: Any) -> int:
+        """Return the degree of node, which must be in the index."""
+        return self._degrees[node]
+
+    def top(self, k: int, key: Optional[Callable[[Any], Any]] = None) -> list:
+        """Return the k nodes of highest degree (or every node, if there are fewer than k),
+        highest degree first. Nodes of the same degree are ordered by key (the node itself if
+        key is None) from largest to smallest.
+
+        Only the buckets the answer is drawn from are looked at, and in each of those only the
+        nodes that are needed are sorted.
+        """
+        nodes = []
+        degree = self._max_degree
+        while len(nodes) < k and degree >= 0:
+            bucket = self._buckets[degree]
+            if bucket:
+                nodes.extend(heapq.nlargest(k - len(nodes), bucket, key=key))
+            degree -= 1
+        return nodes
+
+    def histogram(self) -> list[int]:
+        """Return a list whose element d is the number of nodes of degree d, up to the highest
+        degree in the index.
+        """
+        return [len(bucket) for bucket in self._buckets[:self._max_degree + 1]]
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['heapq']
+    })
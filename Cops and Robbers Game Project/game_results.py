@@ -0,0 +1,287 @@
+"""
+Compact game results, and sinks that stream them to files.
+
+part1.run_game prints every game and returns its full paths as lists of strings, which for
+batches of a million games costs more than playing them. part1.play_game instead returns a
+GameResult: a few integers, plus the paths as integer vertex ids only when the game was traced.
+The results of a batch can then be streamed, in buffered batches, into one of these sinks:
+    - JsonlSink: one JSON object per game, one game per line
+    - ColumnarSink: a directory holding one binary file per field, which
+      numpy.fromfile(path, dtype) reads back as an array, plus the traced paths as JSON lines
+    - SummarySink: nothing written per game, only the totals kept (the quiet mode)
+    - ListSink: the results kept in a list
+"""
+from __future__ import annotations
+import json
+import os
+from array import array
+from typing import Any, Optional
+
+# Why a game ended, as stored in GameResult.reason. batch_games uses the same codes.
+RUNNING, ESCAPED, CAPTURED, OUT_OF_MOVES, CORNERED = 0, 1, 2, 3, 4
+
+# The name of each reason code.
+REASON_NAMES = ['running', 'escaped', 'captured', 'out of moves', 'cornered']
+
+
+class GameResult:
+    """The outcome of one game.
+
+    Instance Attributes:
+        - winner: 1 if the robber won and 0 if the cop won
+        - reason: why the game ended (ESCAPED, CAPTURED, OUT_OF_MOVES or CORNERED)
+        - moves: the number of moves the robber made
+        - path_length: the number of locations on the paths the robber planned, which is more
+          than moves when the game ended before the robber finished its path
+        - game: the number of the game in its batch, or None if it was played on its own
+        - robber_path: the ids of the locations the robber moved to, if the game was traced
+        - cop_path: the ids of the cop's location before each of its moves, if the game was
+          traced
+
+    Representation Invariants:
+        - self.winner in {0, 1}
+        - self.reason in {ESCAPED, CAPTURED, OUT_OF_MOVES, CORNERED}
+        - self.robber_path is None or len(self.robber_path) == self.moves
+    """
+    winner: int
+    reason: int
+    moves: int
+    path_length: int
+    game: Optional[int]
+    robber_path: Optional[list[int]]
+    cop_path: Optional[list[int]]
+
+    def __init__(self, winner: int, reason: int, moves: int, path_length: int,
+                 game: Optional[int] = None, robber_path: Optional[list[int]] = None,
+                 cop_path: Optional[list[int]] = None) -> None:
+        """Initialize a game result."""
+        self.winner = winner
+        self.reason = reason
+        self.moves = moves
+        self.path_length = path_length
+        self.game = game
+        self.robber_path = robber_path
+        self.cop_path = cop_path
+
+    def __repr__(self) -> str:
+        """Return a string representation of this result.
+
+        >>> GameResult(1, ESCAPED, 4, 4)
+        GameResult(winner=1, reason='escaped', moves=4, path_length=4)
+        """
+        return f'GameResult(winner={self.winner}, reason={REASON_NAMES[self.reason]!r}, ' \
+               f'moves={self.moves}, path_length={self.path_length})'
+
+    def to_dict(self) -> dict:
+        """Return this result as a dictionary, leaving out the paths if it was not traced.
+
+        >>> GameResult(0, CAPTURED, 2, 5, game=7, robber_path=[3, 4], cop_path=[9, 4]).to_dict()
+        {'game': 7, 'winner': 0, 'reason': 'captured', 'moves': 2, 'path_length': 5, \
+'robber_path': [3, 4], 'cop_path': [9, 4]}
+        """
+        record = {'game': self.game, 'winner': self.winner, 'reason': REASON_NAMES[self.reason],
+                  'moves': self.moves, 'path_length': self.path_length}
+        if self.robber_path is not None:
+            record['robber_path'] = self.robber_path
+            record['cop_path'] = self.cop_path
+        return record
+
+
+class ResultSink:
+    """Somewhere to send the results of a batch of games.
+
+    A sink can be used as a context manager, which closes it at the end of the with statement.
+
+    Instance Attributes:
+        - games: the number of results written so far
+        - robber_wins: the number of those games the robber won
+        - reasons: the number of those games that ended for each reason, indexed by reason code
+    """
+    games: int
+    robber_wins: int
+    reasons: list[int]
+
+    def __init__(self) -> None:
+        """Initialize a sink with no results written."""
+        self.games = 0
+        self.robber_wins = 0
+        self.reasons = [0] * len(REASON_NAMES)
+
+    def __enter__(self) -> ResultSink:
+        """Return this sink for the body of a with statement."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Close this sink at the end of a with statement."""
+        self.close()
+
+    def write(self, result: GameResult) -> None:
+        """Record result in this sink."""
+        self.games += 1
+        self.robber_wins += result.winner
+        self.reasons[result.reason] += 1
+
+    def close(self) -> None:
+        """Write out anything still buffered."""
+
+
+class SummarySink(ResultSink):
+    """A sink that writes nothing and only keeps the totals of ResultSink.
+
+    >>> sink = SummarySink()
+    >>> sink.write(GameResult(1, ESCAPED, 4, 4))
+    >>> sink.write(GameResult(0, CAPTURED, 2, 6))
+    >>> sink.games, sink.robber_wins, sink.reasons[CAPTURED]
+    (2, 1, 1)
+    """
+
+
+class ListSink(ResultSink):
+    """A sink that keeps every result in a list, for handing a batch of results from one
+    process to another.
+
+    Instance Attributes:
+        - results: the results written so far, in order
+    """
+    results: list[GameResult]
+
+    def __init__(self) -> None:
+        """Initialize a sink with no results."""
+        super().__init__()
+        self.results = []
+
+    def write(self, result: GameResult) -> None:
+        """Add result to the list."""
+        super().write(result)
+        self.results.append(result)
+
+
+class JsonlSink(ResultSink):
+    """A sink that writes each result as a line of JSON (see GameResult.to_dict), buffering
+    batch_size lines before each write.
+
+    Instance Attributes:
+        - path: the file the results are written to
+        - batch_size: the number of lines buffered between writes
+    """
+    path: str
+    batch_size: int
+    _buffer: list[str]
+    _file: Any
+
+    def __init__(self, path: str, batch_size: int = 4096) -> None:
+        """Initialize a sink that writes to the file at path, replacing its contents."""
+        super().__init__()
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+        self._file = open(path, 'w')
+
+    def write(self, result: GameResult) -> None:
+        """Buffer result, and write the buffer out if it is full."""
+        super().write(result)
+        self._buffer.append(json.dumps(result.to_dict()))
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def close(self) -> None:
+        """Write out the buffered lines and close the file."""
+        if not self._file.closed:
+            self._flush()
+            self._file.close()
+
+    def _flush(self) -> None:
+        """Write the buffered lines to the file."""
+        if self._buffer:
+            self._file.write('\n'.join(self._buffer) + '\n')
+            self._buffer = []
+
+
+class ColumnarSink(ResultSink):
+    """A sink that writes each field of the results to a binary file of its own in a
+    directory, buffering batch_size results in typed arrays before each write.
+
+    The files are named after the fields in COLUMNS, and each holds values of the NumPy dtype
+    given there, so numpy.fromfile(os.path.join(directory, 'moves.bin'), 'int32') reads a
+    whole column back at once. The paths of traced games go to 'traces.jsonl'.
+
+    Instance Attributes:
+        - directory: the directory the column files are written to
+        - batch_size: the number of results buffered between writes
+    """
+    # The typecode (for array.array) and NumPy dtype of each column.
+    COLUMNS = {'game': ('q', 'int64'), 'winner': ('b', 'int8'), 'reason': ('b', 'int8'),
+               'moves': ('i', 'int32'), 'path_length': ('i', 'int32')}
+
+    directory: str
+    batch_size: int
+    _columns: dict[str, array]
+    _traces: list[str]
+
+    def __init__(self, directory: str, batch_size: int = 65536) -> None:
+        """Initialize a sink that writes into directory, replacing any columns already
+        there.
+        """
+        super().__init__()
+        self.directory = directory
+        self.batch_size = batch_size
+        os.makedirs(directory, exist_ok=True)
+        for name in list(self.COLUMNS) + ['traces']:
+            path = self._path(name)
+            if os.path.exists(path):
+                os.remove(path)
+        self._columns = {name: array(typecode) for name, (typecode, _) in self.COLUMNS.items()}
+        self._traces = []
+
+    def write(self, result: GameResult) -> None:
+        """Buffer result, and write the buffers out if they are full."""
+        super().write(result)
+        columns = self._columns
+        columns['game'].append(-1 if result.game is None else result.game)
+        columns['winner'].append(result.winner)
+        columns['reason'].append(result.reason)
+        columns['moves'].append(result.moves)
+        columns['path_length'].append(result.path_length)
+        if result.robber_path is not None:
+            self._traces.append(json.dumps(result.to_dict()))
+        if len(columns['game']) >= self.batch_size:
+            self._flush()
+
+    def close(self) -> None:
+        """Write out the buffered results."""
+        self._flush()
+
+    def _path(self, name: str) -> str:
+        """Return the path of the file holding the given column, or the traces."""
+        if name == 'traces':
+            return os.path.join(self.directory, 'traces.jsonl')
+        return os.path.join(self.directory, f'{name}.bin')
+
+    def _flush(self) -> None:
+        """Append the buffered results to the column files."""
+        for name, column in self._columns.items():
+            if column:
+                with open(self._path(name), 'ab') as file:
+                    column.tofile(file)
+                self._columns[name] = array(column.typecode)
+        if self._traces:
+            with open(self._path('traces'), 'a') as file:
+                file.write('\n'.join(self._traces) + '\n')
+            self._traces = []
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['json', 'os', 'array'],
+        'allowed-io': ['JsonlSink.__init__', 'ColumnarSink._flush']
+    })
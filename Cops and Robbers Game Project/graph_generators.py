@@ -0,0 +1,348 @@
+"""
+Synthetic location graphs of any size.
+
+Graph.assign_random_edges takes 300 random-walk steps whatever the number of vertices, so
+large data sets end up mostly disconnected, and it cannot build the graphs of a million
+vertices that load testing needs. This module draws the edges of a graph with vectorised NumPy
+sampling instead, under one of the models in MODELS:
+    - 'erdos_renyi': every pair of vertices is joined independently with the same probability.
+      The pairs are drawn by geometric skipping (Batagelj and Brandes), which jumps straight
+      from one chosen pair to the next, so the work grows with the number of edges rather than
+      the number of pairs.
+    - 'geometric': the vertices are random points in the unit square, and two of them are
+      joined when they are closer than a radius. Nearby pairs are found by bucketing the
+      points into square cells as wide as the radius.
+    - 'barabasi_albert': preferential attachment, where each vertex joins vertices in
+      proportion to their degree, which gives a few very well connected hubs. Each new edge
+      copies an end of a random earlier edge (Batagelj and Brandes), and the copies are
+      resolved all at once by pointer jumping.
+    - 'grid': a road-like grid, with each vertex in a square lattice joined to some of its
+      lattice neighbours.
+
+average_degree sets the density: it is the expected degree of a vertex from the model alone.
+With connect=True, a spanning tree is added first, which makes the graph connected. For
+'grid' the tree is a comb (every row plus the first column), and for 'geometric' it is a path
+through the cells in snake order, so its edges stay short. For the other models it is a
+random recursive tree. The tree adds about 2 to the average degree.
+
+assign_spatial_edges instead joins the locations of a real data set that are close to each
+other, by their coordinates, under one of the SPATIAL_MODELS:
+    - 'knn': each location is joined to its nearest locations.
+    - 'radius': every two locations closer than a radius are joined.
+"""
+from __future__ import annotations
+import math
+import random
+from typing import Any, Optional, Union
+
+import numpy as np
+
+import csr_graph
+import graph_vertex
+
+# The edge models generate_edges supports.
+MODELS = {'erdos_renyi', 'geometric', 'barabasi_albert', 'grid'}
+
+# The edge models assign_spatial_edges supports.
+SPATIAL_MODELS = {'knn', 'radius'}
+
+
+def generate_edges(num_vertices: int, model: str, average_degree: float,
+                   rng: np.random.Generator, connect: bool = True) -> np.ndarray:
+    """Return the edges of a random graph on the ids 0 to num_vertices - 1 as an integer array
+    of shape (E, 2), drawn with rng under the given model. The array may hold loops and
+    repeated edges, which CSRGraph.add_id_edges drops.
+
+    Preconditions:
+        - model in MODELS
+        - average_degree >= 0
+
+    >>> edges = generate_edges(1000, 'erdos_renyi', 4.0, np.random.default_rng(1))
+    >>> graph = csr_graph.CSRGraph.from_arrays(list(range(1000)), ['park'] * 1000, [3] * 1000,
+    ...                                        edges)
+    >>> graph.connected(0, 999)
+    True
+    """
+    n = num_vertices
+    if n < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    if model == 'geometric':
+        points = rng.random((n, 2))
+        order = _snake_order(points, max(1, int(math.sqrt(n))))
+        model_edges = _geometric_edges(points, average_degree)
+        tree = np.stack((order[:-1], order[1:]), axis=1)
+    elif model == 'grid':
+        model_edges = _grid_edges(n, average_degree, rng)
+        tree = _comb_edges(n)
+    else:
+        if model == 'erdos_renyi':
+            model_edges = _erdos_renyi_edges(n, average_degree, rng)
+        else:
+            model_edges = _barabasi_albert_edges(n, average_degree, rng)
+        order = rng.permutation(n)
+        # Vertex order[i] joins a random earlier vertex order[j], with j < i.
+        earlier = rng.integers(0, np.arange(1, n))
+        tree = np.stack((order[1:], order[earlier]), axis=1)
+
+    if not connect:
+        return model_edges
+    return np.concatenate((tree, model_edges))
+
+
+def generate_graph(num_vertices: int, score_dict: dict, model: str = 'erdos_renyi',
+                   average_degree: float = 3.0, seed: Optional[int] = None,
+                   connect: bool = True) -> csr_graph.CSRGraph:
+    """Return a CSRGraph with num_vertices vertices, named 'v0', 'v1', ..., whose kinds are
+    drawn uniformly from score_dict and scored by it, and whose edges come from
+    generate_edges. The same seed always gives the same graph.
+
+    Preconditions:
+        - model in MODELS
+        - score_dict != {}
+
+    >>> g = generate_graph(500, {'park': 3, 'health': 7}, model='grid', seed=3)
+    >>> len(g.vertices), g.connected('v0', 'v499')
+    (500, True)
+    """
+    rng = np.random.default_rng(seed)
+    kind_names = sorted(score_dict)
+    kind_codes = rng.integers(0, len(kind_names), size=num_vertices)
+    kinds = [kind_names[code] for code in kind_codes.tolist()]
+    scores = np.array([score_dict[kind] for kind in kind_names])[kind_codes]
+
+    edges = generate_edges(num_vertices, model, average_degree, rng, connect)
+    return csr_graph.CSRGraph.from_arrays([f'v{i}' for i in range(num_vertices)], kinds,
+                                          scores.tolist(), edges)
+
+
+def assign_edges(location_graph: Union[graph_vertex.Graph, csr_graph.CSRGraph], model: str,
+                 average_degree: float = 3.0, rng: Optional[random.Random] = None,
+                 connect: bool = True) -> None:
+    """Add edges drawn under model (see generate_edges) to the vertices of location_graph, as a
+    replacement for Graph.assign_random_edges. The seed of the NumPy generator is drawn from
+    rng, or from the global random module if rng is None.
+
+    Preconditions:
+        - model in MODELS
+    """
+    seed = random.getrandbits(64) if rng is None else rng.getrandbits(64)
+    edges = generate_edges(len(location_graph.vertices), model, average_degree,
+                           np.random.default_rng(seed), connect)
+    _add_edges(location_graph, edges)
+
+
+def assign_spatial_edges(location_graph: Union[graph_vertex.Graph, csr_graph.CSRGraph],
+                         coordinates: dict, model: str = 'knn', average_degree: float = 3.0,
+                         rng: Optional[random.Random] = None, connect: bool = True) -> None:
+    """Add edges to location_graph joining the locations that are close together, using the
+    (longitude, latitude) pair of each location in coordinates.
+
+    Under 'knn', each location is joined to its round(average_degree / 2) nearest locations
+    (at least one), which gives between that many and twice that many neighbours. Under
+    'radius', two locations are joined when they are closer than the median distance from a
+    location to its round(average_degree)-th nearest location, which gives about
+    average_degree neighbours. Both are found with a spatial_index.GridIndex.
+
+    With connect=True, the located vertices are also joined in a path through the cells of a
+    grid in snake order, which keeps the edges short and the graph connected, and each vertex
+    without coordinates is joined to a located vertex chosen with rng (or the global random
+    module if rng is None).
+
+    Preconditions:
+        - model in SPATIAL_MODELS
+        - average_degree >= 0
+
+    >>> g = graph_vertex.Graph()
+    >>> for item in ['a', 'b', 'c', 'd']:
+    ...     g.add_vertex(item, 'park', 3)
+    >>> assign_spatial_edges(g, {'a': (-74.0, 40.70), 'b': (-74.0, 40.71), 'c': (-74.0, 40.75)},
+    ...                      'knn', 2.0, random.Random(1))
+    >>> sorted(g.get_neighbours('c')), g.vertices['d'].degree(), g.connected('a', 'd')
+    (['b'], 1, True)
+    """
+    import spatial_index
+
+    items = list(location_graph.vertices)
+    located = np.array([i for i, item in enumerate(items) if item in coordinates],
+                       dtype=np.int64)
+    points = spatial_index.project([coordinates[items[i]] for i in located.tolist()])
+    index = spatial_index.GridIndex(points)
+
+    if model == 'knn':
+        edges = index.knn_edges(max(1, round(average_degree / 2)))
+    else:
+        _, distances = index.knn(max(1, round(average_degree)))
+        finite = distances[:, -1][np.isfinite(distances[:, -1])]
+        radius = float(np.median(finite)) if len(finite) else 0.0
+        edges = index.radius_edges(radius)
+    chunks = [located[edges]] if len(edges) else []
+
+    if connect and len(located) > 0:
+        low, extent = points.min(axis=0), np.ptp(points, axis=0)
+        unit = (points - low) / np.where(extent > 0, extent, 1) * (1 - 1e-9)
+        order = located[_snake_order(unit, max(1, int(math.sqrt(len(located)))))]
+        chunks.append(np.stack((order[:-1], order[1:]), axis=1))
+
+        unlocated = [i for i, item in enumerate(items) if item not in coordinates]
+        if rng is None:
+            rng = random.Random(random.getrandbits(64))
+        joined = [located[rng.randrange(len(located))] for _ in unlocated]
+        chunks.append(np.array([unlocated, joined], dtype=np.int64).T.reshape(-1, 2))
+
+    if chunks:
+        _add_edges(location_graph, np.concatenate(chunks))
+
+
+def _add_edges(location_graph: Union[graph_vertex.Graph, csr_graph.CSRGraph],
+               edges: np.ndarray) -> None:
+    """Add the given edges, an integer array of shape (E, 2) of vertex ids, to location_graph,
+    leaving out loops.
+    """
+    if isinstance(location_graph, csr_graph.CSRGraph):
+        location_graph.add_id_edges(edges)
+    else:
+        items = list(location_graph.vertices)
+        for u, v in edges.tolist():
+            if u != v:
+                location_graph.add_edge(items[u], items[v])
+
+
+def _erdos_renyi_edges(n: int, average_degree: float, rng: np.random.Generator) -> np.ndarray:
+    """Return the edges of an Erdos-Renyi graph on n vertices with the given expected degree,
+    drawn by geometric skipping over the n(n - 1)/2 pairs.
+    """
+    pairs = n * (n - 1) // 2
+    p = min(1.0, average_degree / (n - 1))
+    if p <= 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    # The gaps between chosen pairs are geometric, so their running sums are the positions of
+    # the chosen pairs. Draw a few more gaps than expected, and more if they fall short.
+    chunks = []
+    position = -1
+    while position < pairs:
+        gaps = rng.geometric(p, size=int(pairs * p * 1.05) + 64)
+        positions = position + np.cumsum(gaps)
+        chunks.append(positions[positions < pairs])
+        position = int(positions[-1])
+    codes = np.concatenate(chunks)
+
+    # Pair number k is (i, j) with j < i and k = i(i - 1)/2 + j.
+    i = ((1 + np.sqrt(1 + 8 * codes.astype(np.float64))) / 2).astype(np.int64)
+    i -= i * (i - 1) // 2 > codes
+    i += (i + 1) * i // 2 <= codes
+    j = codes - i * (i - 1) // 2
+    return np.stack((i, j), axis=1)
+
+
+def _geometric_edges(points: np.ndarray, average_degree: float) -> np.ndarray:
+    """Return the edges joining every two of the given points that are closer than the radius
+    at which a point has average_degree neighbours on average.
+    """
+    n = len(points)
+    radius = math.sqrt(average_degree / (n * math.pi))
+    if radius <= 0:
+        return np.empty((0, 2), dtype=np.int64)
+    width = max(1, int(1 / radius))
+    cells = np.minimum((points * width).astype(np.int64), width - 1)
+    cell_ids = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(cell_ids, kind='stable')
+    starts = np.searchsorted(cell_ids[order], np.arange(width * width + 1))
+
+    chunks = []
+    # Half of the neighbouring cells, so each pair of cells is looked at once.
+    for dx, dy in [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]:
+        x, y = cells[order, 0] + dx, cells[order, 1] + dy
+        inside = (x < width) & (y >= 0) & (y < width)
+        others = np.where(inside, x * width + y, 0)
+        counts = np.where(inside, starts[others + 1] - starts[others], 0)
+        sources = np.repeat(np.arange(n), counts)
+        first = np.repeat(starts[others], counts)
+        candidates = first + np.arange(len(sources)) - np.repeat(np.cumsum(counts) - counts,
+                                                                  counts)
+        if (dx, dy) == (0, 0):
+            keep = candidates > sources
+            sources, candidates = sources[keep], candidates[keep]
+        u, v = order[sources], order[candidates]
+        close = ((points[u] - points[v]) ** 2).sum(axis=1) < radius * radius
+        chunks.append(np.stack((u[close], v[close]), axis=1))
+
+    return np.concatenate(chunks)
+
+
+def _barabasi_albert_edges(n: int, average_degree: float,
+                           rng: np.random.Generator) -> np.ndarray:
+    """Return the edges of a Barabasi-Albert graph on n vertices, in which each vertex joins
+    about average_degree / 2 earlier vertices chosen in proportion to their degree.
+    """
+    m = max(1, round(average_degree / 2))
+    slots = 2 * n * m
+    # Slot 2k holds the vertex adding edge k, and slot 2k + 1 copies a uniformly random earlier
+    # slot, which picks each vertex in proportion to its degree so far.
+    copied = (rng.random(n * m) * np.arange(0, slots, 2)).astype(np.int64)
+    copied[0] = 0
+    pointers = np.arange(slots, dtype=np.int64)
+    pointers[1::2] = copied
+
+    # Follow copies of copies until every pointer lands on an even slot.
+    ends = pointers[1::2].copy()
+    odd = ends % 2 == 1
+    while odd.any():
+        ends[odd] = pointers[ends[odd]]
+        odd = ends % 2 == 1
+
+    sources = np.arange(n * m, dtype=np.int64) // m
+    return np.stack((sources, ends // (2 * m)), axis=1)
+
+
+def _grid_edges(n: int, average_degree: float, rng: np.random.Generator) -> np.ndarray:
+    """Return the edges of a square lattice laid over the n vertices in rows, keeping each
+    lattice edge with the probability that gives the requested average degree.
+    """
+    width = math.ceil(math.sqrt(n))
+    ids = np.arange(n, dtype=np.int64)
+    right = ids[(ids % width < width - 1) & (ids + 1 < n)]
+    down = ids[ids + width < n]
+    edges = np.concatenate((np.stack((right, right + 1), axis=1),
+                            np.stack((down, down + width), axis=1)))
+    keep = rng.random(len(edges)) < min(1.0, average_degree / 4)
+    return edges[keep]
+
+
+def _comb_edges(n: int) -> np.ndarray:
+    """Return a spanning tree of the lattice of _grid_edges made of every row and the first
+    column.
+    """
+    width = math.ceil(math.sqrt(n))
+    ids = np.arange(n, dtype=np.int64)
+    right = ids[(ids % width < width - 1) & (ids + 1 < n)]
+    down = ids[(ids % width == 0) & (ids + width < n)]
+    return np.concatenate((np.stack((right, right + 1), axis=1),
+                           np.stack((down, down + width), axis=1)))
+
+
+def _snake_order(points: np.ndarray, width: int) -> np.ndarray:
+    """Return the indices of points ordered cell by cell along a snake through a width by
+    width grid of cells, so that consecutive points tend to be close together.
+    """
+    cells = np.minimum((points * width).astype(np.int64), width - 1)
+    columns = np.where(cells[:, 0] % 2 == 0, cells[:, 1], width - 1 - cells[:, 1])
+    return np.lexsort((columns, cells[:, 0]))
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['math', 'random', 'numpy', 'csr_graph', 'graph_vertex',
+                          'spatial_index']
+    })
@@ -1,279 +1,762 @@
-"""
-The Graph and Vertex Class for Cops and Robbers. Some of the code in this file is based on code
-that we've seen in the Course Notes, lectures and tutorials. Any method that is not from the
-Course Notes is explained in its own docstring.
-This file is Copyright (c) 2021 Aamishi Avarsekar, Ashkan Alesham, Harry Doung, Dravin Nagalingam
-"""
-
-from __future__ import annotations
-import random
-from typing import Any
-
-
-class Vertex:
-    """A vertex in a graph.
-
-    Instance Attributes:
-        - item: The name of the location stored in this vertex.
-        - neighbours: The vertices that are adjacent to this vertex.
-        - kind: the kind of location
-        - score: a score from 1 to 10 inclusive given to the location
-
-    Preconditions:
-        - self not in self.neighbours
-        - all(self in u.neighbours for u in self.neighbours) # self should be a neighbour to all of
-        - kind in {'store', 'food', 'financial services',
-        'automobile services', 'emergency services', 'park', 'school'}
-    """
-    item: str
-    neighbours: set[Vertex]
-    kind: str
-    score: int
-
-    def __init__(self, item: Any, kind: str, score: int) -> None:
-        """Initialize a new vertex with the given item and kind.
-
-        This vertex is initialized with no neighbours.
-
-        Preconditions:
-            - kind in {'store', 'food', 'financial services',
-        'automobile services', 'emergency services', 'park', 'school'}
-        """
-        self.item = item
-        self.kind = kind
-        self.neighbours = set()
-        self.score = score
-
-    def degree(self) -> int:
-        """
-        Return the degree of this vertex. The degree of a vertex is defined as the number of its
-        neighbours.
-        >>> v1 = Vertex('Citi Field' ,'tourist spot', 5)
-        >>> v2 = Vertex('Citi Field' ,'tourist spot', 4)
-        >>> v3 = Vertex('Owls Head Park' ,'park', 3)
-        >>> v1.neighbours = {v2, v3}
-        >>> v1.degree()
-        2
-        """
-        return len(self.neighbours)
-
-    def check_connected(self, target_item: Any, visited: set[Vertex]) -> bool:
-        """Return whether this vertex is connected to a vertex corresponding to the target_item,
-        WITHOUT using any of the vertices in visited.
-
-        Preconditions:
-            - self not in visited
-        """
-        if self.item == target_item:
-            # Our base case: the target_item is the current vertex
-            return True
-        else:
-            visited.add(self)  # Add self to the set of visited vertices
-            for u in self.neighbours:
-                if u not in visited:  # Only recurse on vertices that haven't been visited
-                    if u.check_connected(target_item, visited):
-                        return True
-
-            return False
-
-    def connected_distance(self, target_item: Any, visited: set[Vertex]) -> \
-            any:
-        """Return a path that connects self and target_item with length d.
-        Return None if no such path is found or d == 0.
-
-        Preconditions:
-            - d >= 0
-        """
-        if self.item == target_item:
-            return [self.item]
-
-        else:
-            visited.add(self)  # Add self to the list of visited vertices
-            for u in self.neighbours:
-                if u not in visited:  # cuts off access to visited in u has already been
-                    path = u.connected_distance(target_item, visited)
-                    # recurse wherever the return type is expected
-                    if path is not None:
-                        return [self.item] + path
-
-            return None
-
-
-class Graph:
-    """A class that represents a graph.
-    *This class has been adopted from the Course Notes and as seen in lectures and tutorials. Any
-    method that is not from the Course Notes is explained in its own docstring.*
-    """
-
-    vertices: dict[Any, Vertex]
-
-    def __init__(self) -> None:
-        """Initialize an empty graph (no vertices or edges)."""
-        self.vertices = {}
-
-    def add_vertex(self, item: Any, kind: str, score: int) -> None:
-        """Add a vertex with the given item and kind to this graph.
-
-        The new vertex is not adjacent to any other vertices.
-        Do nothing if the given item is already in this graph.
-
-        Preconditions:
-            - kind in {'park', 'cemetery', 'health', 'fire station',
-                       'police station', 'tourist spot'}
-        """
-        if item not in self.vertices:
-            self.vertices[item] = Vertex(item, kind, score)
-
-    def add_edge(self, item1: Any, item2: Any) -> None:
-        """Add an edge between the two vertices with the given items in this graph.
-
-        Raise a ValueError if item1 or item2 do not appear as vertices in this graph.
-
-        Preconditions:
-            - item1 != item2
-        """
-        if item1 in self.vertices and item2 in self.vertices:
-            v1 = self.vertices[item1]
-            v2 = self.vertices[item2]
-
-            v1.neighbours.add(v2)
-            v2.neighbours.add(v1)
-        else:
-            raise ValueError
-
-    def adjacent(self, item1: Any, item2: Any) -> bool:
-        """Return whether item1 and item2 are adjacent vertices in this graph.
-
-        Return False if item1 or item2 do not appear as vertices in this graph.
-        """
-        if item1 in self.vertices and item2 in self.vertices:
-            v1 = self.vertices[item1]
-            return any(v2.item == item2 for v2 in v1.neighbours)
-        else:
-            return False
-
-    def get_neighbours(self, item: Any) -> set:
-        """Return a set of the neighbours of the given item.
-
-        Note that the *items* are returned, not the _Vertex objects themselves.
-
-        Raise a ValueError if item does not appear as a vertex in this graph.
-        """
-        if item in self.vertices:
-            v = self.vertices[item]
-            return {neighbour.item for neighbour in v.neighbours}
-        else:
-            raise ValueError
-
-    def get_all_vertices(self, kind: str = '') -> set:
-        """Return a set of all vertex items in this graph.
-
-        If kind != '', only return the items of the given vertex kind.
-
-        Preconditions:
-            - kind in {'park', 'cemetery', 'health', 'fire station',
-                       'police station', 'tourist spot'}
-
-        *This function is adopted from Assignment 3, but modified as per the requirements of our
-        project. The locations in the doctstring are picked from the dataset mentioned in the
-        report*
-
-        >>> g = Graph()
-        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
-        >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
-        >>> g.add_vertex('Owls Head Park' ,'park', 3)
-        >>> g.get_all_vertices('tourist spot') == {'Citi Field', 'Fort Tryon Park'} or \
-                                                {'Fort Tryon Park', 'Citi Field'}
-        True
-        >>> g.get_all_vertices('park')
-        {'Owls Head Park'}
-        """
-        if kind != '':
-            return {v.item for v in self.vertices.values() if v.kind == kind}
-        else:
-            return set(self.vertices.keys())
-
-    def edges_list(self) -> list:
-        """
-        Print a list of all the edges in a graph. An edge is represented by a size 2 tuple of each
-        of its vertex.
-
-        >>> g = Graph()
-        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
-        >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
-        >>> g.add_vertex('Owls Head Park' ,'park', 3)
-        >>> g.add_edge('Citi Field', 'Owls Head Park')
-        >>> g.add_edge('Citi Field', 'Fort Tryon Park')
-        >>> g.edges_list() == [('Citi Field', 'Fort Tryon Park'), \
-                               ('Citi Field', 'Owls Head Park')] or \
-                               [('Citi Field', 'Owls Head Park'), ('Citi Field', 'Fort Tryon Park')]
-        True
-        """
-        edges_list = []
-        for u1 in self.vertices.values():
-            for u2 in self.vertices.values():
-                if self.adjacent(u1.item, u2.item):
-                    if (u1.item, u2.item) and (u2.item, u1.item) not in edges_list:
-                        edges_list.append((u1.item, u2.item))
-        return edges_list
-
-    def assign_random_edges(self) -> None:
-        """
-        Takes vertices in the graph and randomly assigns edges.
-        The purpose of this function is to replicate an arbitrary graph with random edges formed by
-        its set of vertices.
-        """
-        vertices = list(self.vertices)
-        edges = set()
-        counter = 300
-
-        curr = random.choice(vertices)
-
-        while counter != 0:
-            vert1 = random.choice(vertices)
-            if curr != vert1:
-                self.add_edge(curr, vert1)
-                if {curr, vert1} not in edges:
-                    edges.update({curr, vert1})
-            curr = vert1
-            counter -= 1
-
-    def get_path(self, item1: Any, item2: Any) -> list:
-        """Return the shortest path between item1 and item 2 in this graph.
-
-        The returned list contains the ITEMS along the path.
-        Return None if no such path exists.
-
-        >>> g = Graph()
-        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
-        >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
-        >>> g.add_vertex('Owls Head Park' ,'park', 3)
-        >>> g.add_edge('Citi Field', 'Owls Head Park')
-        >>> g.add_edge('Owls Head Park', 'Fort Tryon Park')
-        >>> g.get_path('Citi Field', 'Fort Tryon Park')
-        ['Citi Field', 'Owls Head Park', 'Fort Tryon Park']
-        """
-
-        if item1 in self.vertices and item2 in self.vertices:
-            v1 = self.vertices[item1]
-            for _ in range(1, len(self.vertices)):
-                path = v1.connected_distance(item2, set())
-                if path is not None:
-                    return path
-        return []
-
-
-if __name__ == '__main__':
-    import python_ta.contracts
-    python_ta.contracts.check_all_contracts()
-
-    import doctest
-    doctest.testmod()
-
-    import python_ta
-    python_ta.check_all(config={
-        'max-line-length': 100,
-        'max-nested-blocks': 4,
-        'disable': ['E1136'],
-        'extra-imports': ['random']
-    })
+"""
+The Graph and Vertex Class for Cops and Robbers. Some of the code in this file is based on code
+that we've seen in the Course Notes, lectures and tutorials. Any method that is not from the
+Course Notes is explained in its own docstring.
+This file is Copyright (c) 2021 Aamishi Avarsekar, Ashkan Alesham, Harry Doung, Dravin Nagalingam
+"""
+
+from __future__ import annotations
+import csv
+import random
+from array import array
+from collections.abc import Set
+from itertools import islice
+from typing import Any, Collection, Iterable, Iterator, Optional
+
+from component_index import ComponentIndex
+from degree_index import DegreeIndex
+from kind_index import KindIndex
+from memory_usage import deep_size
+from path_cache import PathCache
+
+# The default number of steps of the random walk that Graph.assign_random_edges draws edges
+# from.
+EDGE_BUDGET = 300
+
+# The kind of each vertex is stored as a code: its position in KIND_NAMES, a list shared by the
+# vertices of every graph, to which each kind is added the first time a vertex of that kind is
+# made. There are only a handful of kinds, so this takes one small integer per vertex instead
+# of a reference to a string of its own.
+KIND_NAMES = []
+
+# Maps each kind in KIND_NAMES to its code.
+_kind_codes = {}
+
+
+def kind_code(kind: str) -> int:
+    """Return the code of the given kind, giving it the next code if it does not have one.
+
+    >>> KIND_NAMES[kind_code('park')]
+    'park'
+    """
+    if kind not in _kind_codes:
+        _kind_codes[kind] = len(KIND_NAMES)
+        KIND_NAMES.append(kind)
+    return _kind_codes[kind]
+
+
+class Vertex:
+    """A vertex in a graph.
+
+    Vertices are made in large numbers, so their attributes are stored in __slots__ rather than
+    in a __dict__ of their own, and the kind is stored as a code (see kind_code).
+
+    Instance Attributes:
+        - item: The name of the location stored in this vertex.
+        - neighbours: The vertices that are adjacent to this vertex.
+        - kind: the kind of location
+        - kind_code: the code of kind, its position in KIND_NAMES
+        - score: a score from 1 to 10 inclusive given to the location
+        - index: the position of this vertex in its graph
+
+    Preconditions:
+        - self not in self.neighbours
+        - all(self in u.neighbours for u in self.neighbours) # self should be a neighbour to all of
+        - kind in {'store', 'food', 'financial services',
+        'automobile services', 'emergency services', 'park', 'school'}
+    """
+    __slots__ = ('item', 'neighbours', 'kind_code', 'score', 'index')
+    item: str
+    neighbours: set[Vertex]
+    kind_code: int
+    score: int
+    index: int
+
+    def __init__(self, item: Any, kind: str, score: int, index: int = 0) -> None:
+        """Initialize a new vertex with the given item and kind.
+
+        This vertex is initialized with no neighbours.
+
+        Preconditions:
+            - kind in {'store', 'food', 'financial services',
+        'automobile services', 'emergency services', 'park', 'school'}
+        """
+        self.item = item
+        self.kind_code = kind_code(kind)
+        self.neighbours = set()
+        self.score = int(score)
+        self.index = index
+
+    @property
+    def kind(self) -> str:
+        """The kind of location stored in this vertex."""
+        return KIND_NAMES[self.kind_code]
+
+    @kind.setter
+    def kind(self, kind: str) -> None:
+        """Set the kind of location stored in this vertex."""
+        self.kind_code = kind_code(kind)
+
+    def __hash__(self) -> int:
+        """Return the index of this vertex as its hash.
+
+        The default hash is based on the memory address of the object, which makes the order
+        in which a set of vertices is iterated differ from one process to the next. Hashing by
+        index makes that order depend only on how the graph was built, so a game played with
+        the same random seed goes the same way in every process.
+        """
+        return self.index
+
+    def degree(self) -> int:
+        """
+        Return the degree of this vertex. The degree of a vertex is defined as the number of its
+        neighbours.
+        >>> v1 = Vertex('Citi Field' ,'tourist spot', 5)
+        >>> v2 = Vertex('Citi Field' ,'tourist spot', 4)
+        >>> v3 = Vertex('Owls Head Park' ,'park', 3)
+        >>> v1.neighbours = {v2, v3}
+        >>> v1.degree()
+        2
+        """
+        return len(self.neighbours)
+
+    def check_connected(self, target_item: Any, visited: set[Vertex]) -> bool:
+        """Return whether this vertex is connected to a vertex corresponding to the target_item,
+        WITHOUT using any of the vertices in visited.
+
+        Preconditions:
+            - self not in visited
+        """
+        if self.item == target_item:
+            # Our base case: the target_item is the current vertex
+            return True
+        else:
+            visited.add(self)  # Add self to the set of visited vertices
+            for u in self.neighbours:
+                if u not in visited:  # Only recurse on vertices that haven't been visited
+                    if u.check_connected(target_item, visited):
+                        return True
+
+            return False
+
+    def connected_distance(self, target_item: Any, visited: set[Vertex]) -> \
+            any:
+        """Return a path that connects self and target_item with length d.
+        Return None if no such path is found or d == 0.
+
+        Preconditions:
+            - d >= 0
+        """
+        if self.item == target_item:
+            return [self.item]
+
+        else:
+            visited.add(self)  # Add self to the list of visited vertices
+            for u in self.neighbours:
+                if u not in visited:  # cuts off access to visited in u has already been
+                    path = u.connected_distance(target_item, visited)
+                    # recurse wherever the return type is expected
+                    if path is not None:
+                        return [self.item] + path
+
+            return None
+
+
+class NeighbourView(Set):
+    """A read-only view of the neighbours of a vertex of a Graph, as their items or as their
+    ids (their indexes).
+
+    The view holds the vertex's own set of neighbours rather than a copy, so making one takes
+    constant time and it shows the edges added after it was made. Membership is a lookup in
+    that set.
+
+    >>> g = Graph()
+    >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+    >>> g.add_vertex('Owls Head Park' ,'park', 3)
+    >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
+    >>> view = g.get_neighbours('Citi Field')
+    >>> g.add_edge('Citi Field', 'Owls Head Park')
+    >>> 'Owls Head Park' in view, 'Fort Tryon Park' in view, view == {'Owls Head Park'}
+    (True, False, True)
+    >>> list(g.neighbour_ids(1)), 0 in g.neighbour_ids(1)
+    ([0], True)
+    """
+    __slots__ = ('_graph', '_neighbours', '_ids')
+    _graph: Graph
+    _neighbours: set[Vertex]
+    _ids: bool
+
+    def __init__(self, graph: Graph, vertex: Vertex, ids: bool = False) -> None:
+        """Initialize a view of the neighbours of vertex, a vertex of graph, as ids if ids is
+        True and as items otherwise.
+        """
+        self._graph = graph
+        self._neighbours = vertex.neighbours
+        self._ids = ids
+
+    def __contains__(self, key: Any) -> bool:
+        """Return whether key is the item (or the id) of a neighbour."""
+        if self._ids:
+            vertices = self._graph.view_list()
+            vertex = vertices[key] if isinstance(key, int) and 0 <= key < len(vertices) else None
+        else:
+            vertex = self._graph.vertices.get(key)
+        return vertex is not None and vertex in self._neighbours
+
+    def __iter__(self) -> Iterator:
+        """Iterate over the items (or the ids) of the neighbours."""
+        if self._ids:
+            return (vertex.index for vertex in self._neighbours)
+        return (vertex.item for vertex in self._neighbours)
+
+    def __len__(self) -> int:
+        """Return the number of neighbours."""
+        return len(self._neighbours)
+
+    def __repr__(self) -> str:
+        """Return a representation of this view, written like a set."""
+        return '{' + ', '.join(repr(key) for key in self) + '}' if self._neighbours else 'set()'
+
+
+class Graph:
+    """A class that represents a graph.
+    *This class has been adopted from the Course Notes and as seen in lectures and tutorials. Any
+    method that is not from the Course Notes is explained in its own docstring.*
+    """
+
+    vertices: dict[Any, Vertex]
+    path_cache: PathCache
+    _components: ComponentIndex
+    _degrees: DegreeIndex
+    _kinds: KindIndex
+    _stamp: dict[Vertex, int]
+    _parent: dict[Vertex, Vertex]
+    _epoch: int
+    _reached: int
+
+    def __init__(self) -> None:
+        """Initialize an empty graph (no vertices or edges)."""
+        self.vertices = {}
+        # Remembers planned paths until the next edge is added, see get_path.
+        self.path_cache = PathCache()
+        # Tracks the connected components as edges are added, see connected.
+        self._components = ComponentIndex(_vertex_neighbours)
+        # Buckets the vertices by degree as edges are added, see highest_degree.
+        self._degrees = DegreeIndex()
+        # Lists the vertices by kind and score band as they are added, see sample.
+        self._kinds = KindIndex()
+        # Scratch tables reused by every shortest-path search, see _search.
+        self._stamp = {}
+        self._parent = {}
+        self._epoch = 0
+        # The number of vertices the last search reached, read by instrumentation.
+        self._reached = 0
+
+    def add_vertex(self, item: Any, kind: str, score: int) -> None:
+        """Add a vertex with the given item and kind to this graph.
+
+        The new vertex is not adjacent to any other vertices.
+        Do nothing if the given item is already in this graph.
+
+        Preconditions:
+            - kind in {'park', 'cemetery', 'health', 'fire station',
+                       'police station', 'tourist spot'}
+        """
+        if item not in self.vertices:
+            self.vertices[item] = Vertex(item, kind, score, len(self.vertices))
+            self._components.add(self.vertices[item])
+            self._degrees.add(self.vertices[item])
+            self._kinds.add(self.vertices[item], kind, score)
+
+    def add_edge(self, item1: Any, item2: Any) -> None:
+        """Add an edge between the two vertices with the given items in this graph.
+
+        Raise a ValueError if item1 or item2 do not appear as vertices in this graph.
+
+        Preconditions:
+            - item1 != item2
+        """
+        if item1 in self.vertices and item2 in self.vertices:
+            v1 = self.vertices[item1]
+            v2 = self.vertices[item2]
+
+            if v2 not in v1.neighbours:
+                self._degrees.increment(v1)
+                self._degrees.increment(v2)
+            v1.neighbours.add(v2)
+            v2.neighbours.add(v1)
+            self._components.union(v1, v2)
+            self.path_cache.clear()
+        else:
+            raise ValueError
+
+    def adjacent(self, item1: Any, item2: Any) -> bool:
+        """Return whether item1 and item2 are adjacent vertices in this graph.
+
+        Vertices hash by their index, so this is a lookup in the neighbour set of item1.
+        Return False if item1 or item2 do not appear as vertices in this graph.
+        """
+        if item1 in self.vertices and item2 in self.vertices:
+            return self.vertices[item2] in self.vertices[item1].neighbours
+        else:
+            return False
+
+    def adjacent_ids(self, id1: int, id2: int) -> bool:
+        """Return whether the vertices with the ids (indexes) id1 and id2 are adjacent.
+
+        Preconditions:
+            - 0 <= id1 < len(self.vertices) and 0 <= id2 < len(self.vertices)
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.adjacent_ids(0, 1), g.adjacent('Owls Head Park', 'Citi Field')
+        (True, True)
+        """
+        vertices = self.view_list()
+        return vertices[id2] in vertices[id1].neighbours
+
+    def connected(self, item1: Any, item2: Any) -> bool:
+        """Return whether item1 and item2 are connected by a path in this graph.
+
+        This is a lookup in the component index kept up to date by add_edge, so unlike
+        Vertex.check_connected it does not traverse the graph.
+        Return False if item1 or item2 do not appear as vertices in this graph.
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.connected('Owls Head Park', 'Citi Field')
+        True
+        >>> g.connected('Citi Field', 'Fort Tryon Park')
+        False
+        """
+        if item1 in self.vertices and item2 in self.vertices:
+            return self._components.same(self.vertices[item1], self.vertices[item2])
+        else:
+            return False
+
+    def connected_avoiding(self, item1: Any, item2: Any, excluded: Any) -> bool:
+        """Return whether item1 is connected to item2 by a path that does not use the vertex
+        excluded. This gives the same answer as
+        self.vertices[item1].check_connected(item2, {self.vertices[excluded]}).
+
+        Only a cut vertex can disconnect two vertices of the same component, so this is a
+        component lookup unless excluded is a cut vertex, in which case the pieces left by
+        removing excluded are labelled once and reused until the next add_edge.
+        Return False if item1, item2 or excluded do not appear as vertices in this graph.
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.add_edge('Owls Head Park', 'Fort Tryon Park')
+        >>> g.connected_avoiding('Citi Field', 'Fort Tryon Park', 'Owls Head Park')
+        False
+        >>> g.add_edge('Citi Field', 'Fort Tryon Park')
+        >>> g.connected_avoiding('Citi Field', 'Fort Tryon Park', 'Owls Head Park')
+        True
+        """
+        if item1 in self.vertices and item2 in self.vertices and excluded in self.vertices:
+            return self._components.connected_avoiding(self.vertices[item1], self.vertices[item2],
+                                                       self.vertices[excluded])
+        else:
+            return False
+
+    def connected_avoiding_ids(self, id1: int, id2: int, excluded: int) -> bool:
+        """Return whether the vertex with id id1 is connected to the vertex with id id2 by a
+        path that does not use the vertex with id excluded, as connected_avoiding does for
+        items.
+
+        Preconditions:
+            - all(0 <= i < len(self.vertices) for i in (id1, id2, excluded))
+        """
+        vertices = self.view_list()
+        return self._components.connected_avoiding(vertices[id1], vertices[id2],
+                                                   vertices[excluded])
+
+    def get_neighbours(self, item: Any) -> NeighbourView:
+        """Return a set of the neighbours of the given item.
+
+        Note that the *items* are returned, not the _Vertex objects themselves. The set is a
+        read-only NeighbourView of the vertex's neighbours, so no new set is built.
+
+        Raise a ValueError if item does not appear as a vertex in this graph.
+        """
+        if item in self.vertices:
+            return NeighbourView(self, self.vertices[item])
+        else:
+            raise ValueError
+
+    def view(self, vertex_id: int) -> Vertex:
+        """Return the vertex with the given id (its index), as CSRGraph.view does.
+
+        Preconditions:
+            - 0 <= vertex_id < len(self.vertices)
+        """
+        return self.view_list()[vertex_id]
+
+    def view_list(self) -> list[Vertex]:
+        """Return a list of the vertices of this graph, in which the vertex with id (index) i is
+        at position i. The list must not be modified.
+        """
+        # The kind index lists every vertex in the order it was added, which is by index.
+        return self._kinds.members()
+
+    def neighbour_ids(self, vertex_id: int) -> NeighbourView:
+        """Return a read-only NeighbourView of the ids of the neighbours of the vertex with the
+        given id, as CSRGraph.neighbour_ids does.
+
+        Preconditions:
+            - 0 <= vertex_id < len(self.vertices)
+        """
+        return NeighbourView(self, self.view(vertex_id), ids=True)
+
+    def get_all_vertices(self, kind: str = '') -> set:
+        """Return a set of all vertex items in this graph.
+
+        If kind != '', only return the items of the given vertex kind.
+
+        Preconditions:
+            - kind in {'park', 'cemetery', 'health', 'fire station',
+                       'police station', 'tourist spot'}
+
+        *This function is adopted from Assignment 3, but modified as per the requirements of our
+        project. The locations in the doctstring are picked from the dataset mentioned in the
+        report*
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.get_all_vertices('tourist spot') == {'Citi Field', 'Fort Tryon Park'} or \
+                                                {'Fort Tryon Park', 'Citi Field'}
+        True
+        >>> g.get_all_vertices('park')
+        {'Owls Head Park'}
+        """
+        if kind != '':
+            return {v.item for v in self._kinds.members(kind)}
+        else:
+            return set(self.vertices.keys())
+
+    def sample(self, excluded: Collection = (), kind: Optional[str] = None,
+               band: Optional[str] = None, rng: Optional[random.Random] = None,
+               attempts: Optional[int] = None) -> Optional[Vertex]:
+        """Return a vertex drawn uniformly at random from the vertices of the given kind in
+        the given score band (see kind_index.score_band) that are not in excluded, where None
+        stands for any kind or any band. Return None if there is no such vertex, or if none
+        was found in attempts draws (see kind_index.KindIndex.sample).
+
+        The draws are made with rng (or the global random module if rng is None) from the
+        lists kept up to date by add_vertex, so this takes a constant number of draws on
+        average while excluded is a small part of those vertices.
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_vertex('Elmhurst Hospital Center' ,'health', 7)
+        >>> g.sample(band='risky').item
+        'Elmhurst Hospital Center'
+        >>> g.sample({g.vertices['Owls Head Park']}, kind='park') is None
+        True
+        """
+        choice = random.choice if rng is None else rng.choice
+        return self._kinds.sample(choice, kind, band, excluded, attempts)
+
+    def highest_degree(self, k: int) -> list[Vertex]:
+        """Return the k vertices of this graph with the most neighbours (or every vertex, if
+        there are fewer than k), most neighbours first, breaking ties by item from largest to
+        smallest.
+
+        This reads the degree index kept up to date by add_edge, so it does not look at the
+        vertices of lower degree than the k-th.
+
+        >>> g = Graph()
+        >>> for item in ['a', 'b', 'c', 'd']:
+        ...     g.add_vertex(item, 'park', 3)
+        >>> g.add_edge('a', 'b')
+        >>> g.add_edge('a', 'c')
+        >>> [vertex.item for vertex in g.highest_degree(3)], g.degree_histogram()
+        (['a', 'c', 'b'], [1, 2, 1])
+        """
+        return self._degrees.top(k, key=_vertex_item)
+
+    def degree_histogram(self) -> list[int]:
+        """Return a list whose element d is the number of vertices of this graph with d
+        neighbours, up to the highest degree in the graph.
+        """
+        return self._degrees.histogram()
+
+    def memory_footprint(self) -> dict[str, int]:
+        """Return the number of bytes this graph uses for its 'vertices' (the vertex objects,
+        their items and the vertices dictionary), its 'adjacency' (the neighbour sets), and
+        its 'indexes' (the component, degree and kind indexes, the path cache and the search
+        tables), along with their 'total'.
+
+        Each object is counted once, in the first of those parts it is found in (see
+        memory_usage.deep_size).
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> report = g.memory_footprint()
+        >>> list(report), report['total'] == sum(list(report.values())[:3])
+        (['vertices', 'adjacency', 'indexes', 'total'], True)
+        """
+        seen = {id(self)}
+        report = {'vertices': 0, 'adjacency': 0}
+        for vertex in self.vertices.values():
+            report['adjacency'] += deep_size(vertex.neighbours, seen, opaque=(Vertex,))
+        report['vertices'] = deep_size(self.vertices, seen)
+        report['indexes'] = sum(deep_size(index, seen) for index in (
+            self._components, self._degrees, self._kinds, self.path_cache, self._stamp,
+            self._parent))
+        report['total'] = report['vertices'] + report['adjacency'] + report['indexes']
+        return report
+
+    def iter_edges(self) -> Iterator[tuple]:
+        """Yield every edge of this graph exactly once, as a size 2 tuple of its vertex items.
+
+        This walks each adjacency set once, so it takes O(V + E) time.
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> list(g.iter_edges())
+        [('Citi Field', 'Owls Head Park')]
+        """
+        done = set()
+        for u in self.vertices.values():
+            for w in u.neighbours:
+                if w not in done:
+                    yield (u.item, w.item)
+            done.add(u)
+
+    def edges_list(self) -> list:
+        """
+        Return a list of all the edges in a graph. An edge is represented by a size 2 tuple of
+        each of its vertex.
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.add_edge('Citi Field', 'Fort Tryon Park')
+        >>> sorted(g.edges_list())
+        [('Citi Field', 'Fort Tryon Park'), ('Citi Field', 'Owls Head Park')]
+        """
+        return list(self.iter_edges())
+
+    def edge_arrays(self) -> tuple:
+        """Return (items, edges), where items is the list of the vertex items of this graph
+        and edges is a NumPy integer array of shape (E, 2) whose rows are the edges of this
+        graph as pairs of indices into items.
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> items, edges = g.edge_arrays()
+        >>> edges.tolist()
+        [[0, 1]]
+        """
+        # NumPy is only needed for bulk export, so it is not imported with the rest of the game.
+        import numpy as np
+
+        items = list(self.vertices)
+        ids = {v: i for i, v in enumerate(self.vertices.values())}
+        flat = array('q')
+        for u, i in ids.items():
+            for w in u.neighbours:
+                j = ids[w]
+                if i < j:
+                    flat.append(i)
+                    flat.append(j)
+        return items, np.frombuffer(flat, dtype=np.int64).reshape(-1, 2)
+
+    def write_edge_list(self, path: str) -> int:
+        """Write the edges of this graph to the csv file at path, one edge per row, and return
+        the number of edges written.
+        """
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            count = 0
+            edges = self.iter_edges()
+            batch = list(islice(edges, 4096))
+            while batch:
+                writer.writerows(batch)
+                count += len(batch)
+                batch = list(islice(edges, 4096))
+        return count
+
+    def assign_random_edges(self, rng: Optional[random.Random] = None,
+                            budget: int = EDGE_BUDGET) -> None:
+        """
+        Takes vertices in the graph and randomly assigns edges.
+        The purpose of this function is to replicate an arbitrary graph with random edges formed by
+        its set of vertices.
+
+        The random choices are made with rng, or with the global random module if rng is None.
+        The edges come from a random walk of budget steps, each of which adds at most one edge.
+
+        Preconditions:
+            - budget >= 0
+        """
+        choice = random.choice if rng is None else rng.choice
+        vertices = list(self.vertices)
+        edges = set()
+        counter = budget
+
+        curr = choice(vertices)
+
+        while counter != 0:
+            vert1 = choice(vertices)
+            if curr != vert1:
+                self.add_edge(curr, vert1)
+                if {curr, vert1} not in edges:
+                    edges.update({curr, vert1})
+            curr = vert1
+            counter -= 1
+
+    def _search(self, source: Vertex, goals: Collection[Vertex]) -> int:
+        """Run a breadth-first search from source and return the epoch it was run under.
+
+        The search stops as soon as every vertex in goals has been reached (or the component of
+        source is exhausted). Each reached vertex v gets self._stamp[v] == epoch and
+        self._parent[v] set to its predecessor on a shortest path from source.
+
+        The stamp and parent tables are kept between calls and are never cleared: bumping
+        self._epoch invalidates every old entry at once, so a search allocates no visited set.
+        The number of vertices reached is kept in self._reached.
+        """
+        self._epoch += 1
+        epoch = self._epoch
+        stamp = self._stamp
+        parent = self._parent
+
+        stamp[source] = epoch
+        parent[source] = None
+        remaining = len(goals) - (source in goals)
+        frontier = [source]
+        reached = 1
+
+        while frontier and remaining > 0:
+            next_frontier = []
+            for u in frontier:
+                for w in u.neighbours:
+                    if stamp.get(w) != epoch:
+                        stamp[w] = epoch
+                        parent[w] = u
+                        next_frontier.append(w)
+                        if w in goals:
+                            remaining -= 1
+            frontier = next_frontier
+            reached += len(frontier)
+
+        self._reached = reached
+        return epoch
+
+    def _trace(self, target: Vertex) -> list:
+        """Return the items on the path from the source of the last search to target."""
+        path = []
+        parent = self._parent
+        v = target
+        while v is not None:
+            path.append(v.item)
+            v = parent[v]
+        path.reverse()
+        return path
+
+    def get_path(self, item1: Any, item2: Any) -> list:
+        """Return the shortest path between item1 and item 2 in this graph.
+
+        The returned list contains the ITEMS along the path.
+        Return an empty list if no such path exists.
+
+        *Unlike the original version of this method, which repeated a recursive depth-first
+        search, this runs one breadth-first search, so the returned path is a true shortest path
+        and long paths do not hit the recursion limit. The result is kept in self.path_cache
+        until the next edge is added.*
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.add_edge('Owls Head Park', 'Fort Tryon Park')
+        >>> g.get_path('Citi Field', 'Fort Tryon Park')
+        ['Citi Field', 'Owls Head Park', 'Fort Tryon Park']
+        """
+        if item1 in self.vertices and item2 in self.vertices:
+            return list(self.path_cache.get((item1, item2, 'shortest'),
+                                            lambda: self._shortest_path(item1, item2)))
+        return []
+
+    def _shortest_path(self, item1: Any, item2: Any) -> tuple:
+        """Return the items along a shortest path between item1 and item2 as a tuple, or an
+        empty tuple if there is none. This is what get_path caches.
+        """
+        v2 = self.vertices[item2]
+        epoch = self._search(self.vertices[item1], (v2,))
+        if self._stamp.get(v2) == epoch:
+            return tuple(self._trace(v2))
+        return ()
+
+    def get_paths(self, item: Any, targets: Iterable) -> dict[Any, list]:
+        """Return a dictionary mapping each of the given target items to a shortest path from
+        item to it, computed with a single breadth-first search.
+
+        Targets that are not connected to item (or not in this graph) are left out.
+        Return an empty dictionary if item does not appear in this graph.
+
+        >>> g = Graph()
+        >>> g.add_vertex('Citi Field' ,'tourist spot', 5)
+        >>> g.add_vertex('Fort Tryon Park' ,'tourist spot', 4)
+        >>> g.add_vertex('Owls Head Park' ,'park', 3)
+        >>> g.add_vertex('Hell Gate Bridge' ,'tourist spot', 5)
+        >>> g.add_edge('Citi Field', 'Owls Head Park')
+        >>> g.add_edge('Owls Head Park', 'Fort Tryon Park')
+        >>> g.get_paths('Citi Field', ['Fort Tryon Park', 'Hell Gate Bridge'])
+        {'Fort Tryon Park': ['Citi Field', 'Owls Head Park', 'Fort Tryon Park']}
+        """
+        if item not in self.vertices:
+            return {}
+        goals = {self.vertices[t]: None for t in targets if t in self.vertices}
+        epoch = self._search(self.vertices[item], goals)
+        return {v.item: self._trace(v) for v in goals if self._stamp.get(v) == epoch}
+
+
+def _vertex_neighbours(vertex: Vertex) -> set[Vertex]:
+    """Return the neighbours of vertex. This is how a Graph's ComponentIndex reads adjacency."""
+    return vertex.neighbours
+
+
+def _vertex_item(vertex: Vertex) -> Any:
+    """Return the item of vertex, the key that breaks ties in Graph.highest_degree."""
+    return vertex.item
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['csv', 'random', 'array', 'collections.abc', 'itertools', 'numpy',
+                          'component_index', 'degree_index', 'kind_index', 'memory_usage',
+                          'path_cache']
+    })
@@ -0,0 +1,287 @@
+"""
+Opt-in instrumentation of the game's hot paths.
+
+When a batch of games is slow, this tells where the time goes. While an Instrumentation is
+enabled, the functions in INSTRUMENTED and HELPERS are replaced by wrappers that count their
+calls and time them, and the graph traversals are replaced by wrappers that also count the
+vertices they visit. Disabling it puts the original functions back. Nothing is wrapped while
+instrumentation is disabled, so it costs nothing then.
+
+The counts are split by game: a game's record holds everything that happened since the
+previous game ended, so it includes building the game's graph and players, and it is closed
+when the game ends. part1.run_game and part1.play_game both play their game with
+part1._play_game, so every game is recorded, whether it was played by run_game, a result sink,
+the command line, part4.run_campaign or a sweep.
+
+    with Instrumentation() as instruments:
+        part4.count_robber_wins(100, 'RobberPlayer', 'data/small_location_data.csv')
+    instruments.write_json('report.json')
+
+Times are inclusive: the time of get_valid_path includes the path searches it runs. Only the
+games played in this process are seen, so use a single worker.
+"""
+from __future__ import annotations
+import csv
+import functools
+import json
+import time
+from typing import Any, Callable
+
+import component_index
+import csr_graph
+import graph_vertex
+import part1
+import part2
+import path_planner
+
+# The timed functions of a game, as (owner, attribute, name) triples. Functions with the same
+# name are counted together, whichever backend or robber class they belong to. The robber
+# plans with path_planner.PathPlanner and the cop checks its moves with connected_avoiding_ids.
+INSTRUMENTED = [
+    (part2.RobberPlayer, 'get_valid_path', 'get_valid_path'),
+    (part2.RiskyRobberPlayer, 'get_valid_path', 'get_valid_path'),
+    (path_planner.PathPlanner, 'plan', 'plan'),
+    (path_planner.PathPlanner, 'search', 'planner_search'),
+    (part2.CopPlayer, 'make_move', 'make_move'),
+    (graph_vertex.Graph, 'connected_avoiding_ids', 'connected_avoiding_ids'),
+    (csr_graph.CSRGraph, 'connected_avoiding_ids', 'connected_avoiding_ids'),
+    (part1, 'load_location_graph', 'load_location_graph'),
+]
+
+# Timed helpers that a game does not call, for tools that call them directly. They are
+# counted in the same way, and stay at zero calls in the records of games.
+HELPERS = [
+    (graph_vertex.Vertex, 'check_connected', 'check_connected'),
+    (graph_vertex.Vertex, 'connected_distance', 'connected_distance'),
+    (csr_graph.CSRVertex, 'check_connected', 'check_connected'),
+    (csr_graph.CSRVertex, 'connected_distance', 'connected_distance'),
+    (graph_vertex.Graph, 'get_path', 'get_path'),
+    (csr_graph.CSRGraph, 'get_path', 'get_path'),
+    (graph_vertex.Graph, 'connected_avoiding', 'connected_avoiding'),
+    (csr_graph.CSRGraph, 'connected_avoiding', 'connected_avoiding'),
+]
+
+
+def _search_visits(graph: Any, _: int) -> int:
+    """Return the number of vertices reached by the last search of graph, which _search
+    records as it runs (so the count does not look at the rest of the graph).
+    """
+    return graph._reached
+
+
+# The traversals whose visited vertices are counted, as (owner, attribute, visits) triples,
+# where visits(instance, result) returns the number of vertices the traversal visited.
+TRAVERSALS = [
+    (graph_vertex.Graph, '_search', _search_visits),
+    (csr_graph.CSRGraph, '_search', _search_visits),
+    (path_planner.PathPlanner, 'search', lambda _, result: len(result[0])),
+    (component_index.ComponentIndex, '_label_without', lambda _, result: len(result)),
+    (component_index.ComponentIndex, '_find_cut_vertices',
+     lambda index, _: len(index._parent)),
+]
+
+
+class Instrumentation:
+    """Counts and times the calls of the hot paths, game by game.
+
+    Instance Attributes:
+        - games: a record for each finished game, mapping each name in INSTRUMENTED and HELPERS
+          to its [calls, seconds], and 'node_visits' to the vertices the traversals visited
+        - enabled: whether the wrappers are installed
+
+    Vertex.check_connected and Vertex.connected_distance call themselves on the neighbours of
+    a vertex, so only their outermost calls are counted as calls, and every call (one per
+    vertex visited) is counted as a node visit.
+
+    >>> g = graph_vertex.Graph()
+    >>> for item in ['a', 'b', 'c']:
+    ...     g.add_vertex(item, 'park', 3)
+    >>> g.add_edge('a', 'b')
+    >>> g.add_edge('b', 'c')
+    >>> with Instrumentation() as instruments:
+    ...     _ = g.get_path('a', 'c')
+    ...     _ = g.vertices['a'].check_connected('c', set())
+    ...     instruments.end_game()
+    >>> record = instruments.games[0]
+    >>> record['get_path'][0], record['check_connected'][0], record['node_visits']
+    (1, 1, 6)
+    >>> hasattr(graph_vertex.Graph.get_path, '__wrapped__')
+    False
+
+    Games whose results are written to a sink are recorded too:
+
+    >>> import game_results, part4
+    >>> with Instrumentation() as instruments:
+    ...     _ = part4.count_robber_wins(2, 'RobberPlayer', 'data/small_location_data.csv', 7,
+    ...                                 sink=game_results.SummarySink())
+    >>> len(instruments.games), instruments.games[0]['load_location_graph'][0]
+    (2, 1)
+
+    The robber plans with the path planner and the cop checks its moves with
+    connected_avoiding_ids:
+
+    >>> rng = part4.game_rng(7, 0)
+    >>> players = part1.initialize_robber_player('RobberPlayer', 'data/small_location_data.csv',
+    ...                                          rng=rng)
+    >>> with Instrumentation() as instruments:
+    ...     _ = part1.play_game(*players, rng)
+    >>> record = instruments.games[0]
+    >>> record['plan'][0] > 0, record['connected_avoiding_ids'][0] > 0, record['get_path'][0]
+    (True, True, 0)
+    """
+    games: list[dict]
+    enabled: bool
+    _current: dict
+    _originals: list[tuple[Any, str, Any]]
+    _depth: int
+
+    def __init__(self) -> None:
+        """Initialize a disabled instrumentation with no games recorded."""
+        self.games = []
+        self.enabled = False
+        self._current = _new_record()
+        self._originals = []
+        self._depth = 0
+
+    def __enter__(self) -> Instrumentation:
+        """Enable this instrumentation for the body of a with statement."""
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Disable this instrumentation at the end of a with statement."""
+        self.disable()
+
+    def enable(self) -> None:
+        """Install the wrappers. Only one instrumentation may be enabled at a time."""
+        if self.enabled:
+            return
+        for owner, attribute, name in INSTRUMENTED + HELPERS:
+            recursive = owner is graph_vertex.Vertex
+            self._install(owner, attribute,
+                          self._timed(name, getattr(owner, attribute), recursive))
+        for owner, attribute, visits in TRAVERSALS:
+            self._install(owner, attribute, self._counted(visits, getattr(owner, attribute)))
+        self._install(part1, '_play_game', self._game(part1._play_game))
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Put back the original functions."""
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals = []
+        self.enabled = False
+
+    def totals(self) -> dict:
+        """Return the counts of every recorded game added together."""
+        totals = _new_record()
+        for record in self.games:
+            for name, value in record.items():
+                if name == 'node_visits':
+                    totals[name] += value
+                else:
+                    totals[name][0] += value[0]
+                    totals[name][1] += value[1]
+        return totals
+
+    def summary(self) -> dict:
+        """Return the totals and the record of each game, ready to be written as JSON."""
+        return {'games': len(self.games), 'totals': self.totals(), 'per_game': self.games}
+
+    def write_json(self, path: str) -> None:
+        """Write the summary of this instrumentation to a JSON file."""
+        with open(path, 'w') as file:
+            json.dump(self.summary(), file, indent=2)
+
+    def write_csv(self, path: str) -> None:
+        """Write a csv file with one row per game, with the calls and seconds of each
+        instrumented function and the node visits of the game.
+        """
+        names = list(_new_record())
+        names.remove('node_visits')
+        header = ['game'] + [f'{name}_{column}' for name in names
+                             for column in ('calls', 'seconds')] + ['node_visits']
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for index, record in enumerate(self.games):
+                writer.writerow([index] + [value for name in names for value in record[name]]
+                                + [record['node_visits']])
+
+    def end_game(self) -> None:
+        """Close the record of the current game and start a new one. The wrapper of
+        part1._play_game calls this when a game ends.
+        """
+        self.games.append(self._current)
+        self._current = _new_record()
+
+    def _install(self, owner: Any, attribute: str, wrapper: Any) -> None:
+        """Replace owner.attribute with wrapper, remembering the original."""
+        self._originals.append((owner, attribute, owner.__dict__[attribute]))
+        setattr(owner, attribute, wrapper)
+
+    def _timed(self, name: str, function: Callable, recursive: bool) -> Callable:
+        """Return a wrapper of function that counts and times its outermost calls under name,
+        and counts every call as a node visit if function is recursive.
+        """
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if recursive:
+                self._current['node_visits'] += 1
+            if self._depth > 0 and recursive:
+                return function(*args, **kwargs)
+            self._depth += recursive
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                entry = self._current[name]
+                entry[0] += 1
+                entry[1] += time.perf_counter() - start
+                self._depth -= recursive
+        return wrapper
+
+    def _counted(self, visits: Callable[[Any, Any], int], function: Callable) -> Callable:
+        """Return a wrapper of the traversal function that counts the vertices it visits."""
+        @functools.wraps(function)
+        def wrapper(instance: Any, *args: Any, **kwargs: Any) -> Any:
+            result = function(instance, *args, **kwargs)
+            self._current['node_visits'] += visits(instance, result)
+            return result
+        return wrapper
+
+    def _game(self, function: Callable) -> Callable:
+        """Return a wrapper of part1._play_game that closes the record of each game."""
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.end_game()
+        return wrapper
+
+
+def _new_record() -> dict:
+    """Return the record of a game in which nothing has been counted yet."""
+    record = {name: [0, 0.0] for _, _, name in INSTRUMENTED + HELPERS}
+    record['node_visits'] = 0
+    return record
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136', 'W0212'],
+        'extra-imports': ['csv', 'functools', 'json', 'time', 'component_index', 'csr_graph',
+                          'graph_vertex', 'part1', 'part2', 'path_planner'],
+        'allowed-io': ['Instrumentation.write_json', 'Instrumentation.write_csv']
+    })
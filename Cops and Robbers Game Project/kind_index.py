@@ -0,0 +1,112 @@
+"""
+Kind and score-band indexes shared by graph_vertex.Graph and csr_graph.CSRGraph.
+
+part2.choose_target_location used to list every vertex of the graph each time it picked a
+target, and Graph.get_all_vertices(kind) looked at every vertex to find the ones of a kind. A
+vertex is never removed from a graph, so the graph can instead keep lists of its vertices
+(all of them, those of each kind, those in each score band, and those of each kind in each
+band) that add_vertex appends to. A uniformly random member of any of these lists is one random
+index away, and a random member outside a set of exclusions is found by drawing again until one
+is not excluded, which takes a constant number of draws on average while the exclusions are a
+small part of the list.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Collection, Optional
+
+# Locations with a score above this are in the 'risky' band and the rest are in the 'safe'
+# band. This is the same as path_planner.SAFE_SCORE (which cannot be imported here, since
+# path_planner imports graph_vertex, which imports this module).
+SAFE_SCORE = 5
+
+# The score bands.
+BANDS = ('safe', 'risky')
+
+
+def score_band(score: int) -> str:
+    """Return the band of the given score.
+
+    >>> score_band(3), score_band(7)
+    ('safe', 'risky')
+    """
+    return 'safe' if score <= SAFE_SCORE else 'risky'
+
+
+class KindIndex:
+    """Lists of the nodes of a graph by kind and score band, in the order they were added.
+
+    Nodes can be any hashable objects (graph_vertex.Vertex objects or CSRGraph ids).
+
+    >>> index = KindIndex()
+    >>> index.add('a', 'park', 3)
+    >>> index.add('b', 'health', 7)
+    >>> index.add('c', 'park', 3)
+    >>> index.members('park'), index.members(band='risky'), index.members()
+    (['a', 'c'], ['b'], ['a', 'b', 'c'])
+    >>> import random
+    >>> index.sample(random.Random(1).choice, kind='park', excluded={'a'}, attempts=10)
+    'c'
+    >>> index.sample(random.Random(1).choice, kind='park', excluded={'a', 'c'}) is None
+    True
+    """
+    _lists: dict[tuple[Optional[str], Optional[str]], list]
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self._lists = {(None, None): []}
+
+    def __len__(self) -> int:
+        """Return the number of nodes in this index."""
+        return len(self._lists[(None, None)])
+
+    def add(self, node: Any, kind: str, score: int) -> None:
+        """Add node, of the given kind and score, to the end of the lists it belongs to. A node
+        must only be added once.
+        """
+        band = score_band(score)
+        lists = self._lists
+        for key in ((None, None), (kind, None), (None, band), (kind, band)):
+            if key in lists:
+                lists[key].append(node)
+            else:
+                lists[key] = [node]
+
+    def members(self, kind: Optional[str] = None, band: Optional[str] = None) -> list:
+        """Return the nodes of the given kind in the given band, in the order they were added,
+        where None stands for any kind or any band. The list must not be modified.
+        """
+        return self._lists.get((kind, band), [])
+
+    def sample(self, choice: Callable[[list], Any], kind: Optional[str] = None,
+               band: Optional[str] = None, excluded: Collection = (),
+               attempts: Optional[int] = None) -> Optional[Any]:
+        """Return a node drawn uniformly at random with choice (such as random.choice) from the
+        members of the given kind and band that are not in excluded.
+
+        Members are drawn until one is not excluded, up to attempts draws (the number of
+        members if attempts is None). Return None if every draw was excluded, which is
+        unlikely unless most of the members are.
+        """
+        members = self.members(kind, band)
+        if attempts is None:
+            attempts = len(members)
+        for _ in range(attempts if members else 0):
+            node = choice(members)
+            if node not in excluded:
+                return node
+        return None
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': []
+    })
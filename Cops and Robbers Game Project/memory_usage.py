@@ -0,0 +1,89 @@
+"""
+Memory accounting shared by graph_vertex.Graph.memory_footprint and
+csr_graph.CSRGraph.memory_footprint.
+
+sys.getsizeof only counts an object itself, not the objects it refers to, so the size of a
+structure is found by walking it: the keys and values of dictionaries, the elements of lists,
+tuples and sets, and the attributes (in __dict__ or __slots__) of other objects. An object
+reached more than once (such as an item that is both a key of Graph.vertices and the item of
+its vertex) is only counted the first time, so the parts of a graph can be measured one after
+the other with the same set of seen objects without counting anything twice.
+"""
+from __future__ import annotations
+import sys
+from types import FunctionType, MethodType, ModuleType
+from typing import Any
+
+# Objects of these types are counted but not walked: their attributes lead back to the code and
+# the modules of the program, not to the data of a graph.
+_LEAVES = (type, FunctionType, MethodType, ModuleType)
+
+# Maps each class to the names of its __slots__ (see _slots).
+_slot_names = {}
+
+
+def deep_size(root: Any, seen: set[int], opaque: tuple[type, ...] = ()) -> int:
+    """Return the number of bytes used by root and the objects reachable from it that are not
+    in seen (a set of object ids), and add the ids of the objects counted to seen. Objects of
+    the types in opaque are neither counted nor walked.
+
+    >>> seen = set()
+    >>> deep_size(['ab', 'ab'], seen) == sys.getsizeof(['ab', 'ab']) + sys.getsizeof('ab')
+    True
+    >>> deep_size('ab', seen)
+    0
+    """
+    total = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, opaque):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            children = [*obj.keys(), *obj.values()]
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            children = obj
+        elif not isinstance(obj, _LEAVES):
+            children = _attributes(obj)
+        else:
+            continue
+        # Most of the objects in a graph are reached many times (each vertex is in several
+        # indexes), so only the ones not yet counted are put on the stack.
+        stack.extend([child for child in children if id(child) not in seen])
+    return total
+
+
+def _attributes(obj: Any) -> list:
+    """Return the values of the attributes of obj that are stored in its __dict__ or in its
+    __slots__.
+    """
+    values = [getattr(obj, slot) for slot in _slots(type(obj)) if hasattr(obj, slot)]
+    if hasattr(obj, '__dict__'):
+        values.append(obj.__dict__)
+    return values
+
+
+def _slots(cls: type) -> tuple[str, ...]:
+    """Return the names of the __slots__ of cls and its superclasses."""
+    if cls not in _slot_names:
+        _slot_names[cls] = tuple(slot for base in cls.__mro__
+                                 for slot in base.__dict__.get('__slots__', ()))
+    return _slot_names[cls]
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['sys', 'types']
+    })
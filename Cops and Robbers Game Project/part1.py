@@ -4,27 +4,174 @@ there is path between the start, the mid and the end(escape)
 """
 from __future__ import annotations
 import csv
+import os
+import pickle
+import random
+from typing import Any, Optional
+
+import game_results
 import graph_vertex
 import part2
 
 
-def load_location_graph(data_file: str) -> graph_vertex.Graph:
-    """Will load a location graph using a data file and assign a score to each vertex
+# The score given to each kind of location.
+SCORE_DICT = {'park': 3, 'cemetery': 0, 'health': 7, 'fire station': 3,
+              'police station': 10, 'tourist spot': 5}
+
+# The directory, next to each data file, that holds the parsed snapshots of its data files.
+SNAPSHOT_DIR = '__locationcache__'
+
+# The format of the snapshots; snapshots written in another format are parsed again.
+SNAPSHOT_VERSION = 2
+
+# Maps (path, modification time, size, scores) to the scored rows of a parsed data file.
+_location_tables = {}
+
+# Maps (path, modification time, size) to the coordinates of the locations of a data file.
+_location_coordinates = {}
 
+
+def _read_locations(data_file: str, stamp: tuple) -> list:
+    """Return the (item, kind, coordinates) rows of data_file, where coordinates is the
+    (longitude, latitude) pair in the third and fourth columns of the row, or None if the row
+    has no coordinates.
+
+    The rows are read from the snapshot of data_file if it was written for the same stamp
+    (modification time and size) of the file by the same SNAPSHOT_VERSION. Otherwise the csv
+    file is parsed and a new snapshot is written, so that the next process to load data_file
+    can skip the parsing.
     """
-    score_dict = {'park': 3, 'cemetery': 0, 'health': 7, 'fire station': 3,
-                  'police station': 10, 'tourist spot': 5}
+    directory, name = os.path.split(os.path.abspath(data_file))
+    snapshot = os.path.join(directory, SNAPSHOT_DIR, name + '.pickle')
 
-    location_graph = graph_vertex.Graph()
+    try:
+        with open(snapshot, 'rb') as file:
+            version, saved_stamp, rows = pickle.load(file)
+        if version == SNAPSHOT_VERSION and saved_stamp == stamp:
+            return rows
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        pass
 
     with open(data_file, 'r') as file:
-        reader = csv.reader(file)
+        rows = [(location[0], location[1], _coordinates(location[2:4]))
+                for location in csv.reader(file)]
+
+    try:
+        os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+        # Write to a temporary file and rename it, so a process reading the snapshot never
+        # sees it half written.
+        temporary = f'{snapshot}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            pickle.dump((SNAPSHOT_VERSION, stamp, rows), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, snapshot)
+    except OSError:
+        pass  # the snapshot is only an optimisation
+
+    return rows
+
+
+def _coordinates(columns: list[str]) -> Optional[tuple[float, float]]:
+    """Return the (longitude, latitude) pair held in columns, or None if they are missing or
+    not numbers.
+
+    >>> _coordinates(['-73.9', '40.8'])
+    (-73.9, 40.8)
+    >>> _coordinates(['', '']) is None and _coordinates([]) is None
+    True
+    """
+    try:
+        return (float(columns[0]), float(columns[1]))
+    except (IndexError, ValueError):
+        return None
+
+
+def load_location_table(data_file: str, score_dict: Optional[dict] = None) -> tuple:
+    """Return a tuple of (item, kind, score) rows, one for each location in data_file, where
+    each score is taken from score_dict (SCORE_DICT if None).
+
+    The table is built once per version of data_file (and score_dict) in each process and
+    shared by every later call, so it must not be modified.
+
+    >>> table = load_location_table('data/small_location_data.csv')
+    >>> table[0]
+    ('Van Cortlandt Park', 'park', 3)
+    >>> load_location_table('data/small_location_data.csv') is table
+    True
+    """
+    if score_dict is None:
+        score_dict = SCORE_DICT
+
+    stat = os.stat(data_file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = (os.path.abspath(data_file), stamp, tuple(sorted(score_dict.items())))
+
+    if key not in _location_tables:
+        _location_tables[key] = tuple((item, kind, score_dict[kind])
+                                      for item, kind, _ in _read_locations(data_file, stamp))
+
+    return _location_tables[key]
+
+
+def load_location_coordinates(data_file: str) -> dict:
+    """Return a dictionary mapping each location in data_file that has coordinates to its
+    (longitude, latitude) pair. Like load_location_table, the dictionary is shared by every
+    call for the same version of data_file, so it must not be modified.
+
+    >>> coordinates = load_location_coordinates('data/large_location_data.csv')
+    >>> coordinates['Van Cortlandt Park']
+    (-73.88895811640342, 40.8962098695574)
+    >>> 'precinct 11' in coordinates
+    False
+    """
+    stat = os.stat(data_file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = (os.path.abspath(data_file), stamp)
+
+    if key not in _location_coordinates:
+        _location_coordinates[key] = {item: coordinates
+                                      for item, _, coordinates in _read_locations(data_file, stamp)
+                                      if coordinates is not None}
+
+    return _location_coordinates[key]
+
 
-        for location in reader:
-            location_score = score_dict[location[1]]
-            location_graph.add_vertex(item=location[0], kind=location[1], score=location_score)
+def load_location_graph(data_file: str, backend: type = graph_vertex.Graph,
+                        rng: Optional[random.Random] = None, model: str = 'random_walk',
+                        average_degree: float = 3.0, score_dict: Optional[dict] = None,
+                        edge_budget: int = graph_vertex.EDGE_BUDGET) -> graph_vertex.Graph:
+    """Will load a location graph using a data file and assign a score to each vertex
+
+    The graph is built with the given backend class, either graph_vertex.Graph or
+    csr_graph.CSRGraph. The score of each vertex is taken from score_dict (SCORE_DICT if
+    None). Its random edges are drawn from rng, or from the global random module if rng is
+    None.
+
+    With the default model, 'random_walk', the edges come from Graph.assign_random_edges, with
+    a walk of edge_budget steps.
+    The models in graph_generators.SPATIAL_MODELS join the locations that are close to each
+    other, using the coordinates in the data file (see graph_generators.assign_spatial_edges).
+    Any other model is one of graph_generators.MODELS, which gives a connected graph with the
+    given average degree.
 
-    location_graph.assign_random_edges()
+    The data file is only parsed the first time it is loaded (see load_location_table); every
+    call returns a fresh graph with its own random edges.
+    """
+    location_graph = backend()
+
+    for item, kind, score in load_location_table(data_file, score_dict):
+        location_graph.add_vertex(item=item, kind=kind, score=score)
+
+    if model == 'random_walk':
+        location_graph.assign_random_edges(rng, edge_budget)
+    else:
+        # NumPy is only needed for the generated models, so it is not imported with the game.
+        import graph_generators
+        if model in graph_generators.SPATIAL_MODELS:
+            graph_generators.assign_spatial_edges(location_graph,
+                                                  load_location_coordinates(data_file), model,
+                                                  average_degree, rng)
+        else:
+            graph_generators.assign_edges(location_graph, model, average_degree, rng)
 
     return location_graph
 
@@ -33,6 +180,10 @@ def randomize_start(location_graph: graph_vertex.Graph) -> list:
     """Given a location_graph, return a list of 2 suitable start positions based on the number of
     neighbours the vertex has.
 
+    These are the two vertices with the most neighbours, ties broken by item from largest to
+    smallest, read from the degree index the graph keeps (see Graph.highest_degree) rather than
+    by sorting every vertex.
+
     >>> location_graph = graph_vertex.Graph()
     >>> location_graph.add_vertex(item = 'hi', kind='s', score=5 )
     >>> location_graph.add_vertex(item='hello', kind = 'h', score =7)
@@ -49,23 +200,23 @@ def randomize_start(location_graph: graph_vertex.Graph) -> list:
     'hey'
 
     """
-    vertices_so_far = []
-    for item in location_graph.get_all_vertices(''):
-        vertex = location_graph.vertices[item]
+    return location_graph.highest_degree(2)
 
-        vertices_so_far.append((vertex.degree(), vertex.item))
 
-    vertices_so_far.sort(reverse=True)
-    return [location_graph.vertices[vertices_so_far[0][1]],
-            location_graph.vertices[vertices_so_far[1][1]]]
+def initialize_robber_player(player: str, data: str, backend: type = graph_vertex.Graph,
+                             rng: Optional[random.Random] = None, move_limit: int = 20,
+                             **graph_options: Any) -> list:
+    """Initialize a new robber player by setting the start location and target location
+    The location graph is built with the given backend class, and every random choice is made
+    with rng (or the global random module if rng is None).
 
+    The robber may make at most move_limit moves. Any other keyword arguments (model,
+    average_degree, score_dict and edge_budget) are passed on to load_location_graph.
 
-def initialize_robber_player(player: str, data: str) -> list:
-    """Initialize a new robber player by setting the start location and target location
     Preconditions:
       - player in {'RobberPlayer', 'RiskyRobberPlayer'}
     """
-    location_graph = load_location_graph(data)
+    location_graph = load_location_graph(data, backend, rng, **graph_options)
     start_locations = randomize_start(location_graph)
     cop_start = start_locations[1]
 
@@ -73,120 +224,164 @@ def initialize_robber_player(player: str, data: str) -> list:
 
     rob_start = start_locations[0]
 
-    rob_target_location = part2.choose_target_location(rob_start, set(), location_graph, 'mid')
+    rob_target_location = part2.choose_target_location(rob_start, set(), location_graph, 'mid',
+                                                       rng)
 
     if player == 'RobberPlayer':
-        return [part2.RobberPlayer(curr_location=rob_start, target_location=rob_target_location),
+        return [part2.RobberPlayer(curr_location=rob_start, target_location=rob_target_location,
+                                   move_limit=move_limit),
                 cop_player, location_graph]
 
     if player == 'RiskyRobberPlayer':
         return [part2.RiskyRobberPlayer(curr_location=rob_start,
-                                        target_location=rob_target_location),
+                                        target_location=rob_target_location,
+                                        move_limit=move_limit),
                 cop_player, location_graph]
 
 
-# def run_game(player: str, data: str) -> list:
-#     """run the game with given robber player and cop player and return the winner as well as
-#     the paths of robber and cops
-#
-#     Precondition:
-#         - player in {'RobberPlayer', 'RiskyRobberPlayer'}
-#     """
-    #
-    # robber_path = robber_player.get_valid_path(location_graph)
-    #
-    # cop_path = []
-    #
-    # for i in range(1, len(robber_path)):
-    #     robber_player.update_location(robber_path[i])
-    #     robber_player.add_move_count()  # add 1 move to the move_count
-    #
-    #     # Make moves for cop
-    #     cop_path.append(cop_player.curr_location)
-    #     cop_player.make_move(location_graph, robber_player.get_target_location()[0])
-    #     if robber_player.get_target_location()[0].item == robber_player.get_curr_location():
-    #         if robber_player.get_target_location()[1] == 'end':
-    #             print('The Robber Wins!')
-    #             print([1, cop_path, robber_path])
-    #             return [1, cop_path, robber_path]
-    #
-    #         elif robber_player.get_target_location()[1] == 'mid':
-    #             new_target = part2.choose_target_location(robber_player.get_curr_location(),
-    #                                                       {robber_player.get_curr_location()},
-    #                                                       location_graph, 'end')
-    #
-    #             robber_player.update_target_location(new_target)
-    #
-    #             # Recurse
-    #             run_game(robber_player, cop_player, location_graph)
-    #
-    #     if robber_player.get_curr_location() == cop_player.curr_location:
-    #         print('The r2 Wins!')
-    #         print([0, cop_path, robber_path])
-    #         return [0, cop_path, robber_path]
-    #
-    #     if robber_player.get_move_count() == robber_player.get_move_limit():
-    #         print('The r1 Wins!')
-    #         print([0, cop_path, robber_path])
-    #         return [0, cop_path, robber_path]
-    #
-    # # if we get to the end and no one wins
-    # print('The Cop Wins!')
-    # return [0, cop_path, robber_path]
-
 def run_game(robber_player: part2.Player, cop_player: part2.CopPlayer,
-             location_graph: graph_vertex.Graph) \
-        -> list:
+             location_graph: graph_vertex.Graph, rng: Optional[random.Random] = None,
+             verbose: bool = True) -> list:
     """run the game with given robber player and cop player and return the winner as well as
     the paths of robber and cops
 
+    The robber follows its valid path one location per move, and the cop makes one move after
+    each robber move. The robber wins by reaching its 'end' target; on reaching its 'mid'
+    target it is given a new 'end' target and plans a new path from there. The cop wins by
+    landing on the robber, when the robber runs out of moves, or when the robber has no
+    valid path to follow.
+
+    The returned list is [winner, cop_path, robber_path], where winner is 1 if the robber won
+    and 0 otherwise, cop_path lists the cop's location before each of its moves, and
+    robber_path lists every location the robber moved to.
+
+    New targets are chosen with rng (or the global random module if rng is None). The winner
+    and paths are only printed if verbose is True. To play many games, use play_game, which
+    returns a compact game_results.GameResult instead.
+
     Precondition:
         - player in {'RobberPlayer', 'RiskyRobberPlayer'}
+
+    Here the robber reaches its 'mid' target 'b', is given the 'end' target 'e', and wins on
+    reaching it. A robber at 'f', whose only neighbour has a score above 5, is cornered.
+
+    >>> location_graph = graph_vertex.Graph()
+    >>> for item, score in [('a', 3), ('b', 3), ('c', 3), ('d', 3), ('e', 8), ('f', 9)]:
+    ...     location_graph.add_vertex(item, 'park', score)
+    >>> for edge in [('a', 'b'), ('b', 'c'), ('c', 'd'), ('a', 'e'), ('e', 'f')]:
+    ...     location_graph.add_edge(*edge)
+    >>> vertices = location_graph.vertices
+    >>> robber = part2.RobberPlayer(vertices['a'], (vertices['b'], 'mid'))
+    >>> _ = run_game(robber, part2.CopPlayer(vertices['d']), location_graph, random.Random(1))
+    The Robber Wins!
+    [1, ['d', 'c', 'c'], ['b', 'a', 'e']]
+    >>> robber = part2.RobberPlayer(vertices['f'], (vertices['c'], 'end'))
+    >>> run_game(robber, part2.CopPlayer(vertices['d']), location_graph, verbose=False)
+    [0, [], []]
     """
+    result, robber_path, cop_path = _play_game(robber_player, cop_player, location_graph, rng,
+                                               trace=True)
 
-    robber_path = robber_player.get_valid_path(location_graph)
+    if verbose:
+        if result.winner == 1:
+            print('The Robber Wins!')
+        else:
+            print('The Cop Wins!')
+        print([result.winner, cop_path, robber_path])
 
-    cop_path = []
+    return [result.winner, cop_path, robber_path]
 
-    for i in range(1, len(robber_path)):
-        robber_player.update_location(robber_path[i])
-        robber_player.add_move_count()  # add 1 move to the move_count
 
-        # Make moves for cop
-        cop_path.append(cop_player.curr_location.item)
-        cop_player.make_move(location_graph, robber_player.get_target_location()[0])
+def play_game(robber_player: part2.Player, cop_player: part2.CopPlayer,
+              location_graph: graph_vertex.Graph, rng: Optional[random.Random] = None,
+              trace: bool = False, game: Optional[int] = None) -> game_results.GameResult:
+    """Play a game the same way as run_game, without printing anything, and return its result
+    numbered game.
 
-        if robber_player.get_target_location() == robber_player.get_curr_location():
-            if robber_player.get_target_location()[1] == 'end':
-                print('The Robber Wins!')
-                print([1, cop_path, robber_path])
-                return [1, cop_path, robber_path]
+    The paths of the robber and the cop are only recorded, as the ids (Vertex.index) of their
+    locations, if trace is True.
 
-            elif robber_player.get_target_location()[1] == 'mid':
+    >>> location_graph = graph_vertex.Graph()
+    >>> for item in ['a', 'b', 'c', 'd']:
+    ...     location_graph.add_vertex(item, 'park', 3)
+    >>> for edge in [('a', 'b'), ('b', 'c'), ('c', 'd')]:
+    ...     location_graph.add_edge(*edge)
+    >>> vertices = location_graph.vertices
+    >>> robber = part2.RobberPlayer(vertices['a'], (vertices['c'], 'end'))
+    >>> result = play_game(robber, part2.CopPlayer(vertices['d']), location_graph, trace=True)
+    >>> result
+    GameResult(winner=1, reason='escaped', moves=2, path_length=2)
+    >>> result.robber_path, result.cop_path
+    ([1, 2], [3, 2])
+    """
+    result, robber_path, cop_path = _play_game(robber_player, cop_player, location_graph, rng,
+                                               trace)
+    result.game = game
+    if trace:
+        vertices = location_graph.vertices
+        result.robber_path = [vertices[item].index for item in robber_path]
+        result.cop_path = [vertices[item].index for item in cop_path]
+    return result
+
+
+def _play_game(robber_player: part2.Player, cop_player: part2.CopPlayer,
+               location_graph: graph_vertex.Graph, rng: Optional[random.Random],
+               trace: bool) -> tuple[game_results.GameResult, Optional[list], Optional[list]]:
+    """Play a game as described in run_game and return (result, robber_path, cop_path), where
+    the paths list items as in run_game if trace is True and are None otherwise.
+    """
+    robber_path = [] if trace else None
+    cop_path = [] if trace else None
+    winner = 0
+    reason = game_results.CORNERED
+    moves = 0
+    path_length = 0
+    planning = True
+
+    while planning:
+        # get_valid_path lists the path from the target back to the robber's first move.
+        route = robber_player.get_valid_path(location_graph)[::-1]
+        path_length += len(route)
+        planning = False
+        reason = game_results.CORNERED
+
+        for item in route:
+            robber_player.update_location(location_graph.vertices[item])
+            robber_player.add_move_count()  # add 1 move to the move_count
+            moves += 1
+
+            # Make moves for cop
+            if trace:
+                robber_path.append(item)
+                cop_path.append(cop_player.curr_location.item)
+            cop_player.make_move(location_graph, robber_player.get_target_location()[0])
+
+            target, point_type = robber_player.get_target_location()
+            reached_target = target == robber_player.get_curr_location()
+
+            if reached_target and point_type == 'end':
+                winner = 1
+                reason = game_results.ESCAPED
+                break
+
+            if robber_player.get_curr_location() == cop_player.curr_location:
+                reason = game_results.CAPTURED
+                break
+
+            if robber_player.get_move_count() >= robber_player.get_move_limit():
+                reason = game_results.OUT_OF_MOVES
+                break
+
+            if reached_target:
                 new_target = part2.choose_target_location(robber_player.get_curr_location(),
                                                           {robber_player.get_curr_location()},
-                                                          location_graph, 'end')
-
-                robber_player.update_target_location(new_target)
-
-                # Recurse
-                run_game(robber_player, cop_player, location_graph)
-
-        if robber_player.get_curr_location() == cop_player.curr_location:
-            print('The Cop Wins!')
-            print([0, cop_path, robber_path])
-            return [0, cop_path, robber_path]
-
-        if robber_player.get_move_count() == robber_player.get_move_limit():
-            print('The Cop Wins!')
-            print([0, cop_path, robber_path])
-            return [0, cop_path, robber_path]
+                                                          location_graph, 'end', rng)
+                if new_target is not None:
+                    robber_player.update_target_location(new_target)
+                    planning = True
+                break
 
-    # if we get to the end and no one wins
-    # print('The Cop Wins!')
-    # print([0, cop_path, robber_path])
-    print('oops you have reached the end of the for loop')
-    return [0, cop_path, robber_path]
+    return game_results.GameResult(winner, reason, moves, path_length), robber_path, cop_path
 
 
 if __name__ == '__main__':
@@ -201,6 +396,7 @@ if __name__ == '__main__':
         'max-line-length': 100,
         'max-nested-blocks': 4,
         'disable': ['E1136', 'W0212', 'R1710'],
-        'allowed-io': ['run_game', 'load_location_graph'],
-        'extra-imports': ['random', 'csv', 'graph_vertex', 'part2']
+        'allowed-io': ['run_game', '_read_locations'],
+        'extra-imports': ['random', 'csv', 'os', 'pickle', 'graph_vertex', 'part2',
+                           'graph_generators', 'game_results']
     })
@@ -4,9 +4,10 @@ Part 2: Implementing the move algorithm, implementing the player classes
 from __future__ import annotations
 
 import random
-from typing import Union
+from typing import Optional, Union
 
 import graph_vertex
+import path_planner
 
 
 ################################################################################
@@ -58,6 +59,8 @@ class RobberPlayer(Player):
     move_limit: int
     move_count: int
     target_location: tuple[graph_vertex.Vertex, str]
+    # Plans paths that pass through the fewest unsafe locations, then the fewest locations.
+    planner = path_planner.PathPlanner('safest')
 
     def __init__(self, curr_location: graph_vertex.Vertex,
                  target_location: tuple[graph_vertex.Vertex, str], move_limit: int = 20,
@@ -106,6 +109,9 @@ class RobberPlayer(Player):
         starting vertex is connected to self.target_location,
         starting vertex.score <= 5
 
+        The path starts at the target and ends at the starting vertex. Return an empty list if
+        no neighbour of self.curr_location is a valid starting vertex.
+
         >>> location_graph = graph_vertex.Graph()
         >>> location_graph.add_vertex(item = 'hi', kind='s', score=5 )
         >>> location_graph.add_vertex(item='hello', kind = 'h', score =7)
@@ -123,18 +129,7 @@ class RobberPlayer(Player):
         ['bye', 'hey']
         """
 
-        valid_path_so_far = []
-
-        vertices = self.curr_location.neighbours
-
-        for vertex in vertices:
-            if vertex.check_connected(self.target_location[0].item, set())\
-                    and vertex.score <= 5:
-                path = location_graph.get_path(self.target_location[0].item, vertex.item)
-
-                valid_path_so_far.append((count_vertices_greater_five(location_graph, path), path))
-
-        return min(valid_path_so_far)[1]
+        return self.planner.plan(location_graph, self.curr_location, self.target_location[0])
 
 
 class RiskyRobberPlayer(Player):
@@ -144,6 +139,8 @@ class RiskyRobberPlayer(Player):
     move_limit: int
     move_count: int
     target_location: tuple[graph_vertex.Vertex, str]
+    # Plans paths that pass through the fewest locations.
+    planner = path_planner.PathPlanner('shortest')
 
     def __init__(self, curr_location: graph_vertex.Vertex,
                  target_location: tuple[graph_vertex.Vertex, str], move_count: int = 0,
@@ -170,7 +167,7 @@ class RiskyRobberPlayer(Player):
 
     def update_target_location(self, target_location: tuple[graph_vertex.Vertex, str]) -> None:
         """Update the target_location attribute"""
-        raise NotImplementedError
+        self.target_location = target_location
 
     def get_move_limit(self) -> int:
         """return the move_limit attribute"""
@@ -192,6 +189,9 @@ class RiskyRobberPlayer(Player):
         starting vertex is connected to self.target_location,
         starting vertex.score =< 5
 
+        The path starts at the target and ends at the starting vertex. Return an empty list if
+        no neighbour of self.curr_location is a valid starting vertex.
+
         >>> location_graph = graph_vertex.Graph()
         >>> location_graph.add_vertex(item = 'hi', kind='s', score=5 )
         >>> location_graph.add_vertex(item='hello', kind = 'h', score =7)
@@ -208,17 +208,7 @@ class RiskyRobberPlayer(Player):
         >>> robber_player.get_valid_path(location_graph)
         ['bye']
         """
-        valid_path_so_far = []
-
-        vertices = self.curr_location.neighbours
-
-        for vertex in vertices:
-            if (vertex.score <= 5) and \
-                    (vertex.check_connected(self.target_location[0].item, set())):
-                path = location_graph.get_path(self.target_location[0].item, vertex.item)
-                valid_path_so_far.append((len(path), path))
-
-        return min(valid_path_so_far)[1]
+        return self.planner.plan(location_graph, self.curr_location, self.target_location[0])
 
 
 class CopPlayer:
@@ -239,18 +229,23 @@ class CopPlayer:
         """Make a move based on the move_count, if move_count is divisalbe by 3, then we can
         make a move to a location with a score of less than 5, other wise it has to be >= 5."""
 
+        # The connectivity checks are made on the vertices' integer ids, which the graph
+        # looks up directly, rather than on their items.
+        target = target_location.index
         if self.move_count % 3 == 0:
             vertices = self.curr_location.neighbours
             for vertex in vertices:
                 if (vertex.score < 5) and \
-                        (vertex.check_connected(target_location.item, {self.curr_location})):
+                        location_graph.connected_avoiding_ids(vertex.index, target,
+                                                              self.curr_location.index):
                     self.curr_location = vertex
                     self.move_count += 1
         else:
             vertices = self.curr_location.neighbours
             for vertex in vertices:
                 if (vertex.score >= 5) and \
-                        (vertex.check_connected(target_location.item, {self.curr_location})):
+                        location_graph.connected_avoiding_ids(vertex.index, target,
+                                                              self.curr_location.index):
                     self.curr_location = vertex
                     self.move_count += 1
 
@@ -269,22 +264,24 @@ def count_vertices_greater_five(location_graph: graph_vertex.Graph, path: list)
 
 def choose_target_location(curr_location: graph_vertex.Vertex, visited: set[graph_vertex.Vertex],
                            location_graph: graph_vertex.Graph,
-                           point_type: str) -> Union[None, tuple[graph_vertex.Vertex, str]]:
+                           point_type: str, rng: Optional[random.Random] = None) \
+        -> Union[None, tuple[graph_vertex.Vertex, str]]:
     """choose a node in the location_graph to be the target_location
 
+    The choice is made with rng, or with the global random module if rng is None.
+
     Preconditions:
         - point_type in {'mid', 'end'}
     """
-    items = list(location_graph.get_all_vertices(''))
-
-    for _ in range(1, len(items)):
-        item = random.choice(items)
-        target = location_graph.vertices[item]
-        if target not in curr_location.neighbours \
-                and target not in visited:
-            return (target, point_type)
-
-    return None
+    # The target is drawn from the list of vertices the graph keeps in the order they were added
+    # (rather than from a set of strings, whose order changes between processes) so that a
+    # seeded rng always picks the same target. As many draws are allowed as there are vertices,
+    # less one.
+    target = location_graph.sample(curr_location.neighbours | visited, rng=rng,
+                                   attempts=len(location_graph.vertices) - 1)
+    if target is None:
+        return None
+    return (target, point_type)
 
 
 if __name__ == '__main__':
@@ -300,5 +297,5 @@ if __name__ == '__main__':
         'max-nested-blocks': 4,
         'disable': ['E1136', 'W0212'],
         'allowed-io': ['run_game', 'load_location_graph'],
-        'extra-imports': ['random', 'graph_vertex']
+        'extra-imports': ['random', 'graph_vertex', 'path_planner']
     })
@@ -1,18 +1,86 @@
 """
 Part 3: Visualising the traversal of the cop and the robber for each game.
+
+The positions of the locations are computed once per graph and layout, and kept both in memory
+and on disk (in LAYOUT_DIR, next to the data file the graph was loaded from, as part1 keeps
+its snapshots), so drawing another game on the same graph starts straight away.
+The whole graph is drawn as two bulk artists (one collection of edge segments and one scatter
+of vertices) which are rasterised, instead of one artist per vertex and edge, so even graphs of
+many thousands of locations draw quickly.
+
+draw_paths draws one game. draw_games draws the paths of many games over the same graph in one
+figure, and render_games saves an image of each game, all drawn over a single rasterised image
+of the graph.
 """
 from __future__ import annotations
-import networkx as nx
-import matplotlib.pyplot as plt
+import hashlib
+import os
+from typing import Any, Optional
+
 import graph_vertex
-import part1
+
+# The directory, next to each data file, that holds the cached layouts of the graphs loaded
+# from its data files.
+LAYOUT_DIR = '__layoutcache__'
+
+# The layouts layout_positions can compute.
+LAYOUTS = {'random', 'spring'}
+
+# Maps the key of a graph and layout (see _layout_key) to its positions.
+_layouts = {}
+
+
+def layout_positions(loaded_graph: graph_vertex.Graph, layout: str = 'random',
+                     data: Optional[str] = None) -> Any:
+    """Return a NumPy array of shape (V, 2) whose row i is the position of the vertex with
+    index i (its position in loaded_graph.vertices) under the given layout.
+
+    'random' places the vertices uniformly at random (with a fixed seed, as nx.random_layout
+    did), and 'spring' uses networkx's force-directed spring layout, which needs SciPy for
+    graphs of 500 or more locations. The positions are cached in memory under a hash of the
+    graph, so they are only computed once, and if data (the file loaded_graph was loaded from)
+    is given, also in LAYOUT_DIR next to data.
+
+    Preconditions:
+        - layout in LAYOUTS
+    """
+    import numpy as np
+
+    key = _layout_key(loaded_graph, layout)
+    if key in _layouts:
+        return _layouts[key]
+
+    if data is None:
+        _layouts[key] = _compute_layout(loaded_graph, layout)
+        return _layouts[key]
+
+    directory = os.path.join(os.path.dirname(os.path.abspath(data)), LAYOUT_DIR)
+    path = os.path.join(directory, key + '.npy')
+    try:
+        positions = np.load(path)
+    except (OSError, ValueError):
+        positions = _compute_layout(loaded_graph, layout)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Write to a temporary file and rename it, as part1 does for its snapshots.
+            temporary = f'{path}.{os.getpid()}.tmp.npy'
+            np.save(temporary, positions)
+            os.replace(temporary, path)
+        except OSError:
+            pass  # the cache is only an optimisation
+
+    _layouts[key] = positions
+    return positions
 
 
 def draw_paths(loaded_graph: graph_vertex.Graph, game: list,
-               show_edges: bool = False, show_path_edges: bool = False) -> None:
+               show_edges: bool = False, show_path_edges: bool = False,
+               layout: str = 'random', output: Optional[str] = None,
+               data: Optional[str] = None) -> None:
     """
     This function is the main function for visualising the path of the cop and the robber. The
-    output is an interactive plotly screen with a zooming-in-and-out feature.
+    output is an interactive matplotlib window with a zooming-in-and-out feature, or, if output
+    is given, an image saved to that file.
 
     As there a lot of nodes in our graph, we have given users an option to decided whether they want
     to display the name of each location, the name of only the paths of the cop and the robber, or
@@ -21,42 +89,184 @@ def draw_paths(loaded_graph: graph_vertex.Graph, game: list,
     By default, the visualisation will not show the names of any nodes. If the user wants, they can
     specify their call as show_edges=True and/or show_path_edges=True, as per the three options
     described above.
+
+    game is either the list returned by part1.run_game or a traced game_results.GameResult.
+    data is the file loaded_graph was loaded from, if its layout should be cached on disk (see
+    layout_positions).
     """
-    # networkx requires a graph that made using the module.
-    nx_graph = nx.Graph()  # initialing a Graph as a networkx Graph
-    for v in loaded_graph.get_all_vertices():
-        nx_graph.add_node(v)  # here we are manually adding each node of graph_vertex.Graph
-        # to a networkx graph
-    for e in loaded_graph.edges_list():  # edges_list() is defined in graph_vertex, check its
-        # docstring for more information on how it works
-        nx_graph.add_edge(e[0], e[1])  # this is to add each edge of the graph_vertex.Graph
-        # to the networkx graph
-
-    pos = nx.random_layout(nx_graph, seed=111)
-    nx.draw(nx_graph, pos, node_color='black', node_size=0.5)
-    path_robber = game[2]
-    path_cop = game[1]
-    # for i in range(len(game)):
-    #     path_robber.append(game[2])
-    #     path_cop.append(game[])
-    path_edges1 = zip(path_robber, path_robber[1:])
-    path_edges1 = set(path_edges1)
-    path_edges2 = zip(path_cop, path_cop[1:])
-    path_edges2 = set(path_edges2)
-    nx.draw_networkx_nodes(nx_graph, pos, node_color='black', node_size=35)
-    nx.draw_networkx_edges(nx_graph, pos, edgelist=path_edges1, edge_color='red', width=9)
-    nx.draw_networkx_edges(nx_graph, pos, edgelist=path_edges2, edge_color='yellow', width=3)
+    positions = layout_positions(loaded_graph, layout, data)
+    figure, axes = _new_figure(output)
+    _draw_graph(axes, loaded_graph, positions)
 
+    robber_ids, cop_ids = _path_ids(loaded_graph, game)
+    axes.plot(positions[robber_ids, 0], positions[robber_ids, 1], color='red', linewidth=9)
+    axes.plot(positions[cop_ids, 0], positions[cop_ids, 1], color='yellow', linewidth=3)
+
+    items = list(loaded_graph.vertices)
     if show_edges is True:
-        nx.draw_networkx_labels(nx_graph, pos, font_size=9, font_color='grey')
+        labelled = range(len(items))
+        font = {'fontsize': 9, 'color': 'grey'}
+    elif show_path_edges is True:
+        labelled = sorted(set(robber_ids) | set(cop_ids))
+        font = {'fontsize': 14, 'color': '#1059cc', 'fontweight': 'heavy'}
+    else:
+        labelled = []
+        font = {}
+    for i in labelled:
+        axes.text(positions[i, 0], positions[i, 1], items[i], ha='center', va='center', **font)
+
+    _finish(figure, axes, output)
+
+
+def draw_games(loaded_graph: graph_vertex.Graph, games: list, layout: str = 'random',
+               output: Optional[str] = None, data: Optional[str] = None) -> None:
+    """Draw the paths of all the given games (see draw_paths) over one drawing of loaded_graph,
+    with the paths drawn faintly so that the routes many games share stand out.
+    """
+    import numpy as np
+    from matplotlib.collections import LineCollection
+
+    positions = layout_positions(loaded_graph, layout, data)
+    figure, axes = _new_figure(output)
+    _draw_graph(axes, loaded_graph, positions)
+
+    robber_paths, cop_paths = [], []
+    for game in games:
+        robber_ids, cop_ids = _path_ids(loaded_graph, game)
+        robber_paths.append(positions[robber_ids])
+        cop_paths.append(positions[cop_ids])
+    alpha = float(np.clip(5 / max(len(games), 1), 0.02, 1.0))
+    axes.add_collection(LineCollection(robber_paths, colors='red', linewidths=3, alpha=alpha))
+    axes.add_collection(LineCollection(cop_paths, colors='gold', linewidths=1.5, alpha=alpha))
+
+    _finish(figure, axes, output)
+
+
+def render_games(loaded_graph: graph_vertex.Graph, games: list, directory: str,
+                 layout: str = 'random', dpi: int = 100,
+                 data: Optional[str] = None) -> list[str]:
+    """Save an image of each of the given games (see draw_paths) in directory and return the
+    paths of the images.
+
+    The graph is rasterised once, and each image draws only its game's paths over that shared
+    image, so the cost of each image does not depend on the size of the graph.
+    """
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    positions = layout_positions(loaded_graph, layout, data)
+    base = Figure(figsize=(8, 8), dpi=dpi)
+    canvas = FigureCanvasAgg(base)
+    axes = base.add_axes((0, 0, 1, 1))
+    _draw_graph(axes, loaded_graph, positions)
+    axes.set_axis_off()
+    canvas.draw()
+    image = np.asarray(canvas.buffer_rgba())
+    extent = (*axes.get_xlim(), *axes.get_ylim())
+
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for number, game in enumerate(games):
+        figure = Figure(figsize=(8, 8), dpi=dpi)
+        FigureCanvasAgg(figure)
+        game_axes = figure.add_axes((0, 0, 1, 1))
+        game_axes.imshow(image, extent=extent, aspect='auto')
+        robber_ids, cop_ids = _path_ids(loaded_graph, game)
+        game_axes.plot(positions[robber_ids, 0], positions[robber_ids, 1], color='red',
+                       linewidth=4)
+        game_axes.plot(positions[cop_ids, 0], positions[cop_ids, 1], color='gold', linewidth=2)
+        game_axes.set_xlim(extent[0], extent[1])
+        game_axes.set_ylim(extent[2], extent[3])
+        game_axes.set_axis_off()
+        path = os.path.join(directory, f'game_{number}.png')
+        figure.savefig(path)
+        written.append(path)
+    return written
+
+
+def _layout_key(loaded_graph: graph_vertex.Graph, layout: str) -> str:
+    """Return a hash of the given layout and of the parts of loaded_graph it depends on: its
+    items, and for the 'spring' layout its edges.
+    """
+    digest = hashlib.sha1(layout.encode())
+    for item in loaded_graph.vertices:
+        digest.update(str(item).encode() + b'\0')
+    if layout == 'spring':
+        digest.update(loaded_graph.edge_arrays()[1].tobytes())
+    return digest.hexdigest()
+
+
+def _compute_layout(loaded_graph: graph_vertex.Graph, layout: str) -> Any:
+    """Return the positions of the vertices of loaded_graph under layout, as described in
+    layout_positions.
+    """
+    import numpy as np
+
+    n = len(loaded_graph.vertices)
+    if layout == 'random':
+        return np.random.RandomState(111).rand(n, 2)
+
+    import networkx as nx
+
+    nx_graph = nx.Graph()
+    nx_graph.add_nodes_from(range(n))
+    nx_graph.add_edges_from(loaded_graph.edge_arrays()[1].tolist())
+    try:
+        positions = nx.spring_layout(nx_graph, seed=111)
+    except ImportError as error:
+        # networkx only needs SciPy for the spring layout of graphs of 500 or more nodes.
+        raise ImportError(f"the 'spring' layout of a graph of {n} locations needs SciPy "
+                          f"(pip install scipy), or use the 'random' layout") from error
+    return np.array([positions[i] for i in range(n)])
+
+
+def _path_ids(loaded_graph: graph_vertex.Graph, game: Any) -> tuple[list[int], list[int]]:
+    """Return the vertex indices of the robber's path and the cop's path in game, which is
+    either the list returned by part1.run_game or a traced game_results.GameResult.
+    """
+    if isinstance(game, list):
+        vertices = loaded_graph.vertices
+        return [vertices[item].index for item in game[2]], \
+            [vertices[item].index for item in game[1]]
+    return game.robber_path or [], game.cop_path or []
+
+
+def _new_figure(output: Optional[str]) -> tuple[Any, Any]:
+    """Return a new figure and its axes. The figure is made with pyplot (and so opens a
+    window) only if it is going to be shown, rather than saved to output.
+    """
+    if output is None:
+        import matplotlib.pyplot as plt
+        return plt.subplots(figsize=(10, 10))
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(10, 10))
+    FigureCanvasAgg(figure)
+    return figure, figure.add_subplot()
+
+
+def _draw_graph(axes: Any, loaded_graph: graph_vertex.Graph, positions: Any) -> None:
+    """Draw every edge and vertex of loaded_graph on axes, as two rasterised bulk artists."""
+    from matplotlib.collections import LineCollection
+
+    edges = loaded_graph.edge_arrays()[1]
+    axes.add_collection(LineCollection(positions[edges], colors='black', linewidths=0.3,
+                                       rasterized=True))
+    axes.scatter(positions[:, 0], positions[:, 1], s=4, c='black', rasterized=True)
 
-    elif show_path_edges is True and show_edges is False:
-        edges = dict(path_edges1.union(path_edges2))
-        nx.draw_networkx_labels(nx_graph, pos, labels=edges, font_size=14, font_color='#1059cc',
-                                font_weight='heavy')
 
-    plt.axis('equal')
-    plt.show()
+def _finish(figure: Any, axes: Any, output: Optional[str]) -> None:
+    """Show the figure, or save it to output if output is given."""
+    axes.axis('equal')
+    axes.autoscale_view()
+    if output is None:
+        import matplotlib.pyplot as plt
+        plt.show()
+    else:
+        figure.savefig(output)
 
 
 if __name__ == '__main__':
@@ -71,7 +281,9 @@ if __name__ == '__main__':
         'max-line-length': 100,
         'max-nested-blocks': 4,
         'disable': ['E1136'],
-        'extra-imports': ['random', 'graph_vertex', 'part1', 'networkx', 'matplotlib.pyplot']
+        'extra-imports': ['hashlib', 'os', 'graph_vertex', 'networkx', 'numpy',
+                          'matplotlib.pyplot', 'matplotlib.collections',
+                          'matplotlib.figure', 'matplotlib.backends.backend_agg']
     })
 
     # Sample call
@@ -0,0 +1,100 @@
+"""
+A bounded cache of planned paths, shared by graph_vertex.Graph and csr_graph.CSRGraph.
+
+Both robber classes keep planning paths between the same pairs of locations, and every game
+played on the same graph asks the same questions again. Each graph therefore owns a PathCache
+that remembers the most recently used results, keyed by (source, target, cost model), and that
+the graph clears whenever an edge is added, so a cached path is never out of date.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable
+
+# The default number of results a graph's path cache holds.
+DEFAULT_SIZE = 4096
+
+
+class PathCache:
+    """A least-recently-used cache of path results, with hit, miss and eviction counters.
+
+    Instance Attributes:
+        - maxsize: the most results the cache holds before evicting the least recently used
+        - hits: the number of lookups answered from the cache
+        - misses: the number of lookups that had to compute their result
+        - evictions: the number of results evicted to make room for new ones
+
+    >>> cache = PathCache(maxsize=2)
+    >>> cache.get(('a', 'b', 'shortest'), lambda: ('a', 'b'))
+    ('a', 'b')
+    >>> cache.get(('a', 'b', 'shortest'), lambda: ('a', 'c', 'b'))
+    ('a', 'b')
+    >>> cache.get(('a', 'c', 'shortest'), lambda: ('a', 'c'))
+    ('a', 'c')
+    >>> cache.get(('b', 'c', 'shortest'), lambda: ('b', 'c'))
+    ('b', 'c')
+    >>> cache.stats()
+    {'hits': 1, 'misses': 3, 'evictions': 1, 'size': 2}
+    """
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    _results: OrderedDict
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE) -> None:
+        """Initialize an empty cache that holds at most maxsize results.
+
+        Preconditions:
+            - maxsize >= 0
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+
+    def get(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        """Return the result cached under key, or compute, cache and return it if there is none.
+
+        The cached result is shared by every later lookup, so it should not be mutable.
+        """
+        results = self._results
+        if key in results:
+            self.hits += 1
+            results.move_to_end(key)
+            return results[key]
+
+        self.misses += 1
+        result = compute()
+        if self.maxsize > 0:
+            results[key] = result
+            if len(results) > self.maxsize:
+                results.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self) -> None:
+        """Forget every cached result. This is called whenever the graph changes."""
+        if self._results:
+            self._results.clear()
+
+    def stats(self) -> dict:
+        """Return the counters of this cache and the number of results it holds."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._results)}
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['collections']
+    })
@@ -0,0 +1,167 @@
+"""
+Path planning for the robber players.
+
+A robber's first move must be to a neighbour with a score of at most 5 that is connected to its
+target, and it then takes the best path from that neighbour to the target. Instead of searching
+from each eligible neighbour separately, PathPlanner runs one Dijkstra search outwards from the
+target, which finds the best path from every vertex to the target at once, and stops as soon as
+all the eligible neighbours have been reached.
+
+The cost of a path is given by a cost model:
+    - 'safest': the number of locations on the path with a score above 5, and then the number
+      of locations on the path (the cost used by RobberPlayer)
+    - 'shortest': the number of locations on the path (the cost used by RiskyRobberPlayer)
+
+Plans are kept in the path cache of the graph, under the cost model 'robber safest' or
+'robber shortest', so every player and every game on the same graph shares them.
+"""
+from __future__ import annotations
+import heapq
+from typing import Any
+
+import graph_vertex
+
+# The cost models a PathPlanner can use.
+COST_MODELS = {'safest', 'shortest'}
+
+# Locations with a score above this are unsafe for the robber, and its first move must be to a
+# location with a score of at most this.
+SAFE_SCORE = 5
+
+
+class PathPlanner:
+    """Plans a robber's path to its target under a cost model.
+
+    Instance Attributes:
+        - cost_model: the cost model paths are compared with
+
+    Representation Invariants:
+        - self.cost_model in COST_MODELS
+
+    >>> g = graph_vertex.Graph()
+    >>> g.add_vertex('hi', 's', 5)
+    >>> g.add_vertex('hello', 'h', 7)
+    >>> g.add_vertex('bye', 'p', 3)
+    >>> g.add_vertex('hey', 'g', 4)
+    >>> g.add_vertex('lol', 'g', 4)
+    >>> g.add_vertex('yo', 'g', 4)
+    >>> for edge in [('hi', 'lol'), ('lol', 'yo'), ('yo', 'bye'), ('hi', 'hey'), ('hey', 'hello'),
+    ...              ('hello', 'bye')]:
+    ...     g.add_edge(*edge)
+    >>> PathPlanner('shortest').plan(g, g.vertices['hi'], g.vertices['bye'])
+    ['bye', 'hello', 'hey']
+    >>> PathPlanner('safest').plan(g, g.vertices['hi'], g.vertices['bye'])
+    ['bye', 'yo', 'lol']
+    >>> PathPlanner('safest').plan(g, g.vertices['hi'], g.vertices['bye'])
+    ['bye', 'yo', 'lol']
+    >>> g.path_cache.stats()
+    {'hits': 1, 'misses': 2, 'evictions': 0, 'size': 2}
+    """
+    cost_model: str
+
+    def __init__(self, cost_model: str) -> None:
+        """Initialize a planner that compares paths with the given cost model.
+
+        Preconditions:
+            - cost_model in COST_MODELS
+        """
+        self.cost_model = cost_model
+
+    def plan(self, location_graph: graph_vertex.Graph, curr_location: Any,
+             target: Any) -> list:
+        """Return the items on the best path to target that starts with a valid first move from
+        curr_location, listed from target back to that first move, as
+        part2.RobberPlayer.get_valid_path does.
+
+        A valid first move is to a neighbour of curr_location with a score of at most
+        SAFE_SCORE that is connected to target. Between the best paths from different first
+        moves that have the same cost, the one whose list of items comes first is returned.
+        Between paths of the same cost from the same first move, the one returned is the one
+        the search reaches first, which depends only on the order the graph was built in (see
+        graph_vertex.Vertex.__hash__), not on the items. Return an empty list if there is no
+        valid first move.
+        """
+        key = (curr_location.item, target.item, 'robber ' + self.cost_model)
+        return list(location_graph.path_cache.get(
+            key, lambda: self._best_path(location_graph, curr_location, target)))
+
+    def _best_path(self, location_graph: graph_vertex.Graph, curr_location: Any,
+                   target: Any) -> tuple:
+        """Return the path plan returns as a tuple, without looking in the path cache."""
+        goals = {vertex: None for vertex in curr_location.neighbours
+                 if vertex.score <= SAFE_SCORE}
+        costs, parents = self.search(location_graph, target, goals)
+
+        valid_path_so_far = []
+        for vertex in goals:
+            if vertex in costs:
+                path = []
+                v = vertex
+                while v is not None:
+                    path.append(v.item)
+                    v = parents[v]
+                path.reverse()
+                valid_path_so_far.append((costs[vertex], path))
+
+        if valid_path_so_far == []:
+            return ()
+        return tuple(min(valid_path_so_far)[1])
+
+    def search(self, location_graph: graph_vertex.Graph, target: Any,
+               goals: dict) -> tuple[dict, dict]:
+        """Run a Dijkstra search outwards from target and return (costs, parents).
+
+        costs maps every vertex the search settled to the cost of its best path to target, and
+        parents maps it to the next vertex on that path (None for target itself). The search
+        stops once every vertex in goals has been settled.
+        """
+        # A path costs 1 for each location and unsafe_weight more for each unsafe location.
+        # Under the 'safest' model unsafe_weight is larger than any path length, so the number
+        # of unsafe locations is compared first.
+        unsafe_weight = len(location_graph.vertices) + 1 if self.cost_model == 'safest' else 0
+        heavy = unsafe_weight + 1
+
+        costs = {}
+        parents = {target: None}
+        start = heavy if target.score > SAFE_SCORE else 1
+        tentative = {target: start}
+        heap = [(start, 0, target)]
+        pushes = 1
+        remaining = len(goals)
+
+        while heap and remaining > 0:
+            cost, _, u = heapq.heappop(heap)
+            if u in costs:
+                continue
+            costs[u] = cost
+            if u in goals:
+                remaining -= 1
+
+            for w in u.neighbours:
+                if w in costs:
+                    continue
+                new_cost = cost + heavy if w.score > SAFE_SCORE else cost + 1
+                if new_cost < tentative.get(w, new_cost + 1):
+                    tentative[w] = new_cost
+                    parents[w] = u
+                    # The push count breaks ties, so vertices themselves are never compared.
+                    heapq.heappush(heap, (new_cost, pushes, w))
+                    pushes += 1
+
+        return costs, parents
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['heapq', 'graph_vertex']
+    })
@@ -0,0 +1,441 @@
+"""
+A long-lived service that plays games on request, for tools that would otherwise start a new
+Python process (and parse the data set again) for every game.
+
+The service reads requests from TCP or Unix socket connections, one JSON object per line, and
+answers each with one JSON line holding the result of its game (see game_results.GameResult).
+A request names the robber class, the data set, the master seed and the game number, which
+pick the game's random number generator as part4.game_rng does, so a game played here goes
+the same way as the same game of part4.count_robber_wins:
+
+    {"id": 1, "robber": "RiskyRobberPlayer", "data": "data/large_location_data.csv",
+     "seed": 111, "game": 0, "trace": false}
+
+The response is {"id": 1, "seed": 111, "result": {...}}, or {"id": 1, "error": "..."} if the
+request is not valid. A request can only name a data set in the service's data directory or
+one of the data sets it preloads, since loading a data set also reads the cached parse next to
+it (see part1.load_location_table). The seed is chosen at random if it is not given, and the
+response reports it so the game can be played again. {"op": "stats"} asks for the counters of
+the service instead.
+
+Requests go into a bounded queue, and a pool of worker processes plays them in batches. The
+workers keep the parsed data sets in memory between batches (see part1.load_location_table).
+At most two batches per worker are in flight at a time. Whenever there is room for another, a
+dispatcher takes the requests waiting in the queue off it as one batch of up to batch_size
+(waiting at most batch_wait seconds for a batch to fill), so an idle service hands on each
+request as soon as it arrives and a busy one plays them in large batches. When the workers
+fall behind, the queue fills up, and a connection whose request does not fit in the queue is
+not read from again until there is room: the backpressure reaches the client through its
+socket. For example
+
+    python service.py --port 8765 --workers 4 --preload data/large_location_data.csv
+
+or, for a Unix socket, python service.py --unix /tmp/cops-and-robbers.sock.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Optional
+
+import part1
+import part4
+
+# The robber classes a request can name.
+ROBBERS = {'RobberPlayer', 'RiskyRobberPlayer'}
+
+# The default most requests in one batch.
+BATCH_SIZE = 64
+
+# The default longest time (seconds) the dispatcher waits for a batch to fill. Batches fill on
+# their own while the workers are busy (see GameService._dispatch), so by default it does not
+# wait.
+BATCH_WAIT = 0.0
+
+# The default most requests waiting in the queue.
+QUEUE_SIZE = 4096
+
+# The default directory holding the data sets requests can name.
+DATA_DIR = 'data'
+
+# The most bytes in one request line.
+LINE_LIMIT = 1 << 16
+
+
+class GameService:
+    """A queue of game requests, played in batches by a pool of workers.
+
+    With workers == 0, the games are played in a single thread of this process instead, which
+    is slower but starts at once.
+
+    Instance Attributes:
+        - workers: the number of worker processes (0 for a thread of this process)
+        - batch_size: the most requests in one batch
+        - batch_wait: the longest time (seconds) the dispatcher waits for a batch to fill
+        - queue_size: the most requests waiting in the queue
+        - preload: the data sets each worker loads when it starts
+        - data_dir: the directory holding the data sets requests can name, besides preload
+
+    Representation Invariants:
+        - self.workers >= 0
+        - self.batch_size >= 1
+        - self.batch_wait >= 0
+        - self.queue_size >= 1
+
+    >>> async def play() -> dict:
+    ...     async with GameService(workers=0) as service:
+    ...         return await service.submit({'robber': 'RobberPlayer', 'seed': 7, 'game': 3,
+    ...                                      'data': 'data/small_location_data.csv'})
+    >>> response = asyncio.run(play())
+    >>> rng = part4.game_rng(7, 3)
+    >>> players = part1.initialize_robber_player('RobberPlayer', 'data/small_location_data.csv',
+    ...                                          rng=rng)
+    >>> response['result'] == part1.play_game(*players, rng, game=3).to_dict()
+    True
+    """
+    workers: int
+    batch_size: int
+    batch_wait: float
+    queue_size: int
+    preload: tuple[str, ...]
+    data_dir: str
+    _queue: Optional[asyncio.Queue]
+    _pool: Optional[Executor]
+    _slots: Optional[asyncio.Semaphore]
+    _dispatcher: Optional[asyncio.Task]
+    _batches: set[asyncio.Task]
+    _counters: dict[str, float]
+
+    def __init__(self, workers: int = 1, batch_size: int = BATCH_SIZE,
+                 batch_wait: float = BATCH_WAIT, queue_size: int = QUEUE_SIZE,
+                 preload: tuple[str, ...] = (), data_dir: str = DATA_DIR) -> None:
+        """Initialize a service with the given settings. The service takes no requests until
+        it is started.
+        """
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue_size = queue_size
+        self.preload = tuple(preload)
+        self.data_dir = data_dir
+        self._queue = None
+        self._pool = None
+        self._slots = None
+        self._dispatcher = None
+        self._batches = set()
+        self._counters = {'requests': 0, 'games': 0, 'errors': 0, 'batches': 0,
+                          'queue_seconds': 0.0, 'play_seconds': 0.0}
+
+    async def __aenter__(self) -> GameService:
+        """Start this service."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Close this service."""
+        await self.close()
+
+    async def start(self) -> None:
+        """Start the workers and the dispatcher."""
+        if self.workers == 0:
+            self._pool = ThreadPoolExecutor(max_workers=1, initializer=_load_data,
+                                            initargs=(self.preload,))
+        else:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_load_data,
+                                             initargs=(self.preload,))
+        self._queue = asyncio.Queue(self.queue_size)
+        self._slots = asyncio.Semaphore(2 * max(self.workers, 1))
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def close(self) -> None:
+        """Stop the dispatcher, wait for the batches in flight, and stop the workers. The
+        requests still in the queue fail with a RuntimeError.
+        """
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, *self._batches, return_exceptions=True)
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError('the service was closed'))
+        self._pool.shutdown()
+
+    async def submit(self, request: dict) -> dict:
+        """Play the game described by request and return the response to it."""
+        return await (await self.enqueue(request))
+
+    async def enqueue(self, request: dict) -> asyncio.Future:
+        """Put the game described by request in the queue, waiting until there is room for
+        it, and return a future of the response to it. The future is done at once if the
+        request is not valid.
+        """
+        self._counters['requests'] += 1
+        future = asyncio.get_running_loop().create_future()
+        try:
+            game = game_spec(request, self.data_dir, self.preload)
+        except ValueError as error:
+            self._counters['errors'] += 1
+            future.set_result({'id': request.get('id'), 'error': str(error)})
+            return future
+        await self._queue.put(((request.get('id'), game), future, time.perf_counter()))
+        return future
+
+    def stats(self) -> dict:
+        """Return the counters of this service: the number of requests, games played, errors
+        and batches, the number of requests waiting in the queue, and the mean time (in
+        milliseconds) a game spent in the queue and in a worker.
+        """
+        counters = self._counters
+        games = max(counters['games'], 1)
+        return {'requests': counters['requests'], 'games': counters['games'],
+                'errors': counters['errors'], 'batches': counters['batches'],
+                'queued': self._queue.qsize() if self._queue is not None else 0,
+                'mean_queue_ms': round(1000 * counters['queue_seconds'] / games, 4),
+                'mean_play_ms': round(1000 * counters['play_seconds'] / games, 4)}
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        """Answer the requests read from a connection until the client closes it. Responses
+        are written as their games finish, so they may come back in a different order than the
+        requests; the id of each request is copied into its response.
+        """
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    _write(writer, {'id': None, 'error': 'the request line is too long'})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError
+                except ValueError:
+                    _write(writer, {'id': None, 'error': 'the request is not a JSON object'})
+                    continue
+                if request.get('op') == 'stats':
+                    _write(writer, {'id': request.get('id'), 'stats': self.stats()})
+                    continue
+                # Waiting here for room in the queue stops this connection from being read.
+                future = await self.enqueue(request)
+                task = asyncio.create_task(_respond(future, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                await writer.drain()
+            await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def _dispatch(self) -> None:
+        """Take batches of requests off the queue and hand each one to the workers.
+
+        A batch is only taken once there is room for another batch in flight, so while the
+        workers are idle each request is handed on as soon as it arrives, and while they are
+        busy the requests gather in the queue and the next batch takes all of them (up to
+        batch_size).
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._play(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _play(self, batch: list[tuple[tuple, asyncio.Future, float]]) -> None:
+        """Play a batch of requests in the workers and set the futures of their responses."""
+        start = time.perf_counter()
+        counters = self._counters
+        counters['batches'] += 1
+        counters['queue_seconds'] += sum(start - queued for _, _, queued in batch)
+        try:
+            responses = await asyncio.get_running_loop().run_in_executor(
+                self._pool, play_batch, [spec for spec, _, _ in batch])
+        except Exception as error:
+            # The error is passed on to every request of the batch (and from there to its
+            # connection), rather than raised in this task, which nothing waits for.
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        finally:
+            self._slots.release()
+        counters['play_seconds'] += (time.perf_counter() - start) * len(batch)
+        for (_, future, _), response in zip(batch, responses):
+            counters['games'] += 1
+            counters['errors'] += 'error' in response
+            if not future.done():
+                future.set_result(response)
+
+
+def game_spec(request: dict, data_dir: str = DATA_DIR,
+              preload: tuple[str, ...] = ()) -> tuple[str, str, int, int, bool]:
+    """Return the (robber, data, seed, game, trace) of the game described by request, drawing
+    the seed at random if it is not given. Raise a ValueError saying what is wrong if the
+    request is not valid, including if its data set is neither in data_dir nor in preload.
+
+    >>> game_spec({'robber': 'RobberPlayer', 'data': 'data/small_location_data.csv',
+    ...            'seed': 7, 'game': 3})
+    ('RobberPlayer', 'data/small_location_data.csv', 7, 3, False)
+    >>> game_spec({'robber': 'Cop', 'data': 'data/small_location_data.csv'})
+    Traceback (most recent call last):
+    ValueError: robber must be one of RiskyRobberPlayer, RobberPlayer
+    >>> game_spec({'data': 'part1.py'})
+    Traceback (most recent call last):
+    ValueError: data must name a data set file in data, not 'part1.py'
+    """
+    robber = request.get('robber', 'RobberPlayer')
+    data = request.get('data', 'data/small_location_data.csv')
+    seed = request.get('seed')
+    if seed is None:
+        seed = random.getrandbits(64)
+    game = request.get('game', 0)
+    trace = request.get('trace', False)
+
+    if robber not in ROBBERS:
+        raise ValueError('robber must be one of ' + ', '.join(sorted(ROBBERS)))
+    if not isinstance(data, str) or not os.path.isfile(data) \
+            or not _allowed_data(data, data_dir, preload):
+        raise ValueError(f'data must name a data set file in {data_dir}, not {data!r}')
+    if not isinstance(seed, int) or isinstance(seed, bool):
+        raise ValueError('seed must be an integer')
+    if not isinstance(game, int) or isinstance(game, bool) or game < 0:
+        raise ValueError('game must be a non-negative integer')
+    if not isinstance(trace, bool):
+        raise ValueError('trace must be true or false')
+    return (robber, data, seed, game, trace)
+
+
+def play_batch(batch: list[tuple[Any, tuple[str, str, int, int, bool]]]) -> list[dict]:
+    """Play each (id, game_spec) in batch and return the responses, in the same order. This is
+    what the workers run. A game that fails is answered with an error, and does not stop the
+    rest of the batch.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+    ...     _ = file.write('Seton Falls Park')
+    >>> responses = play_batch([(1, ('RobberPlayer', file.name, 7, 0, False)),
+    ...                         (2, ('RobberPlayer', 'data/small_location_data.csv', 7, 0, False))])
+    >>> responses[0]['error'], responses[1]['result']['reason']
+    ("the game failed: IndexError('list index out of range')", 'escaped')
+    >>> os.remove(file.name)
+    """
+    responses = []
+    for request_id, (robber, data, seed, game, trace) in batch:
+        rng = part4.game_rng(seed, game)
+        try:
+            game_players = part1.initialize_robber_player(robber, data, rng=rng)
+            result = part1.play_game(game_players[0], game_players[1], game_players[2], rng,
+                                     trace=trace, game=game)
+        except Exception as error:
+            # A malformed data set can fail in many ways; only its own game fails with it.
+            responses.append({'id': request_id, 'error': f'the game failed: {error!r}'})
+        else:
+            responses.append({'id': request_id, 'seed': seed, 'result': result.to_dict()})
+    return responses
+
+
+def _allowed_data(data: str, data_dir: str, preload: tuple[str, ...]) -> bool:
+    """Return whether data is one of the data sets in preload or a file in data_dir, once
+    symbolic links and '..' are resolved.
+    """
+    path = os.path.realpath(data)
+    directory = os.path.realpath(data_dir)
+    return path in {os.path.realpath(data_file) for data_file in preload} \
+        or os.path.commonpath([path, directory]) == directory
+
+
+def _load_data(data_files: tuple[str, ...]) -> None:
+    """Parse each of data_files, so the first games played on them do not have to. This runs
+    once in each worker when it starts.
+    """
+    for data_file in data_files:
+        part1.load_location_table(data_file)
+
+
+async def _respond(future: asyncio.Future, writer: asyncio.StreamWriter) -> None:
+    """Write the response in future to writer once it is ready."""
+    try:
+        response = await future
+    except Exception as error:
+        response = {'id': None, 'error': f'the service failed: {error!r}'}
+    _write(writer, response)
+    await writer.drain()
+
+
+def _write(writer: asyncio.StreamWriter, response: dict) -> None:
+    """Write response to writer as one JSON line, unless the connection is closing."""
+    if not writer.is_closing():
+        writer.write(json.dumps(response).encode() + b'\n')
+
+
+async def serve(service: GameService, host: str = '127.0.0.1', port: int = 8765,
+                unix: Optional[str] = None) -> None:
+    """Start service and answer connections on the given Unix socket path (or on host and
+    port if unix is None) until cancelled.
+    """
+    async with service:
+        if unix is not None:
+            server = await asyncio.start_unix_server(service.handle_connection, unix,
+                                                     limit=LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(service.handle_connection, host, port,
+                                                limit=LINE_LIMIT)
+        address = unix if unix is not None else server.sockets[0].getsockname()[:2]
+        print(json.dumps({'listening': address, 'workers': service.workers}), flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run the service described by the command line arguments and return the exit status."""
+    parser = argparse.ArgumentParser(description='Play games on request.')
+    parser.add_argument('--host', default='127.0.0.1', help='the address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='the port to listen on')
+    parser.add_argument('--unix', help='listen on this Unix socket path instead of a port')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='the number of worker processes (0 to play in this process)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='the most requests in one batch')
+    parser.add_argument('--batch-wait', type=float, default=BATCH_WAIT * 1000,
+                        help='the longest time (milliseconds) to wait for a batch to fill')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help='the most requests waiting in the queue')
+    parser.add_argument('--preload', action='append', default=[],
+                        help='a data set for each worker to load when it starts')
+    parser.add_argument('--data-dir', default=DATA_DIR,
+                        help='the directory holding the data sets requests can name')
+    args = parser.parse_args(argv)
+
+    service = GameService(args.workers, args.batch_size, args.batch_wait / 1000,
+                          args.queue_size, tuple(args.preload), args.data_dir)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""
+A spatial index over the coordinates of the locations.
+
+The data set keeps the longitude and latitude of the locations its sources give a position for
+(see data_set_builder and part1.load_location_coordinates). project turns them into kilometres,
+and a GridIndex buckets the points into square cells: the points are sorted by cell, and an
+array of offsets gives the slice of the sorted points in each cell, as in the 'geometric' model
+of graph_generators. Building the index is a sort, so it takes O(n log n) time, and each query
+only looks at the cells near its point:
+    - GridIndex.radius_edges joins every two points closer than a radius
+    - GridIndex.knn_edges joins every point to its k nearest points
+    - GridIndex.nearest finds the points nearest to any position
+
+The k nearest points are searched for in a square of cells around each point, which doubles in
+width until the k-th nearest point found is closer than any point outside the square could be.
+The cells are all the same size, which suits points spread fairly evenly, as the locations of a
+city are. Where some areas are far denser than the average, the queries there gather more
+candidates and take longer.
+
+LocationIndex answers the questions the players ask about a location graph, such as where the
+nearest police station or the nearest safe location is.
+"""
+from __future__ import annotations
+import math
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+import path_planner
+
+# The mean radius of the Earth, in kilometres.
+EARTH_RADIUS_KM = 6371.0
+
+# The number of points a cell of a GridIndex holds on average, when no cell size is given.
+POINTS_PER_CELL = 2
+
+# The number of query points whose candidates are gathered at once, which bounds the memory
+# a query over every point of a large index uses.
+QUERY_CHUNK = 65536
+
+# The most candidate points gathered at once for a batch of queries, which bounds the memory
+# used where the points are much denser than average.
+CANDIDATE_LIMIT = 1 << 21
+
+
+def project(coordinates: Any) -> np.ndarray:
+    """Return the (longitude, latitude) pairs in coordinates as an array of (x, y) positions
+    in kilometres, on an equirectangular projection centred on their mean latitude. Over an
+    area the size of a city, distances between the positions are within a fraction of a
+    percent of the distances on the Earth.
+
+    >>> positions = project([(-74.0, 40.7), (-74.0, 40.8)])
+    >>> round(float(positions[1, 1] - positions[0, 1]), 2)
+    11.12
+    """
+    degrees = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if len(degrees) == 0:
+        return np.empty((0, 2))
+    radians = np.radians(degrees)
+    scale = math.cos(float(radians[:, 1].mean()))
+    return np.stack((radians[:, 0] * scale, radians[:, 1]), axis=1) * EARTH_RADIUS_KM
+
+
+class GridIndex:
+    """An index of points in the plane, bucketed into square cells.
+
+    Instance Attributes:
+        - points: an array of shape (n, 2) holding the indexed points
+        - cell_size: the width of each cell
+
+    Representation Invariants:
+        - self.cell_size > 0
+
+    >>> index = GridIndex(np.array([[0.0, 0.0], [1.0, 0.0], [3.0, 0.0], [0.0, 0.5]]))
+    >>> index.nearest((2.6, 0.1), count=2)
+    [2, 1]
+    >>> index.knn_edges(1).tolist()
+    [[0, 3], [1, 0], [2, 1], [3, 0]]
+    >>> index.radius_edges(1.2).tolist()
+    [[0, 1], [0, 3], [1, 3]]
+    """
+    points: np.ndarray
+    cell_size: float
+    _origin: np.ndarray
+    _shape: tuple[int, int]
+    _cells: np.ndarray
+    _order: np.ndarray
+    _starts: np.ndarray
+
+    def __init__(self, points: Any, cell_size: Optional[float] = None) -> None:
+        """Initialize an index of the given points, with cells of the given width. If
+        cell_size is None, the cells are sized to hold POINTS_PER_CELL points on average.
+        """
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        n = len(self.points)
+        low = self.points.min(axis=0) if n else np.zeros(2)
+        high = self.points.max(axis=0) if n else np.zeros(2)
+        extent = high - low
+
+        if cell_size is None:
+            area = float(np.prod(np.maximum(extent, extent.max() / max(n, 1))))
+            cell_size = math.sqrt(area * POINTS_PER_CELL / max(n, 1))
+        self.cell_size = cell_size if cell_size > 0 else 1.0
+        self._origin = low
+        self._shape = tuple(int(size) + 1 for size in extent // self.cell_size)
+
+        self._cells = self._cell_of(self.points)
+        cell_ids = self._cells[:, 0] * self._shape[1] + self._cells[:, 1]
+        self._order = np.argsort(cell_ids, kind='stable')
+        self._starts = np.searchsorted(cell_ids[self._order],
+                                       np.arange(self._shape[0] * self._shape[1] + 1))
+
+    def __len__(self) -> int:
+        """Return the number of indexed points."""
+        return len(self.points)
+
+    def nearest(self, point: Any, count: int = 1) -> list[int]:
+        """Return the indices of the count indexed points nearest to point, nearest first
+        (fewer if there are fewer than count points).
+        """
+        query = np.asarray(point, dtype=np.float64).reshape(1, 2)
+        ids, _ = self._knn(query, count, np.array([-1]))
+        return [i for i in ids[0].tolist() if i >= 0]
+
+    def knn(self, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return the indices of the k points nearest to each point (not counting the point
+        itself) and their distances, as two arrays of shape (n, k) ordered nearest first. Rows
+        are padded with -1 and infinity when there are fewer than k other points.
+        """
+        ids, squared = self._knn(self.points, k, np.arange(len(self.points)))
+        return ids, np.sqrt(squared)
+
+    def knn_edges(self, k: int) -> np.ndarray:
+        """Return the edges joining each point to its k nearest points, as an integer array of
+        shape (E, 2). An edge appears twice, once in each direction, when each of its ends is
+        among the k nearest points of the other.
+        """
+        ids, _ = self._knn(self.points, k, np.arange(len(self.points)))
+        sources = np.repeat(np.arange(len(self.points)), ids.shape[1])
+        targets = ids.ravel()
+        found = targets >= 0
+        return np.stack((sources[found], targets[found]), axis=1)
+
+    def radius_edges(self, radius: float) -> np.ndarray:
+        """Return the edges (u, v), with u < v, joining every two points at most radius apart,
+        as an integer array of shape (E, 2) sorted by u and then v.
+        """
+        reach = max(1, math.ceil(radius / self.cell_size))
+        chunks = []
+        for queries in self._chunks(np.arange(len(self.points)), reach):
+            for begin, end, owners, candidates in self._candidates(self._cells[queries], reach):
+                sources = queries[begin:end][owners]
+                keep = candidates > sources
+                sources, candidates = sources[keep], candidates[keep]
+                close = ((self.points[sources] - self.points[candidates]) ** 2).sum(axis=1) \
+                    <= radius * radius
+                chunks.append(np.stack((sources[close], candidates[close]), axis=1))
+
+        if not chunks:
+            return np.empty((0, 2), dtype=np.int64)
+        edges = np.concatenate(chunks)
+        return edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+
+    def _cell_of(self, points: np.ndarray) -> np.ndarray:
+        """Return the (column, row) of the cell each of points falls in, clamped to the
+        grid.
+        """
+        cells = ((points - self._origin) // self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, np.array(self._shape) - 1)
+
+    @staticmethod
+    def _chunks(queries: np.ndarray, reach: int) -> Iterator[np.ndarray]:
+        """Yield consecutive slices of queries small enough that the cells within reach of
+        them number about QUERY_CHUNK * 9.
+        """
+        size = max(1, QUERY_CHUNK * 9 // (2 * reach + 1) ** 2)
+        for start in range(0, len(queries), size):
+            yield queries[start:start + size]
+
+    def _candidates(self, cells: np.ndarray,
+                    reach: int) -> Iterator[tuple[int, int, np.ndarray, np.ndarray]]:
+        """Yield the pairs (q, p) where indexed point p lies within reach cells (in each
+        direction) of cells[q], in batches (begin, end, owners, candidates) that hold the
+        pairs of cells[begin:end] as two arrays, with q - begin in owners and p in candidates.
+        A batch holds about CANDIDATE_LIMIT pairs at most, unless a single query has more.
+
+        Preconditions:
+            - len(cells) > 0
+        """
+        width, height = self._shape
+        steps = np.arange(-reach, reach + 1)
+        offsets = np.stack(np.meshgrid(steps, steps, indexing='ij'), axis=-1).reshape(-1, 2)
+        around = (cells[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+        inside = (around[:, 0] >= 0) & (around[:, 0] < width) \
+            & (around[:, 1] >= 0) & (around[:, 1] < height)
+        others = np.where(inside, around[:, 0] * height + around[:, 1], 0)
+        counts = np.where(inside, self._starts[others + 1] - self._starts[others], 0)
+        firsts = self._starts[others]
+
+        # Split the queries where the running total of their pairs passes each multiple of
+        # CANDIDATE_LIMIT.
+        totals = np.cumsum(counts.reshape(len(cells), len(offsets)).sum(axis=1))
+        splits = np.searchsorted(totals, np.arange(CANDIDATE_LIMIT, totals[-1], CANDIDATE_LIMIT))
+        bounds = np.unique(np.concatenate(([0], splits + 1, [len(cells)])).clip(0, len(cells)))
+        for begin, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            part = slice(begin * len(offsets), end * len(offsets))
+            part_counts = counts[part]
+            owners = np.repeat(np.arange(end - begin), part_counts.reshape(-1, len(offsets))
+                               .sum(axis=1))
+            first = np.repeat(firsts[part], part_counts)
+            positions = first + np.arange(len(owners)) \
+                - np.repeat(np.cumsum(part_counts) - part_counts, part_counts)
+            yield begin, end, owners, self._order[positions]
+
+    def _knn(self, queries: np.ndarray, k: int,
+             excluded: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return the indices of the k indexed points nearest to each of queries and their
+        squared distances, not counting the point excluded[q] for query q (or excluded[0] for
+        every query, if excluded has one element).
+        """
+        q = len(queries)
+        ids = np.full((q, k), -1, dtype=np.int64)
+        squared = np.full((q, k), np.inf)
+        if k <= 0 or len(self.points) == 0:
+            return ids, squared
+
+        excluded = np.broadcast_to(excluded, (q,))
+        cells = self._cell_of(queries)
+        # Answer the queries cell by cell, so the queries answered together gather their
+        # candidates from the same cells, and have about as many of them.
+        pending = np.argsort(cells[:, 0] * self._shape[1] + cells[:, 1], kind='stable')
+        reach = 1
+        while len(pending) > 0:
+            unresolved = []
+            for chunk in self._chunks(pending, reach):
+                for begin, end, owners, candidates in self._candidates(cells[chunk], reach):
+                    part = chunk[begin:end]
+                    found, distances, resolved = self._nearest_within(
+                        queries[part], cells[part], excluded[part], k, reach, owners, candidates)
+                    ids[part] = found
+                    squared[part] = distances
+                    unresolved.append(part[~resolved])
+            pending = np.concatenate(unresolved)
+            reach *= 2
+        return ids, squared
+
+    def _nearest_within(self, queries: np.ndarray, cells: np.ndarray, excluded: np.ndarray,
+                        k: int, reach: int, owners: np.ndarray,
+                        candidates: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the k nearest points to each of queries among its candidates (the points
+        within reach cells of cells, as gathered by _candidates), as in _knn, and whether each
+        query's result is final: that is, whether no point outside those cells could be nearer
+        than its k-th nearest point found.
+        """
+        q = len(queries)
+        keep = candidates != excluded[owners]
+        owners, candidates = owners[keep], candidates[keep]
+        squared = ((queries[owners] - self.points[candidates]) ** 2).sum(axis=1)
+
+        # Lay the candidates of each query out in a row of a matrix, padded with infinity, and
+        # pick the k nearest in each row. The candidates come grouped by query already.
+        counts = np.bincount(owners, minlength=q)
+        width = max(k, int(counts.max()) if q else 0)
+        columns = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+        matrix = np.full((q, width), np.inf)
+        matrix[owners, columns] = squared
+        members = np.full((q, width), -1, dtype=np.int64)
+        members[owners, columns] = candidates
+
+        chosen = np.argpartition(matrix, k - 1, axis=1)[:, :k]
+        distances = np.take_along_axis(matrix, chosen, axis=1)
+        nearest_first = np.argsort(distances, axis=1, kind='stable')
+        chosen = np.take_along_axis(chosen, nearest_first, axis=1)
+        distances = np.take_along_axis(distances, nearest_first, axis=1)
+        ids = np.take_along_axis(members, chosen, axis=1)
+
+        # The distance from each query to the nearest point of a cell outside the square
+        # searched, which is infinite on the sides where the square reaches the edge of the
+        # grid.
+        low = self._origin + (cells - reach) * self.cell_size
+        high = self._origin + (cells + reach + 1) * self.cell_size
+        gaps = np.concatenate((np.where(cells - reach > 0, queries - low, np.inf),
+                               np.where(cells + reach < np.array(self._shape) - 1,
+                                        high - queries, np.inf)), axis=1)
+        bound = gaps.min(axis=1)
+        return ids, distances, distances[:, -1] <= bound * bound
+
+
+class LocationIndex:
+    """Nearest-location queries over the locations of a location graph that have coordinates.
+
+    Instance Attributes:
+        - items: the located items, in the order of the points of the index
+        - positions: a dictionary mapping each located item to its projected (x, y) position
+
+    >>> import graph_vertex
+    >>> g = graph_vertex.Graph()
+    >>> g.add_vertex('a', 'park', 3)
+    >>> g.add_vertex('b', 'police station', 10)
+    >>> g.add_vertex('c', 'health', 7)
+    >>> g.add_vertex('d', 'police station', 10)
+    >>> index = LocationIndex(g, {'a': (-74.0, 40.70), 'b': (-74.0, 40.72),
+    ...                           'c': (-74.0, 40.705), 'd': (-74.0, 40.75)})
+    >>> index.nearest('a'), index.nearest('a', kind='police station'), index.nearest_safe('c')
+    ('c', 'b', 'a')
+    >>> round(index.distance('a', 'b'), 2)
+    2.22
+    """
+    items: list
+    positions: dict
+    _kinds: list[str]
+    _scores: np.ndarray
+    _all: GridIndex
+    _subsets: dict[Any, tuple[GridIndex, np.ndarray]]
+
+    def __init__(self, location_graph: Any, coordinates: dict) -> None:
+        """Initialize an index of the vertices of location_graph (a graph_vertex.Graph or a
+        csr_graph.CSRGraph) that have (longitude, latitude) coordinates in coordinates.
+        """
+        self.items = [item for item in location_graph.vertices if item in coordinates]
+        points = project([coordinates[item] for item in self.items])
+        self.positions = dict(zip(self.items, map(tuple, points.tolist())))
+        vertices = [location_graph.vertices[item] for item in self.items]
+        self._kinds = [vertex.kind for vertex in vertices]
+        self._scores = np.array([vertex.score for vertex in vertices], dtype=np.int64)
+        self._all = GridIndex(points)
+        self._subsets = {}
+
+    def nearest(self, item: Any, kind: Optional[str] = None) -> Optional[Any]:
+        """Return the location nearest to item (other than item itself), only counting
+        locations of the given kind if kind is not None. Return None if item has no
+        coordinates or there is no such location.
+        """
+        if kind is None:
+            return self._nearest_in(item, None, lambda: np.arange(len(self.items)))
+        return self._nearest_in(item, ('kind', kind),
+                                lambda: np.array([i for i, other in enumerate(self._kinds)
+                                                  if other == kind], dtype=np.int64))
+
+    def nearest_safe(self, item: Any,
+                     max_score: int = path_planner.SAFE_SCORE) -> Optional[Any]:
+        """Return the location nearest to item (other than item itself) whose score is at most
+        max_score, or None if item has no coordinates or there is no such location.
+        """
+        return self._nearest_in(item, ('score', max_score),
+                                lambda: np.flatnonzero(self._scores <= max_score))
+
+    def distance(self, item1: Any, item2: Any) -> float:
+        """Return the distance between two located items, in kilometres.
+
+        Preconditions:
+            - item1 in self.positions and item2 in self.positions
+        """
+        (x1, y1), (x2, y2) = self.positions[item1], self.positions[item2]
+        return math.hypot(x1 - x2, y1 - y2)
+
+    def _nearest_in(self, item: Any, key: Any, members: Any) -> Optional[Any]:
+        """Return the location nearest to item among a subset of the located items, given by
+        the indices members() returns. The index of each subset is built on its first use and
+        kept under key.
+        """
+        if item not in self.positions:
+            return None
+        if key is None:
+            index, ids = self._all, None
+        else:
+            if key not in self._subsets:
+                ids = members()
+                self._subsets[key] = (GridIndex(self._all.points[ids]), ids)
+            index, ids = self._subsets[key]
+
+        # Ask for two points, as the nearest may be item itself.
+        for i in index.nearest(self.positions[item], count=2):
+            other = self.items[i if ids is None else int(ids[i])]
+            if other != item:
+                return other
+        return None
+
+
+if __name__ == '__main__':
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'max-nested-blocks': 4,
+        'disable': ['E1136'],
+        'extra-imports': ['math', 'numpy', 'path_planner', 'graph_vertex']
+    })
@@ -0,0 +1,323 @@
+"""
+Parameter sweeps: play a batch of games for every combination of settings in a grid, and
+collect the results in one table.
+
+A grid maps some of the names in PARAMETERS to the list of values to try, for example
+
+    {"robber": ["RobberPlayer", "RiskyRobberPlayer"], "move_limit": [10, 20, 40],
+     "edge_budget": [200, 300], "score_dict": [{}, {"police station": 8}]}
+
+and each cell of the grid (one value of each parameter, the default of PARAMETERS for the
+parameters the grid leaves out) plays the same n games: game i of every cell uses the random
+number generator part4.game_rng(seed, i), so the cells are compared on the same random draws.
+A score_dict only needs the scores it changes from part1.SCORE_DICT.
+
+The result of each cell is kept in CACHE_DIR under a hash of everything it depends on: the
+settings of the cell, the number of games and the seed, the contents of its data set, and the
+source code of the game (see code_version). Running a sweep again only plays the cells that
+are new, or whose data set or code has changed. The cells that are played run in parallel in
+a pool of processes. For example
+
+    python sweep.py --grid grid.json -n 1000 --seed 111 --workers 4 --output sweep.csv
+
+where --grid is either a file holding the grid or the grid itself, written in JSON.
+"""
+from __future__ import annotations
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Any, Optional
+
+import game_results
+import graph_vertex
+import part1
+import part4
+from data_set_builder import file_checksum
+
+# The parameters a grid can set, with their defaults, in the order of the table's columns.
+PARAMETERS = {'robber': 'RobberPlayer', 'data': 'data/small_location_data.csv',
+              'move_limit': 20, 'model': 'random_walk', 'edge_budget': graph_vertex.EDGE_BUDGET,
+              'average_degree': 3.0, 'score_dict': {}}
+
+# The robber classes a grid can name.
+ROBBERS = {'RobberPlayer', 'RiskyRobberPlayer'}
+
+# The directory (relative to the working directory) that holds the results of the cells.
+CACHE_DIR = '__sweepcache__'
+
+# The modules whose source code decides the outcome of a game (see code_version).
+CODE_MODULES = ('part1', 'part2', 'part4', 'graph_vertex', 'graph_generators', 'spatial_index',
+                'path_planner', 'component_index', 'degree_index', 'kind_index', 'path_cache',
+                'game_results', 'memory_usage', 'sweep')
+
+# The version of the code, once code_version has computed it.
+_code_version = None
+
+
+def expand_grid(grid: dict) -> list[dict]:
+    """Return the cells of grid: one dictionary of every parameter in PARAMETERS for each
+    combination of the values in grid, with the defaults for the parameters grid leaves out.
+    A parameter given a single value rather than a list takes that value in every cell.
+
+    Raise a ValueError if grid is not a dictionary, or names a parameter that is not in
+    PARAMETERS, a robber class that is not in ROBBERS, a model that part1.load_location_graph
+    does not know, a data set file that does not exist, or a score_dict that is not a
+    dictionary mapping kinds of part1.SCORE_DICT to integer scores from 0 to 10.
+
+    >>> cells = expand_grid({'move_limit': [10, 20], 'robber': 'RiskyRobberPlayer'})
+    >>> [(cell['robber'], cell['move_limit'], cell['edge_budget']) for cell in cells]
+    [('RiskyRobberPlayer', 10, 300), ('RiskyRobberPlayer', 20, 300)]
+    >>> expand_grid({'moves': [10]})
+    Traceback (most recent call last):
+    ValueError: unknown parameters: moves
+    >>> expand_grid({'model': ['grid', 'ring']})
+    Traceback (most recent call last):
+    ValueError: unknown model: ring
+    >>> expand_grid({'score_dict': [{'park': 'x'}]})
+    Traceback (most recent call last):
+    ValueError: the score of park must be an integer from 0 to 10, not 'x'
+    """
+    if not isinstance(grid, dict):
+        raise ValueError('the grid must be a JSON object')
+    unknown = sorted(set(grid) - set(PARAMETERS))
+    if unknown:
+        raise ValueError('unknown parameters: ' + ', '.join(unknown))
+
+    values = []
+    for name, default in PARAMETERS.items():
+        value = grid.get(name, default)
+        values.append(value if isinstance(value, list) else [value])
+    cells = [dict(zip(PARAMETERS, combination)) for combination in itertools.product(*values)]
+
+    # NumPy is only needed for the generated models, so graph_generators is not imported with
+    # the rest.
+    import graph_generators
+
+    models = {'random_walk'} | graph_generators.MODELS | graph_generators.SPATIAL_MODELS
+    for cell in cells:
+        if cell['robber'] not in ROBBERS:
+            raise ValueError(f'unknown robber class: {cell["robber"]}')
+        if cell['model'] not in models:
+            raise ValueError(f'unknown model: {cell["model"]}')
+        if not isinstance(cell['data'], str) or not os.path.isfile(cell['data']):
+            raise ValueError(f'no such data set file: {cell["data"]}')
+        _check_score_dict(cell['score_dict'])
+    return cells
+
+
+def code_version() -> str:
+    """Return a hash of the source code of CODE_MODULES, which changes whenever the code that
+    decides the outcome of a game does.
+    """
+    global _code_version
+    if _code_version is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for module in CODE_MODULES:
+            digest.update(module.encode() + b'\0')
+            with open(os.path.join(directory, module + '.py'), 'rb') as file:
+                digest.update(file.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def cell_key(cell: dict, games: int, seed: int) -> str:
+    """Return the key of the result of playing games games of cell with the given seed: a
+    hash of the settings the result depends on, the contents of the cell's data set and
+    code_version().
+
+    Settings that do not change the games are left out of the hash, so such cells share one
+    result: the edge budget only matters for the 'random_walk' model and the average degree
+    only for the others. A score_dict is hashed with the scores of part1.SCORE_DICT it does
+    not change filled in.
+
+    >>> cell = expand_grid({})[0]
+    >>> cell_key(cell, 10, 1) == cell_key({**cell, 'average_degree': 5.0}, 10, 1)
+    True
+    >>> cell_key(cell, 10, 1) == cell_key({**cell, 'score_dict': {'park': 3}}, 10, 1)
+    True
+    >>> cell_key(cell, 10, 1) == cell_key({**cell, 'edge_budget': 200}, 10, 1)
+    False
+    """
+    settings = _game_settings(cell)
+    settings['data'] = file_checksum(cell['data'])
+    description = {'settings': settings, 'games': games, 'seed': seed, 'code': code_version()}
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+def play_cell(cell: dict, games: int, seed: int) -> dict:
+    """Play games games of cell with the given seed (see the module docstring) and return the
+    number of 'games', 'robber_wins' and games that ended for each of the 'reasons', and the
+    'seconds' it took. This is what the processes of run_sweep run.
+    """
+    start = time.perf_counter()
+    settings = _game_settings(cell)
+    robber, data = settings.pop('robber'), settings.pop('data')
+    sink = game_results.SummarySink()
+    for game in range(games):
+        rng = part4.game_rng(seed, game)
+        game_players = part1.initialize_robber_player(robber, data, rng=rng, **settings)
+        sink.write(part1.play_game(game_players[0], game_players[1], game_players[2], rng,
+                                   game=game))
+    return {'games': sink.games, 'robber_wins': sink.robber_wins,
+            'reasons': dict(zip(game_results.REASON_NAMES[1:], sink.reasons[1:])),
+            'seconds': round(time.perf_counter() - start, 3)}
+
+
+def run_sweep(grid: dict, games: int, seed: int = 0, workers: int = 1,
+              cache_dir: str = CACHE_DIR) -> list[dict]:
+    """Play games games (with the given seed) of every cell of grid and return the table of
+    results, one row per cell in the order of expand_grid. Each row holds the settings of its
+    cell, the results of play_cell, the robber's 'win_rate', and whether the results were
+    'cached'.
+
+    The results of cells already in cache_dir are read from there. The other cells are
+    played in a pool of workers processes (or in this process if workers == 1), and their
+    results are added to cache_dir.
+
+    Preconditions:
+        - games >= 0
+        - workers >= 1
+
+    >>> import tempfile
+    >>> cache_dir = tempfile.mkdtemp()
+    >>> table = run_sweep({'move_limit': [5, 20]}, 4, seed=7, cache_dir=cache_dir)
+    >>> [(row['move_limit'], row['cached']) for row in table]
+    [(5, False), (20, False)]
+    >>> table[1]['robber_wins'] == part4.count_robber_wins(4, 'RobberPlayer',
+    ...                                                    'data/small_location_data.csv', 7,
+    ...                                                    workers=2)
+    True
+    >>> table = run_sweep({'move_limit': [20, 40]}, 4, seed=7, cache_dir=cache_dir)
+    >>> [(row['move_limit'], row['cached']) for row in table]
+    [(20, True), (40, False)]
+    """
+    cells = expand_grid(grid)
+    keys = [cell_key(cell, games, seed) for cell in cells]
+    results = {}
+    for key in keys:
+        try:
+            with open(os.path.join(cache_dir, key + '.json'), 'r') as file:
+                results[key] = json.load(file)
+        except (OSError, ValueError):
+            pass
+    cached = set(results)
+
+    # Cells that share a key (see cell_key) are only played once.
+    pending = {key: cell for key, cell in zip(keys, cells) if key not in results}
+    os.makedirs(cache_dir, exist_ok=True)
+    if workers == 1:
+        for key, cell in pending.items():
+            results[key] = play_cell(cell, games, seed)
+            _save_result(cache_dir, key, results[key])
+    elif pending:
+        # Starting processes is only needed here, so it is not imported with the rest.
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(play_cell, cell, games, seed): key
+                       for key, cell in pending.items()}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                _save_result(cache_dir, futures[future], results[futures[future]])
+
+    table = []
+    for key, cell in zip(keys, cells):
+        result = results[key]
+        row = {**cell, 'score_dict': json.dumps(cell['score_dict'], sort_keys=True),
+               'games': result['games'], 'robber_wins': result['robber_wins'],
+               'win_rate': round(result['robber_wins'] / result['games'], 4)
+               if result['games'] else None}
+        row.update(result['reasons'])
+        row.update({'seconds': result['seconds'], 'cached': key in cached})
+        table.append(row)
+    return table
+
+
+def write_table(table: list[dict], file: Any) -> None:
+    """Write table, as returned by run_sweep, to file as csv."""
+    writer = csv.DictWriter(file, fieldnames=list(table[0]) if table else [])
+    writer.writeheader()
+    writer.writerows(table)
+
+
+def _check_score_dict(score_dict: Any) -> None:
+    """Raise a ValueError if score_dict is not a dictionary mapping kinds of part1.SCORE_DICT
+    to integer scores from 0 to 10.
+    """
+    if not isinstance(score_dict, dict):
+        raise ValueError(f'a score_dict must be a JSON object, not {score_dict!r}')
+    for kind, score in score_dict.items():
+        if kind not in part1.SCORE_DICT:
+            raise ValueError(f'unknown kind in score_dict: {kind}')
+        if not isinstance(score, int) or isinstance(score, bool) or not 0 <= score <= 10:
+            raise ValueError(f'the score of {kind} must be an integer from 0 to 10, '
+                             f'not {score!r}')
+
+
+def _game_settings(cell: dict) -> dict:
+    """Return the settings of cell that change its games, as the keyword arguments of
+    part1.initialize_robber_player (plus its robber and data), with the scores of
+    part1.SCORE_DICT that score_dict does not change filled in.
+    """
+    settings = {'robber': cell['robber'], 'data': cell['data'], 'move_limit': cell['move_limit'],
+                'model': cell['model'], 'score_dict': {**part1.SCORE_DICT, **cell['score_dict']}}
+    if cell['model'] == 'random_walk':
+        settings['edge_budget'] = cell['edge_budget']
+    else:
+        settings['average_degree'] = cell['average_degree']
+    return settings
+
+
+def _save_result(cache_dir: str, key: str, result: dict) -> None:
+    """Write result to its file in cache_dir, through a temporary file so that a sweep that is
+    stopped never leaves a half-written result behind.
+    """
+    path = os.path.join(cache_dir, key + '.json')
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(result, file)
+    os.replace(temporary, path)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run the sweep described by the command line arguments and return the exit status."""
+    parser = argparse.ArgumentParser(description='Play games over a grid of settings.')
+    parser.add_argument('--grid', default='{}',
+                        help='the grid, or a file holding it, in JSON (default: one cell)')
+    parser.add_argument('-n', '--games', type=int, default=1000,
+                        help='the number of games per cell')
+    parser.add_argument('--seed', type=int, default=0, help='the master seed of every cell')
+    parser.add_argument('--workers', type=int, default=1, help='the number of processes')
+    parser.add_argument('--output', help='the csv file to write the table to (default: stdout)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR,
+                        help='the directory of the cached results')
+    args = parser.parse_args(argv)
+
+    try:
+        if os.path.isfile(args.grid):
+            with open(args.grid, 'r') as file:
+                grid = json.load(file)
+        else:
+            grid = json.loads(args.grid)
+        table = run_sweep(grid, args.games, args.seed, args.workers, args.cache_dir)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    if args.output is None:
+        write_table(table, sys.stdout)
+    else:
+        with open(args.output, 'w', newline='') as file:
+            write_table(table, file)
+    print(json.dumps({'cells': len(table), 'cached': sum(row['cached'] for row in table)}),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())